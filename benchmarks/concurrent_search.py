@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Teste de carga de buscas concorrentes no DocumentProcessor
+
+Indexa o corpus de referência (benchmarks/fixtures/retrieval) numa base
+temporária e executa search_documents de um pool de threads (1, 2, 4, 8...),
+com carga só de leitura. Mostra consultas por segundo, eficiência em relação
+a uma thread (ideal: 100%) e o tamanho médio dos lotes do EncodeBatcher.
+Cada resultado concorrente é conferido com o da execução sequencial. Com
+--with-writer, uma thread reindexa documentos durante as buscas (um escritor);
+com --same-query, todas as threads repetem a mesma consulta ao mesmo tempo
+(rajada de agentes iniciando juntos) e a coluna "coalescidas" mostra quantas
+buscas aproveitaram uma idêntica já em andamento (SingleFlight).
+
+Uso:
+    python benchmarks/concurrent_search.py [--threads 1,2,4,8] [--queries-per-thread 50] [--with-writer] [--same-query]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURE_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures', 'retrieval')
+
+
+def load_queries():
+    with open(os.path.join(FIXTURE_DIR, 'queries.json'), encoding='utf-8') as f:
+        return [query['query'] for query in json.load(f)['queries']]
+
+
+def index_fixture(processor):
+    docs_dir = os.path.join(FIXTURE_DIR, 'docs')
+    paths = sorted(os.path.join(docs_dir, name) for name in os.listdir(docs_dir) if name.endswith('.txt'))
+    for path in paths:
+        processor._index_document(processor._read_txt(path), os.path.basename(path), 'txt', path)
+    return paths
+
+
+def run_readers(processor, queries, threads, queries_per_thread, k, expected, same_query=False):
+    """Buscas de `threads` threads em paralelo; retorna (segundos, divergências)"""
+    mismatches = []
+    barrier = threading.Barrier(threads)
+
+    def reader(worker):
+        barrier.wait()
+        for i in range(queries_per_thread):
+            query = queries[i % len(queries)] if same_query else queries[(worker + i) % len(queries)]
+            if same_query:
+                barrier.wait()
+            ids = [r['chunk_id'] for r in processor.search_documents(query, n_results=k)]
+            if expected is not None and ids != expected[query]:
+                mismatches.append(query)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(reader, worker) for worker in range(threads)]:
+            future.result()
+    return time.perf_counter() - started, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga de buscas concorrentes")
+    parser.add_argument('--threads', default='1,2,4,8', help='Quantidades de threads, separadas por vírgula')
+    parser.add_argument('--queries-per-thread', type=int, default=50)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--with-writer', action='store_true',
+                        help='Reindexar documentos numa thread durante as buscas')
+    parser.add_argument('--same-query', action='store_true',
+                        help='Todas as threads fazem a mesma consulta ao mesmo tempo')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='custody_concurrency_')
+    os.environ['CHROMA_PERSIST_DIRECTORY'] = os.path.join(workdir, 'chroma')
+    os.environ['REGULATION_INDEX_PATH'] = os.path.join(workdir, 'regulation_index.sqlite3')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from src.document_processor import DocumentProcessor
+    from src.utils.metrics import SINGLEFLIGHT_CALLS
+
+    processor = DocumentProcessor()
+    paths = index_fixture(processor)
+    queries = load_queries()
+
+    # Referência sequencial (com escritor, o índice muda e a conferência não vale)
+    expected = None
+    if not args.with_writer:
+        expected = {query: [r['chunk_id'] for r in processor.search_documents(query, n_results=args.k)]
+                    for query in queries}
+
+    stop_writer = threading.Event()
+    writes = []
+
+    def writer():
+        while not stop_writer.is_set():
+            path = paths[len(writes) % len(paths)]
+            processor._index_document(processor._read_txt(path), os.path.basename(path), 'txt', path)
+            writes.append(path)
+
+    writer_thread = None
+    if args.with_writer:
+        writer_thread = threading.Thread(target=writer, daemon=True)
+        writer_thread.start()
+
+    print(f"{'threads':>7} {'consultas':>9} {'s':>7} {'QPS':>8} {'eficiência':>10} {'lote médio':>10} {'coalescidas':>11} {'divergências':>12}")
+    baseline_qps = None
+    for threads in [int(t) for t in args.threads.split(',') if t.strip()]:
+        before = processor.encoder.stats()
+        coalesced_before = SINGLEFLIGHT_CALLS.value(operation='document.search', result='coalesced')
+        elapsed, mismatches = run_readers(processor, queries, threads, args.queries_per_thread, args.k,
+                                          expected, args.same_query)
+        after = processor.encoder.stats()
+        coalesced = SINGLEFLIGHT_CALLS.value(operation='document.search', result='coalesced') - coalesced_before
+
+        total = threads * args.queries_per_thread
+        qps = total / elapsed
+        if baseline_qps is None:
+            baseline_qps = qps / threads
+        batches = after['batches'] - before['batches']
+        mean_batch = (after['texts'] - before['texts']) / batches if batches else 0.0
+        print(f"{threads:>7} {total:>9} {elapsed:>7.2f} {qps:>8.1f} {qps / (baseline_qps * threads):>10.0%} "
+              f"{mean_batch:>10.1f} {coalesced:>11.0f} {len(mismatches):>12}")
+
+    if writer_thread is not None:
+        stop_writer.set()
+        writer_thread.join()
+        print(f"\nDocumentos reindexados durante as buscas: {len(writes)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Gerador de corpus regulatório sintético (estilo CVM/BACEN/ANBIMA)
+
+Documentos determinísticos (mesma semente, mesmo texto) com capítulos,
+seções, artigos, parágrafos, incisos, listas numeradas, prazos,
+penalidades e citações entre normas, nas escalas usadas pela suíte de
+benchmarks (1, 10 e 100 MB).
+
+Uso:
+    python benchmarks/corpus.py --scale 10 --output benchmarks/data/corpus_10mb [--pdf-documents 1]
+"""
+
+import argparse
+import json
+import os
+import random
+from typing import Dict, List
+
+# Tamanho alvo de cada documento; o corpus de N MB tem ~N*4 documentos
+DOCUMENT_BYTES = 256 * 1024
+
+ISSUERS = [('Resolução', 'CVM'), ('Instrução', 'CVM'), ('Circular', 'BCB'),
+           ('Resolução', 'CMN'), ('Deliberação', 'CVM')]
+
+SUBJECTS = ['custódia de valores mobiliários', 'fundos de investimento', 'liquidação de operações',
+            'segregação patrimonial', 'conciliação de posições', 'escrituração de cotas',
+            'depósito centralizado', 'registro de ativos financeiros', 'administração fiduciária',
+            'eventos corporativos', 'empréstimo de ativos', 'garantias em câmaras de compensação']
+
+ACTORS = ['o custodiante', 'a instituição depositária', 'o administrador fiduciário', 'o gestor',
+          'o escriturador', 'a câmara de compensação', 'o participante direto', 'o distribuidor']
+
+ACTIONS = ['manter registros individualizados das posições de cada investidor',
+           'conciliar diariamente os saldos com o depositário central',
+           'segregar os ativos próprios dos ativos de terceiros',
+           'comunicar à CVM qualquer divergência identificada na conciliação',
+           'disponibilizar aos investidores extrato mensal das movimentações',
+           'assegurar a integridade e a rastreabilidade das instruções recebidas',
+           'adotar controles internos compatíveis com o volume de operações',
+           'manter plano de continuidade de negócios testado anualmente',
+           'verificar a titularidade dos ativos antes da liquidação',
+           'reportar ao regulador os eventos de falha operacional']
+
+DEADLINES = ['no prazo de {n} dias úteis', 'em até {n} dias', 'no prazo máximo de {n} dias',
+             'em até {n} meses', 'no prazo de {n} dias corridos']
+
+PENALTIES = ['O descumprimento do disposto neste artigo sujeita o infrator a multa de até R$ {v}.000,00.',
+             'A inobservância deste dispositivo constitui infração grave, sujeita a penalidade prevista em regulamentação específica.',
+             'Aplica-se advertência ao participante que reincidir na conduta vedada por este artigo.']
+
+ROMAN = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X', 'XI', 'XII', 'XIII', 'XIV', 'XV']
+
+
+class RegulationGenerator:
+    """Texto de norma sintética, reproduzível a partir da semente"""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+
+    def norm_reference(self, exclude: str = None) -> str:
+        kind, issuer = self.rng.choice(ISSUERS)
+        number = self.rng.randint(1, 5000)
+        reference = f"{kind} {issuer} nº {number:,}".replace(',', '.')
+        return reference if reference != exclude else self.norm_reference(exclude)
+
+    def sentence(self) -> str:
+        actor = self.rng.choice(ACTORS)
+        action = self.rng.choice(ACTIONS)
+        roll = self.rng.random()
+        if roll < 0.35:
+            deadline = self.rng.choice(DEADLINES).format(n=self.rng.choice([1, 2, 3, 5, 10, 15, 30, 60, 90]))
+            return f"{actor.capitalize()} deve {action} {deadline}."
+        if roll < 0.55:
+            article = self.rng.randint(1, 120)
+            return f"Nos termos do Art. {article}º da {self.norm_reference()}, {actor} deverá {action}."
+        if roll < 0.7:
+            return f"É obrigatório que {actor} venha a {action}."
+        return f"{actor.capitalize()} deve {action}, observado o disposto em regulamentação específica."
+
+    def article(self, number: int) -> List[str]:
+        lines = [f"Art. {number}º {self.sentence()}"]
+        if self.rng.random() < 0.5:
+            for i in range(self.rng.randint(2, 6)):
+                lines.append(f"{ROMAN[i]} - {self.rng.choice(ACTIONS)};")
+        for paragraph in range(1, self.rng.randint(1, 3) + 1):
+            lines.append(f"§ {paragraph}º {self.sentence()}")
+        if self.rng.random() < 0.25:
+            lines.append(self.rng.choice(PENALTIES).format(v=self.rng.randint(50, 500)))
+        if self.rng.random() < 0.2:
+            lines.append("")
+            lines.append("Procedimentos mínimos:")
+            for i in range(1, self.rng.randint(3, 6) + 1):
+                lines.append(f"{i}. {self.rng.choice(ACTIONS).capitalize()}.")
+        return lines
+
+    def document(self, target_bytes: int) -> Dict[str, str]:
+        kind, issuer = self.rng.choice(ISSUERS)
+        number = self.rng.randint(1, 5000)
+        subject = self.rng.choice(SUBJECTS)
+        title = f"{kind.upper()} {issuer} Nº {number}, DE {self.rng.randint(1, 28)} DE MAIO DE {self.rng.randint(2005, 2024)}"
+        lines = [title, "", f"Dispõe sobre {subject} e dá outras providências.", ""]
+        size = sum(len(line.encode('utf-8')) + 1 for line in lines)
+
+        chapter = 0
+        article_number = 1
+        while size < target_bytes:
+            chapter += 1
+            chapter_lines = ["", f"CAPÍTULO {chapter}", f"DAS DISPOSIÇÕES SOBRE {self.rng.choice(SUBJECTS).upper()}", ""]
+            for section in range(1, self.rng.randint(2, 4) + 1):
+                chapter_lines.extend([f"Seção {ROMAN[(section - 1) % len(ROMAN)]}", ""])
+                for _ in range(self.rng.randint(3, 8)):
+                    chapter_lines.extend(self.article(article_number))
+                    chapter_lines.append("")
+                    article_number += 1
+            lines.extend(chapter_lines)
+            size += sum(len(line.encode('utf-8')) + 1 for line in chapter_lines)
+
+        return {'title': title, 'text': "\n".join(lines)}
+
+
+def write_pdf(text: str, path: str, max_pages: int = None) -> int:
+    """Gravar o texto em PDF (PyMuPDF); retorna o número de páginas"""
+    import fitz  # PyMuPDF
+
+    lines_per_page = 60
+    lines = text.splitlines()
+    pdf = fitz.open()
+    for start in range(0, len(lines), lines_per_page):
+        if max_pages is not None and pdf.page_count >= max_pages:
+            break
+        page = pdf.new_page()
+        page.insert_text((40, 40), "\n".join(lines[start:start + lines_per_page]), fontsize=7)
+    pages = pdf.page_count
+    pdf.save(path)
+    pdf.close()
+    return pages
+
+
+def generate_corpus(output_dir: str, scale_mb: float, seed: int = 42,
+                    pdf_documents: int = 0, pdf_max_pages: int = 200) -> Dict[str, object]:
+    """Gerar o corpus (TXT e, opcionalmente, alguns PDFs) e o manifest.json
+
+    Reaproveita o corpus existente quando escala e semente coincidem.
+    """
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('scale_mb') == scale_mb and manifest.get('seed') == seed \
+                and manifest.get('pdf_documents') == pdf_documents:
+            return manifest
+
+    os.makedirs(output_dir, exist_ok=True)
+    generator = RegulationGenerator(seed)
+    target_bytes = int(scale_mb * 1024 * 1024)
+    documents = []
+    total = 0
+    index = 0
+    while total < target_bytes:
+        document = generator.document(min(DOCUMENT_BYTES, target_bytes - total))
+        filename = f"norma_{index:04d}.txt"
+        with open(os.path.join(output_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(document['text'])
+        size = len(document['text'].encode('utf-8'))
+        entry = {'file': filename, 'type': 'txt', 'title': document['title'], 'bytes': size}
+        if index < pdf_documents:
+            pdf_name = f"norma_{index:04d}.pdf"
+            entry['pdf'] = pdf_name
+            entry['pdf_pages'] = write_pdf(document['text'], os.path.join(output_dir, pdf_name), pdf_max_pages)
+        documents.append(entry)
+        total += size
+        index += 1
+
+    manifest = {'scale_mb': scale_mb, 'seed': seed, 'pdf_documents': pdf_documents,
+                'bytes': total, 'documents': documents}
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerar corpus regulatório sintético")
+    parser.add_argument('--scale', type=float, default=1, help='Tamanho do corpus em MB')
+    parser.add_argument('--output', required=True, help='Diretório de saída')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--pdf-documents', type=int, default=0, help='Quantos documentos também gravar em PDF')
+    args = parser.parse_args()
+
+    manifest = generate_corpus(args.output, args.scale, args.seed, args.pdf_documents)
+    print(f"{len(manifest['documents'])} documentos, {manifest['bytes'] / 1024 / 1024:.1f} MB em {args.output}")
+
+
+if __name__ == '__main__':
+    main()
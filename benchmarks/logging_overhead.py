@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark do custo de logging na thread de quem loga: handler síncrono
+(padrão) contra LOG_QUEUE=true, em texto e JSON, com mensagens f-string e
+no estilo %, inclusive em nível desabilitado (debug com LOG_LEVEL=INFO).
+Cada chamada é intercalada com uma espera curta, como entre buscas.
+
+Uso:
+    python benchmarks/logging_overhead.py [--calls 2000] [--io-ms 0.2]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import logger as logger_module  # noqa: E402
+
+QUERY = "requisitos de segregação patrimonial para custodiantes de fundos de investimento"
+
+
+def make_logger(name, queue_mode, log_format, stream):
+    """Logger configurado via setup_logger com a saída redirecionada para stream"""
+    os.environ['LOG_QUEUE'] = 'true' if queue_mode else 'false'
+    os.environ['LOG_FORMAT'] = log_format
+    os.environ['LOG_LEVEL'] = 'INFO'
+    # Cada modo com seu próprio listener
+    logger_module._queue_handler = None
+    previous_stderr, sys.stderr = sys.stderr, stream
+    try:
+        return logger_module.setup_logger(name)
+    finally:
+        sys.stderr = previous_stderr
+
+
+def run(logger, calls, lazy, level, io_seconds):
+    """Tempo gasto nas chamadas de log, intercaladas com espera de I/O (busca simulada)"""
+    log = getattr(logger, level)
+    spent = 0.0
+    for i in range(calls):
+        started = time.perf_counter()
+        if lazy:
+            log("Busca realizada: %d resultados para '%.50s...'", i % 20, QUERY)
+        else:
+            log(f"Busca realizada: {i % 20} resultados para '{QUERY[:50]}...'")
+        spent += time.perf_counter() - started
+        # Embedding/consulta liberam o GIL: é quando o listener da fila escreve
+        time.sleep(io_seconds)
+    return spent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000, help='Chamadas de log por cenário')
+    parser.add_argument('--io-ms', type=float, default=0.2, help='Espera simulada entre chamadas (ms)')
+    args = parser.parse_args()
+
+    print(f"{'modo':<8} {'formato':<7} {'mensagem':<9} {'nível':<6} {'µs/chamada':>11}")
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as sink:
+        for queue_mode in (False, True):
+            for log_format in ('text', 'json'):
+                name = f"bench.{'queue' if queue_mode else 'sync'}.{log_format}"
+                logger = make_logger(name, queue_mode, log_format, sink)
+                for lazy in (False, True):
+                    for level in ('info', 'debug'):
+                        elapsed = run(logger, args.calls, lazy, level, args.io_ms / 1000)
+                        print(f"{'fila' if queue_mode else 'síncrono':<8} {log_format:<7} "
+                              f"{'%' if lazy else 'f-string':<9} {level:<6} "
+                              f"{elapsed / args.calls * 1e6:>11.2f}")
+                logger_module.stop_logging()
+
+
+if __name__ == '__main__':
+    main()
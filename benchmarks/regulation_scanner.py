@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark da extração regulatória: implementação anterior do
+RegulationAnalyzerTool (um re.findall por tipo e um split por área de foco)
+contra o scanner combinado de src/regulation/extractor.py. Antes de medir,
+confere os resultados e o filtro de tipos do índice regulatório.
+
+Uso:
+    python benchmarks/regulation_scanner.py [--chunks 200] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.regulation.extractor import scan  # noqa: E402
+
+LIMITS = {'obligation': 3, 'deadline': 2, 'penalty': 2, 'article': 2}
+
+FOCUS_AREAS = ['custódia', 'liquidação', 'conciliação', 'reporte', 'auditoria',
+               'segregação', 'tesouraria', 'compliance', 'risco', 'garantias',
+               'cotas', 'fundos', 'ativos', 'eventos', 'cadastro', 'prazo']
+
+SENTENCES = [
+    "Art. {n} O custodiante deve manter controles internos adequados à custódia de ativos.",
+    "A instituição deverá conciliar diariamente as posições com a câmara de liquidação.",
+    "O envio do reporte deve ocorrer em até {d} dias úteis após o fechamento do mês.",
+    "É obrigatório o registro de eventos corporativos no sistema de custódia.",
+    "O descumprimento sujeita a instituição a multa de até {d} mil reais por ocorrência.",
+    "A segregação patrimonial dos fundos é verificada pela auditoria independente.",
+    "No prazo máximo de {d} dias a instituição deve comunicar a divergência ao regulador.",
+    "A penalidade será aplicada após processo administrativo com direito a defesa.",
+    "Artigo {n} Os ativos depositados em garantia devem ser identificados por titular.",
+    "As cotas de fundos seguem o cadastro mantido pelo administrador fiduciário.",
+    "A tesouraria acompanha o risco de liquidez das operações compromissadas.",
+    "Compete à área de compliance revisar anualmente os procedimentos operacionais.",
+]
+
+
+def legacy_analyze(content, focus_areas):
+    """Cópia do RegulationAnalyzerTool._analyze_regulation_content anterior (um chunk)"""
+    analysis = {'obligations': [], 'deadlines': [], 'penalties': [], 'key_articles': [], 'focus_analysis': {}}
+
+    obligations = re.findall(r'(?:deve|deverá|é obrigatório|é necessário|obriga-se)[\s\w,.:;-]+[.!]', content, re.IGNORECASE)
+    analysis['obligations'].extend(ob.strip() for ob in obligations[:3])
+
+    deadlines = re.findall(r'(?:prazo de|até|no prazo máximo de|em até)\s+\d+\s+(?:dias|meses|anos)[\s\w,.:;-]*[.!]', content, re.IGNORECASE)
+    analysis['deadlines'].extend(dl.strip() for dl in deadlines[:2])
+
+    penalties = re.findall(r'(?:multa|penalidade|sanção|advertência)[\s\w,.:;-]+[.!]', content, re.IGNORECASE)
+    analysis['penalties'].extend(pen.strip() for pen in penalties[:2])
+
+    articles = re.findall(r'(?:Art\.|Artigo)\s+\d+[\s\w,.:;-]+[.!]', content)
+    analysis['key_articles'].extend(art.strip() for art in articles[:2])
+
+    for area in focus_areas:
+        if area.lower() in content.lower():
+            if area not in analysis['focus_analysis']:
+                analysis['focus_analysis'][area] = []
+            sentences = content.split('.')
+            relevant_sentences = [s.strip() + '.' for s in sentences if area.lower() in s.lower()]
+            analysis['focus_analysis'][area].extend(relevant_sentences[:2])
+
+    return analysis
+
+
+def scanner_analyze(content, focus_areas):
+    """Mesma análise via scanner combinado (caminho atual do tool)"""
+    keys = {'obligation': 'obligations', 'deadline': 'deadlines', 'penalty': 'penalties', 'article': 'key_articles'}
+    analysis = {'obligations': [], 'deadlines': [], 'penalties': [], 'key_articles': [], 'focus_analysis': {}}
+    scanned = scan(content, focus_areas, LIMITS)
+    for item in scanned['items']:
+        analysis[keys[item['type']]].append(item['text'])
+    for area, sentences in scanned['focus'].items():
+        analysis['focus_analysis'][area] = sentences[:2]
+    return analysis
+
+
+def synthetic_chunks(count, sentences_per_chunk=14, seed=7):
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(count):
+        parts = [rng.choice(SENTENCES).format(n=rng.randint(1, 90), d=rng.choice([2, 5, 10, 30, 90]))
+                 for _ in range(sentences_per_chunk)]
+        chunks.append(" ".join(parts))
+    return chunks
+
+
+def check_index_filters(chunks):
+    """Análise só de prazos com faixa de dias não deve trazer os outros tipos"""
+    from src.regulation.index import RegulationIndex
+    from src.tools.regulation_analyzer_tool import RegulationAnalyzerTool
+
+    with tempfile.TemporaryDirectory() as workdir:
+        index = RegulationIndex(os.path.join(workdir, 'regulation_index.sqlite3'))
+        index.index_chunks('sintetico.txt', 'txt', 'sintetico.txt',
+                           [f"sintetico_{i}" for i in range(len(chunks))], chunks)
+        if index.query(item_types=[]):
+            raise SystemExit("RegulationIndex.query com item_types=[] retornou itens")
+
+        analysis = RegulationAnalyzerTool()._analysis_from_index(
+            index, None, [], [], ['deadline'], deadline_range=(None, 30)
+        )
+        other_items = {key: len(items) for key, items in analysis.items()
+                       if key not in ('deadlines', 'focus_analysis') and items}
+        if other_items:
+            raise SystemExit(f"Análise só de prazos (até 30 dias) trouxe outros tipos: {other_items}")
+        if not analysis['deadlines'] or any(item['days'] > 30 for item in analysis['deadlines']):
+            raise SystemExit("Análise só de prazos (até 30 dias) com prazos fora da faixa")
+
+
+def best_time(function, chunks, focus_areas, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for chunk in chunks:
+            function(chunk, focus_areas)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=200, help='Chunks sintéticos por rodada')
+    parser.add_argument('--repeat', type=int, default=5, help='Rodadas (vale a melhor)')
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks)
+
+    for areas in (0, 4, 16):
+        focus_areas = FOCUS_AREAS[:areas]
+        for chunk in chunks:
+            if legacy_analyze(chunk, focus_areas) != scanner_analyze(chunk, focus_areas):
+                raise SystemExit(f"Resultado divergente com {areas} áreas de foco")
+    check_index_filters(chunks)
+
+    print(f"{'áreas de foco':>14} {'anterior (ms)':>14} {'scanner (ms)':>13} {'ganho':>7}")
+    for areas in (0, 1, 4, 8, 16):
+        focus_areas = FOCUS_AREAS[:areas]
+        legacy = best_time(legacy_analyze, chunks, focus_areas, args.repeat)
+        scanner = best_time(scanner_analyze, chunks, focus_areas, args.repeat)
+        print(f"{areas:>14} {legacy * 1000:>14.1f} {scanner * 1000:>13.1f} {legacy / scanner:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Avaliação de recuperação: qualidade (recall@k, MRR, nDCG@k) contra latência
+
+Indexa o corpus de referência (benchmarks/fixtures/retrieval) em cada
+configuração (modelo de embeddings, tamanho de chunk, search_ef do HNSW,
+busca híbrida ligada/desligada, k) e mede, sobre as consultas rotuladas, a
+qualidade da busca e a latência de search_documents. Ao final imprime a
+tabela com a fronteira de Pareto (menor latência p50 para cada nível de
+qualidade) e grava o JSON em benchmarks/results/.
+
+Rótulos: cada consulta lista os chunks relevantes, por id ou por trecho de
+evidência ({"source", "contains"}), resolvido para os chunks que o contêm
+em cada tamanho de chunk.
+
+Uso:
+    python benchmarks/retrieval_eval.py [--models all-MiniLM-L6-v2] [--chunk-sizes 128,1000]
+        [--search-ef 0,100] [--hybrid off,on] [--k 5,10] [--baseline RESULTADO_ANTERIOR.json]
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Set
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.suite import RESULTS_DIR, git_commit, percentiles  # noqa: E402
+
+FIXTURE_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures', 'retrieval')
+OBJECTIVES = ('ndcg', 'recall', 'mrr')
+
+
+def normalize(text: str) -> str:
+    """Minúsculas e espaços colapsados (o splitter reagrupa palavras no overlap)"""
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+def load_fixture(fixture_dir: str) -> Dict:
+    with open(os.path.join(fixture_dir, 'queries.json'), encoding='utf-8') as f:
+        fixture = json.load(f)
+    docs_dir = os.path.join(fixture_dir, 'docs')
+    fixture['documents'] = sorted(os.path.join(docs_dir, name) for name in os.listdir(docs_dir)
+                                  if name.endswith('.txt'))
+    return fixture
+
+
+def resolve_relevant(relevant: List, chunks: Dict[str, Dict]) -> List[Set[str]]:
+    """Um conjunto de ids de chunk por item relevante da consulta"""
+    groups = []
+    for item in relevant:
+        if isinstance(item, str):
+            groups.append({item})
+            continue
+        evidence = normalize(item['contains'])
+        groups.append({chunk_id for chunk_id, chunk in chunks.items()
+                       if chunk['source'] == item['source'] and evidence in chunk['content']})
+    return groups
+
+
+def score_ranking(retrieved: List[str], groups: List[Set[str]], k: int) -> Dict[str, float]:
+    """recall@k, MRR e nDCG@k com relevância binária por item rotulado
+
+    Um item conta uma única vez, no primeiro chunk recuperado que o contém
+    (com overlap, o mesmo trecho pode estar em dois chunks).
+    """
+    covered = set()
+    first_hit = None
+    dcg = 0.0
+    for rank, chunk_id in enumerate(retrieved[:k], start=1):
+        hits = {i for i, group in enumerate(groups) if chunk_id in group}
+        if hits and first_hit is None:
+            first_hit = rank
+        new_hits = hits - covered
+        if new_hits:
+            dcg += len(new_hits) / math.log2(rank + 1)
+            covered |= new_hits
+    ideal = sum(1 / math.log2(rank + 1) for rank in range(1, min(len(groups), k) + 1))
+    return {
+        'recall': len(covered) / len(groups) if groups else 0.0,
+        'mrr': 1 / first_hit if first_hit else 0.0,
+        'ndcg': dcg / ideal if ideal else 0.0
+    }
+
+
+def pareto_front(rows: List[Dict], objective: str) -> None:
+    """Marcar as configurações não dominadas em (latência p50, qualidade)"""
+    for row in rows:
+        row['pareto'] = not any(
+            other is not row
+            and other['p50_ms'] <= row['p50_ms'] and other[objective] >= row[objective]
+            and (other['p50_ms'] < row['p50_ms'] or other[objective] > row[objective])
+            for other in rows
+        )
+
+
+def build_index(processor, documents: List[str], name: str, workdir: str,
+                chunk_size: int, search_ef: int) -> Dict:
+    """Coleção e índice regulatório próprios da configuração, com o corpus indexado"""
+    from src.regulation.index import RegulationIndex
+    from src.utils.text_splitter import CustomTextSplitter
+
+    metadata = {"description": "Avaliação de recuperação"}
+    if search_ef:
+        metadata['hnsw:search_ef'] = search_ef
+    processor.collection_name = name
+    processor.collection = processor.chroma_client.create_collection(name=name, metadata=metadata)
+    processor.regulation_index = RegulationIndex(os.path.join(workdir, f"{name}.sqlite3"))
+    # Overlap proporcional ao padrão (200 tokens para chunks de 1000)
+    processor.text_splitter = CustomTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_size // 5)
+
+    started = time.perf_counter()
+    for path in documents:
+        processor._index_document(processor._read_txt(path), os.path.basename(path), 'txt', path)
+    build_seconds = time.perf_counter() - started
+
+    stored = processor.collection.get(include=['documents', 'metadatas'])
+    chunks = {
+        chunk_id: {'source': metadata['filename'], 'content': normalize(document)}
+        for chunk_id, document, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+    }
+    return {'chunks': chunks, 'build_seconds': build_seconds}
+
+
+def evaluate(processor, queries: List[Dict], labels: Dict[str, List[Set[str]]],
+             k: int, hybrid: bool, repeats: int) -> Dict[str, float]:
+    """Qualidade média e latência de search_documents sobre as consultas rotuladas"""
+    for query in queries[:3]:
+        processor.search_documents(query['query'], n_results=k, hybrid=hybrid)
+
+    totals = {objective: 0.0 for objective in OBJECTIVES}
+    samples = []
+    for query in queries:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            results = processor.search_documents(query['query'], n_results=k, hybrid=hybrid)
+            samples.append(time.perf_counter() - started)
+        scores = score_ranking([r['chunk_id'] for r in results], labels[query['id']], k)
+        for objective in OBJECTIVES:
+            totals[objective] += scores[objective]
+
+    latency = percentiles(samples)
+    row = {objective: round(totals[objective] / len(queries), 4) for objective in OBJECTIVES}
+    row.update(p50_ms=latency['p50_ms'], p99_ms=latency['p99_ms'])
+    return row
+
+
+def config_key(row: Dict) -> str:
+    return f"{row['model']}|{row['chunk_size']}|{row['search_ef']}|{row['hybrid']}|{row['k']}"
+
+
+def print_table(rows: List[Dict], baseline: Dict[str, Dict] = None):
+    header = (f"{'modelo':<22} {'chunk':>5} {'ef':>4} {'híbr.':>5} {'k':>3} "
+              f"{'recall@k':>8} {'MRR':>6} {'nDCG@k':>7} {'p50 ms':>8} {'p99 ms':>8}  pareto")
+    if baseline:
+        header += f"  {'ΔnDCG':>7} {'Δp50%':>7}"
+    print(header)
+    for row in sorted(rows, key=lambda r: (r['p50_ms'], -r['ndcg'])):
+        line = (f"{row['model'][:22]:<22} {row['chunk_size']:>5} {row['search_ef'] or '-':>4} "
+                f"{'sim' if row['hybrid'] else 'não':>5} {row['k']:>3} "
+                f"{row['recall']:>8.3f} {row['mrr']:>6.3f} {row['ndcg']:>7.3f} "
+                f"{row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f}  {'*' if row['pareto'] else '':^6}")
+        previous = (baseline or {}).get(config_key(row))
+        if previous:
+            latency_delta = (row['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100 \
+                if previous['p50_ms'] else 0.0
+            line += f"  {row['ndcg'] - previous['ndcg']:>+7.3f} {latency_delta:>+6.1f}%"
+        print(line)
+
+
+def parse_list(value: str, cast=str) -> List:
+    return [cast(item.strip()) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avaliação de recuperação (qualidade x latência)")
+    parser.add_argument('--fixture', default=FIXTURE_DIR, help='Diretório com docs/ e queries.json')
+    parser.add_argument('--models', default=os.getenv('EMBEDDINGS_MODEL', 'all-MiniLM-L6-v2'),
+                        help='Modelos de embeddings, separados por vírgula')
+    parser.add_argument('--chunk-sizes', default='128,1000', help='Tamanhos de chunk (tokens)')
+    parser.add_argument('--search-ef', default='0', help='hnsw:search_ef da coleção (0 = padrão do ChromaDB)')
+    parser.add_argument('--hybrid', default='off,on', help='Busca híbrida: off, on ou off,on')
+    parser.add_argument('--k', default='5,10', help='Valores de n_results')
+    parser.add_argument('--repeats', type=int, default=3, help='Repetições de cada consulta na medição de latência')
+    parser.add_argument('--objective', choices=OBJECTIVES, default='ndcg', help='Métrica de qualidade do Pareto')
+    parser.add_argument('--baseline', help='Resultado anterior para comparar configuração a configuração')
+    parser.add_argument('--output', help='Arquivo JSON de saída')
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture)
+    models = parse_list(args.models)
+    chunk_sizes = parse_list(args.chunk_sizes, int)
+    search_efs = parse_list(args.search_ef, int)
+    hybrid_modes = [mode == 'on' for mode in parse_list(args.hybrid)]
+    ks = parse_list(args.k, int)
+
+    # Bases descartáveis: a avaliação não toca nos dados reais
+    workdir = tempfile.mkdtemp(prefix='custody_retrieval_eval_')
+    os.environ['CHROMA_PERSIST_DIRECTORY'] = os.path.join(workdir, 'chroma')
+    os.environ['REGULATION_INDEX_PATH'] = os.path.join(workdir, 'regulation_index.sqlite3')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from src.document_processor import DocumentProcessor
+
+    rows = []
+    for model_number, model in enumerate(models):
+        os.environ['EMBEDDINGS_MODEL'] = model
+        processor = DocumentProcessor()
+        for chunk_size, search_ef in itertools.product(chunk_sizes, search_efs):
+            name = f"eval_{model_number}_{chunk_size}_{search_ef}"
+            print(f"Indexando: modelo={model} chunk={chunk_size} search_ef={search_ef or 'padrão'}...")
+            index = build_index(processor, fixture['documents'], name, workdir, chunk_size, search_ef)
+
+            labels = {query['id']: resolve_relevant(query['relevant'], index['chunks'])
+                      for query in fixture['queries']}
+            unresolved = [f"{query_id}[{i}]" for query_id, groups in labels.items()
+                          for i, group in enumerate(groups) if not group]
+            if unresolved:
+                print(f"Aviso: rótulos sem chunk correspondente: {', '.join(unresolved)}")
+
+            for hybrid, k in itertools.product(hybrid_modes, ks):
+                row = {'model': model, 'chunk_size': chunk_size, 'search_ef': search_ef,
+                       'hybrid': hybrid, 'k': k, 'chunks': len(index['chunks']),
+                       'build_seconds': round(index['build_seconds'], 3)}
+                row.update(evaluate(processor, fixture['queries'], labels, k, hybrid, args.repeats))
+                rows.append(row)
+
+    pareto_front(rows, args.objective)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = {config_key(row): row for row in json.load(f)['results']}
+
+    print()
+    print_table(rows, baseline)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'fixture': os.path.relpath(args.fixture, ROOT),
+            'queries': len(fixture['queries']),
+            'documents': len(fixture['documents']),
+            'objective': args.objective,
+            'repeats': args.repeats
+        },
+        'results': rows
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"retrieval_{report['meta']['commit']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados salvos em {output}")
+
+
+if __name__ == '__main__':
+    main()
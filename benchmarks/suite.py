@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Suíte de benchmarks do pipeline de ingestão e consulta
+
+Sobre o corpus sintético de benchmarks/corpus.py (1, 10 ou 100 MB), mede:
+extração de texto (TXT e PDF), CustomTextSplitter.split_text, vazão de
+embeddings, construção do índice (_index_document), latência p50/p99 de
+search_documents e de get_document_context e, numa passada separada com
+tracemalloc, a memória alocada e o pico por etapa. O resultado vai para um
+JSON em benchmarks/results/ para comparar entre commits; compare com
+--check-memory falha (código 1) se alguma etapa passar a alocar mais.
+
+Uso:
+    python benchmarks/suite.py run [--scale 1] [--queries 50] [--max-index-mb 5]
+    python benchmarks/suite.py compare benchmarks/results/ANTES.json benchmarks/results/DEPOIS.json [--check-memory]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import generate_corpus  # noqa: E402
+from src.utils.memory_profiler import disable_memory_profiling, enable_memory_profiling, peak_rss_bytes  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+QUERIES = [
+    "obrigações do custodiante na conciliação de posições",
+    "prazo para comunicar divergências à CVM",
+    "segregação dos ativos próprios e de terceiros",
+    "penalidades por descumprimento das regras de custódia",
+    "plano de continuidade de negócios",
+    "extrato mensal das movimentações para investidores",
+    "controles internos compatíveis com o volume de operações",
+    "verificação de titularidade antes da liquidação",
+    "escrituração de cotas de fundos de investimento",
+    "garantias em câmaras de compensação",
+]
+
+# Métricas em que um valor maior é melhor (as demais são tempos ou memória)
+HIGHER_IS_BETTER = ('mb_per_s', 'chunks_per_s', 'texts_per_s')
+# Métricas de memória verificadas por compare --check-memory
+MEMORY_METRICS = ('allocated_kb', 'peak_kb')
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p99/média em milissegundos"""
+    ordered = sorted(samples)
+    p99_index = min(len(ordered) - 1, int(round(0.99 * (len(ordered) - 1))))
+    return {
+        'p50_ms': round(statistics.median(ordered) * 1000, 3),
+        'p99_ms': round(ordered[p99_index] * 1000, 3),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'samples': len(ordered)
+    }
+
+
+def timed(func: Callable, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def bench_extraction(processor, corpus_dir: str, manifest: Dict) -> Dict[str, Dict]:
+    """Extração de texto por formato: MB/s sobre os arquivos do corpus"""
+    results = {}
+    txt_files = [os.path.join(corpus_dir, d['file']) for d in manifest['documents']]
+    total_bytes = sum(os.path.getsize(path) for path in txt_files)
+    _, elapsed = timed(lambda: [processor._read_txt(path) for path in txt_files])
+    results['txt'] = {'files': len(txt_files), 'mb': round(total_bytes / 2**20, 2),
+                      'seconds': round(elapsed, 4), 'mb_per_s': round(total_bytes / 2**20 / elapsed, 2)}
+
+    pdf_files = [os.path.join(corpus_dir, d['pdf']) for d in manifest['documents'] if 'pdf' in d]
+    if pdf_files:
+        texts, elapsed = timed(lambda: [processor._extract_pdf_text(path) for path in pdf_files])
+        text_bytes = sum(len(text.encode('utf-8')) for text in texts)
+        pages = sum(d.get('pdf_pages', 0) for d in manifest['documents'])
+        results['pdf'] = {'files': len(pdf_files), 'pages': pages, 'seconds': round(elapsed, 4),
+                          'pages_per_s': round(pages / elapsed, 2),
+                          'mb_per_s': round(text_bytes / 2**20 / elapsed, 2)}
+    return results
+
+
+def bench_split(processor, texts: List[str]):
+    """CustomTextSplitter.split_text sobre o corpus inteiro; retorna (métricas, chunks por documento)"""
+    total_bytes = sum(len(text.encode('utf-8')) for text in texts)
+    chunk_lists, elapsed = timed(lambda: [processor.text_splitter.split_text(text) for text in texts])
+    chunks = sum(len(c) for c in chunk_lists)
+    return {'chunks': chunks, 'seconds': round(elapsed, 4),
+            'mb_per_s': round(total_bytes / 2**20 / elapsed, 2),
+            'chunks_per_s': round(chunks / elapsed, 1)}, chunk_lists
+
+
+def bench_embeddings(processor, chunks: List[str], sample: int) -> Dict[str, float]:
+    """Vazão do encode sobre uma amostra de chunks (após um aquecimento)"""
+    sample_chunks = chunks[:sample]
+    processor.encoder.encode_many(sample_chunks[:8])
+    _, elapsed = timed(processor.encoder.encode_many, sample_chunks)
+    return {'texts': len(sample_chunks), 'seconds': round(elapsed, 4),
+            'texts_per_s': round(len(sample_chunks) / elapsed, 1)}
+
+
+def bench_index(processor, texts: List[str], manifest: Dict, max_index_mb: float) -> Dict[str, float]:
+    """Construção do índice (_index_document) até max_index_mb do corpus"""
+    budget = max_index_mb * 2**20
+    indexed_bytes = 0
+    chunks = 0
+    documents = 0
+    started = time.perf_counter()
+    for text, entry in zip(texts, manifest['documents']):
+        if indexed_bytes >= budget:
+            break
+        result = processor._index_document(text, entry['file'], 'txt', entry['file'])
+        chunks += result['chunks_count']
+        indexed_bytes += entry['bytes']
+        documents += 1
+    elapsed = time.perf_counter() - started
+    return {'documents': documents, 'mb': round(indexed_bytes / 2**20, 2), 'chunks': chunks,
+            'seconds': round(elapsed, 4), 'mb_per_s': round(indexed_bytes / 2**20 / elapsed, 2),
+            'chunks_per_s': round(chunks / elapsed, 1)}
+
+
+def bench_queries(func: Callable, queries: int, warmup: int = 3) -> Dict[str, float]:
+    """Latência p50/p99 de func(query) sobre as consultas de exemplo"""
+    for i in range(warmup):
+        func(QUERIES[i % len(QUERIES)])
+    samples = []
+    for i in range(queries):
+        _, elapsed = timed(func, QUERIES[i % len(QUERIES)])
+        samples.append(elapsed)
+    return percentiles(samples)
+
+
+def bench_memory(processor, texts: List[str], manifest: Dict, memory_mb: float, queries: int) -> Dict[str, Dict]:
+    """Memória por etapa (tracemalloc) indexando memory_mb do corpus e buscando
+
+    Usa uma coleção própria para não reindexar ids já gravados.
+    """
+    processor.collection_name = 'bench_memory'
+    processor.collection = processor.chroma_client.create_collection(name='bench_memory')
+    profiler = enable_memory_profiling()
+    try:
+        bench_index(processor, texts, manifest, memory_mb)
+        for i in range(queries):
+            processor.get_document_context(QUERIES[i % len(QUERIES)])
+    finally:
+        disable_memory_profiling()
+
+    memory = {
+        name: {'calls': stage['calls'],
+               'allocated_kb': round(stage['allocated_bytes'] / 1024, 1),
+               'peak_kb': round(stage['peak_bytes'] / 1024, 1)}
+        for name, stage in profiler.report().items()
+    }
+    rss = peak_rss_bytes()
+    if rss is not None:
+        memory['process'] = {'rss_peak_mb': round(rss / 2**20, 1)}
+    return memory
+
+
+def run(args) -> str:
+    corpus_dir = args.corpus or os.path.join(ROOT, 'benchmarks', 'data', f"corpus_{args.scale:g}mb")
+    print(f"Gerando/reaproveitando corpus de {args.scale:g} MB em {corpus_dir}...")
+    manifest = generate_corpus(corpus_dir, args.scale, args.seed, args.pdf_documents)
+
+    # Banco vetorial e índice regulatório descartáveis: não tocam nos dados reais
+    workdir = tempfile.mkdtemp(prefix='custody_bench_')
+    os.environ['CHROMA_PERSIST_DIRECTORY'] = os.path.join(workdir, 'chroma')
+    os.environ['REGULATION_INDEX_PATH'] = os.path.join(workdir, 'regulation_index.sqlite3')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from src.document_processor import DocumentProcessor
+
+    processor, startup = timed(DocumentProcessor)
+    results = {'startup': {'seconds': round(startup, 4)}}
+
+    print("Extração...")
+    results['extraction'] = bench_extraction(processor, corpus_dir, manifest)
+    texts = [processor._read_txt(os.path.join(corpus_dir, d['file'])) for d in manifest['documents']]
+
+    print("Divisão em chunks...")
+    results['split_text'], chunk_lists = bench_split(processor, texts)
+
+    print("Embeddings...")
+    all_chunks = [chunk for chunks in chunk_lists for chunk in chunks]
+    results['embeddings'] = bench_embeddings(processor, all_chunks, args.embed_sample)
+
+    print(f"Construção do índice (até {args.max_index_mb:g} MB)...")
+    results['index_build'] = bench_index(processor, texts, manifest, args.max_index_mb)
+
+    print("Consultas...")
+    results['search'] = bench_queries(lambda q: processor.search_documents(q, n_results=args.k), args.queries)
+    results['document_context'] = bench_queries(processor.get_document_context, args.queries)
+
+    if args.memory_mb > 0:
+        print(f"Memória por etapa (até {args.memory_mb:g} MB, tracemalloc)...")
+        results['memory'] = bench_memory(processor, texts, manifest, args.memory_mb, min(args.queries, 10))
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'embeddings_model': os.getenv('EMBEDDINGS_MODEL', 'all-MiniLM-L6-v2'),
+            'scale_mb': args.scale,
+            'seed': args.seed,
+            'corpus_mb': round(manifest['bytes'] / 2**20, 2),
+            'documents': len(manifest['documents']),
+            'queries': args.queries,
+            'k': args.k
+        },
+        'results': results
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{report['meta']['commit']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_results(results)
+    print(f"\nResultados salvos em {output}")
+    return output
+
+
+def flatten(results: Dict, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def print_results(results: Dict):
+    print(f"\n{'métrica':<40} {'valor':>12}")
+    for name, value in flatten(results).items():
+        print(f"{name:<40} {value:>12}")
+
+
+def compare(args):
+    """Diferença percentual métrica a métrica entre dois resultados"""
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate = json.load(f)
+
+    print(f"base: {baseline['meta']['commit']} ({baseline['meta']['timestamp']})  "
+          f"candidato: {candidate['meta']['commit']} ({candidate['meta']['timestamp']})")
+    if baseline['meta'].get('scale_mb') != candidate['meta'].get('scale_mb'):
+        print("Aviso: resultados com escalas de corpus diferentes")
+
+    before = flatten(baseline['results'])
+    after = flatten(candidate['results'])
+    memory_regressions = []
+    print(f"\n{'métrica':<40} {'base':>12} {'candidato':>12} {'Δ%':>8}")
+    for name in before:
+        if name not in after or name.endswith(('samples', 'files', 'documents', 'pages', 'calls')):
+            continue
+        old, new = before[name], after[name]
+        delta = (new - old) / old * 100 if old else 0.0
+        better = delta > 0 if name.endswith(HIGHER_IS_BETTER) else delta < 0
+        marker = '' if abs(delta) < args.threshold else (' +' if better else ' !')
+        print(f"{name:<40} {old:>12} {new:>12} {delta:>7.1f}%{marker}")
+        if name.startswith('memory.') and name.endswith(MEMORY_METRICS) and delta > args.memory_threshold:
+            memory_regressions.append(f"{name}: {old} -> {new} KB ({delta:+.1f}%)")
+
+    if args.check_memory:
+        if memory_regressions:
+            print(f"\nRegressões de alocação acima de {args.memory_threshold:g}%:")
+            for regression in memory_regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nSem regressões de alocação acima de {args.memory_threshold:g}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks do pipeline de documentos")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Executar a suíte')
+    run_parser.add_argument('--scale', type=float, default=1, help='Tamanho do corpus em MB (1, 10 ou 100)')
+    run_parser.add_argument('--corpus', help='Diretório do corpus (padrão: benchmarks/data/corpus_<N>mb)')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--pdf-documents', type=int, default=2, help='Documentos também medidos em PDF')
+    run_parser.add_argument('--embed-sample', type=int, default=256, help='Chunks na medição de embeddings')
+    run_parser.add_argument('--max-index-mb', type=float, default=5, help='Limite do corpus indexado')
+    run_parser.add_argument('--queries', type=int, default=50, help='Consultas por medição de latência')
+    run_parser.add_argument('--k', type=int, default=10, help='Resultados por busca')
+    run_parser.add_argument('--memory-mb', type=float, default=1,
+                            help='Corpus indexado na passada de memória (0 desativa)')
+    run_parser.add_argument('--output', help='Arquivo JSON de saída')
+
+    compare_parser = subparsers.add_parser('compare', help='Comparar dois resultados')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=5.0,
+                                help='Variação (%%) a partir da qual a métrica é marcada')
+    compare_parser.add_argument('--check-memory', action='store_true',
+                                help='Sair com código 1 se a alocação de alguma etapa crescer além do limite')
+    compare_parser.add_argument('--memory-threshold', type=float, default=10.0,
+                                help='Crescimento (%%) de alocação tolerado por etapa')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()
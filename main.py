@@ -4,25 +4,115 @@ Sistema de Geração de PRDs e Features para Carteira de Custódia Brasileira
 usando CrewAI com processamento inteligente de documentos.
 """
 
+import atexit
 import click
+import hashlib
+import json
 import os
+import threading
 from dotenv import load_dotenv
 try:
     from src.crew import CustodyPRDCrew
     CREWAI_AVAILABLE = True
 except ImportError:
-    from src.simple_agents import SimpleCustodySystem
     CREWAI_AVAILABLE = False
+from src.simple_agents import SimpleCustodySystem
+from src.batch_runner import BatchRunner, load_jobs
+from src.checkpoints import RunCheckpoint
 from src.document_processor import DocumentProcessor
+from src.ingestion_queue import IngestionQueue, IngestionWorker, infer_file_type
+from src.llm.clients import run_async
+from src.prd_features import feature_filename
+from src.regulation.extractor import ITEM_TYPES, deadline_label
+from src.regulation.index import get_regulation_index
+from src.tenants import set_default_tenant, tenant_from_collection
 from src.utils.logger import setup_logger
+from src.utils.memory_profiler import active_profiler, enable_memory_profiling
+from src.utils.metrics import REGISTRY, start_metrics_server
+from src.utils.streaming import StreamingOutput
+from src.utils.tracing import enable_tracing
+from src.watcher import DirectoryWatcher
 
 load_dotenv()
 logger = setup_logger(__name__)
 
+def _generate_to_file(output_file: str, generate, stream: bool):
+    """Executar geração e salvar resultado, opcionalmente via streaming
+    
+    generate recebe o callback on_token (ou None) e retorna o documento final.
+    Retorna (resultado, estatísticas do streaming ou None).
+    """
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    
+    if not stream:
+        result = generate(None)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(result)
+        return result, None
+    
+    with StreamingOutput(output_file) as streaming:
+        result = generate(streaming.on_token)
+        streaming.finalize(result)
+    return result, streaming.stats()
+
+def _open_checkpoint(system, pipeline: str, params: dict, resume: str = None) -> RunCheckpoint:
+    """Abrir (ou retomar) o checkpoint da execução e informar o run id"""
+    checkpoint = RunCheckpoint.open(pipeline, type(system).__name__, params, resume=resume)
+    click.echo(f"🔖 Execução: {checkpoint.run_id}")
+    return checkpoint
+
+def _echo_resume_hint(checkpoint: RunCheckpoint):
+    """Indicar como retomar uma execução que falhou"""
+    if checkpoint is not None:
+        click.echo(f"↩️  Para retomar das etapas pendentes use: --resume {checkpoint.run_id}")
+
+def _echo_result(result: str, stats):
+    """Exibir prévia do resultado ou métricas do streaming"""
+    if stats is None:
+        click.echo(f"\n{result[:500]}...")
+        return
+    
+    ttft = stats['time_to_first_token']
+    ttft_text = f"{ttft:.2f}s" if ttft is not None else "n/a"
+    click.echo(
+        f"⏱️  Primeiro token: {ttft_text} | Tokens: {stats['tokens']} | "
+        f"{stats['tokens_per_second']:.1f} tokens/s | Total: {stats['total_time']:.1f}s"
+    )
+
+def _echo_memory_report():
+    """Exibir o relatório de memória por etapa (--profile-memory)"""
+    profiler = active_profiler()
+    if profiler is not None and profiler.stages:
+        click.echo("\n🧠 Memória por etapa:", err=True)
+        click.echo(profiler.format_report(), err=True)
+
 @click.group()
-def cli():
+@click.option('--trace-file', envvar='TRACE_FILE', default=None,
+              help='Gravar spans de tracing (JSON-lines) neste arquivo')
+@click.option('--metrics-file', envvar='METRICS_FILE', default=None,
+              help='Gravar métricas (formato Prometheus) neste arquivo ao final')
+@click.option('--metrics-port', envvar='METRICS_PORT', type=int, default=None,
+              help='Expor métricas em http://127.0.0.1:<porta>/metrics durante a execução')
+@click.option('--profile-memory', envvar='PROFILE_MEMORY', is_flag=True, default=False,
+              help='Medir memória por etapa do pipeline (tracemalloc e pico de RSS) e exibir relatório ao final')
+@click.option('--tenant', envvar='TENANT', default=None,
+              help='Cliente (tenant) cuja base de conhecimento é usada; padrão: base compartilhada')
+def cli(trace_file, metrics_file, metrics_port, profile_memory, tenant):
     """Sistema de Geração de PRDs e Features para Carteira de Custódia"""
-    pass
+    try:
+        set_default_tenant(tenant)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--tenant')
+    if profile_memory:
+        enable_memory_profiling()
+        atexit.register(_echo_memory_report)
+    if trace_file:
+        enable_tracing(trace_file)
+    if metrics_file:
+        atexit.register(REGISTRY.write, metrics_file)
+    if metrics_port:
+        start_metrics_server(metrics_port)
+        logger.info(f"Métricas disponíveis em http://127.0.0.1:{metrics_port}/metrics")
 
 @cli.command()
 @click.option('--file-path', required=True, help='Caminho para o arquivo PDF, TXT ou URL')
@@ -38,86 +128,364 @@ def upload_document(file_path: str, file_type: str):
         click.echo(f"❌ Erro ao processar documento: {str(e)}")
         logger.error(f"Erro no upload: {str(e)}")
 
+def _echo_job(job: dict):
+    """Linha de status de um job de ingestão"""
+    detail = f"{job['status']} {job['progress']:.0%}"
+    if job['status'] == 'running' and job['stage']:
+        detail += f" · {job['stage']} {job['done']}/{job['total']}"
+    action = " (remoção)" if job['action'] == 'remove' else ""
+    click.echo(f"  • #{job['id']} [{detail}] {job['source']}{action} ({job['tenant']}, "
+               f"tentativa {job['attempts']}/{job['max_attempts']})")
+    if job['status'] == 'done' and job['result']:
+        result = json.loads(job['result'])
+        if job['action'] == 'remove':
+            click.echo(f"    {result.get('removed_chunks', 0)} chunks removidos")
+        else:
+            click.echo(f"    {result.get('chunks_count', 0)} chunks indexados")
+    elif job['error']:
+        click.echo(f"    ❌ {job['error']}")
+
+@cli.command()
+@click.option('--file-path', 'file_paths', multiple=True, help='Arquivo PDF/TXT ou URL (repetível)')
+@click.option('--directory', default=None, type=click.Path(exists=True, file_okay=False),
+              help='Enfileirar todos os PDFs e TXTs do diretório (recursivo)')
+@click.option('--file-type', type=click.Choice(['pdf', 'txt', 'url']), default=None,
+              help='Tipo do documento (padrão: pela extensão)')
+@click.option('--max-attempts', default=3, show_default=True, help='Tentativas por job antes de falhar')
+def enqueue(file_paths: tuple, directory: str = None, file_type: str = None, max_attempts: int = 3):
+    """Enfileirar documentos para ingestão em segundo plano (processados pelo comando worker)"""
+    try:
+        sources = list(file_paths)
+        if directory:
+            for root, _, files in os.walk(directory):
+                sources.extend(os.path.join(root, name) for name in sorted(files) if infer_file_type(name))
+        if not sources:
+            click.echo("📭 Nenhum documento informado (use --file-path ou --directory).")
+            return
+        
+        queue = IngestionQueue()
+        created = 0
+        for source in sources:
+            source_type = file_type or infer_file_type(source)
+            if source_type is None:
+                click.echo(f"  ⚠️  Tipo não reconhecido, ignorado: {source}")
+                continue
+            if source_type != 'url':
+                source = os.path.abspath(source)
+            job = queue.enqueue(source, source_type, max_attempts=max_attempts)
+            created += job['created']
+            click.echo(f"  • #{job['id']} {source}" + ("" if job['created'] else " (já na fila)"))
+        
+        click.echo(f"✅ {created} jobs enfileirados. Acompanhe com: python main.py status")
+        
+    except Exception as e:
+        click.echo(f"❌ Erro ao enfileirar documentos: {str(e)}")
+        logger.error(f"Erro ao enfileirar documentos: {str(e)}")
+
+@cli.command()
+@click.option('--job-id', type=int, default=None, help='Mostrar apenas este job')
+@click.option('--status', 'status_filter', type=click.Choice(['queued', 'running', 'done', 'failed']),
+              default=None, help='Filtrar por status')
+@click.option('--limit', default=20, show_default=True, help='Número máximo de jobs listados')
+def status(job_id: int = None, status_filter: str = None, limit: int = 20):
+    """Status e progresso dos jobs de ingestão"""
+    try:
+        queue = IngestionQueue()
+        if job_id is not None:
+            job = queue.get(job_id)
+            if job is None:
+                click.echo(f"❌ Job #{job_id} não encontrado")
+                return
+            _echo_job(job)
+            return
+        
+        counts = queue.counts()
+        click.echo("📋 Fila de ingestão: " + ", ".join(
+            f"{counts.get(name, 0)} {name}" for name in ('queued', 'running', 'done', 'failed')))
+        for job in queue.jobs(status_filter, limit):
+            _echo_job(job)
+            
+    except Exception as e:
+        click.echo(f"❌ Erro ao consultar a fila: {str(e)}")
+
+@cli.command()
+@click.option('--concurrency', default=2, show_default=True, help='Jobs processados simultaneamente')
+@click.option('--lease-seconds', default=60.0, show_default=True,
+              help='Validade do lease; jobs de um worker que morreu voltam à fila após esse tempo')
+@click.option('--poll-interval', default=2.0, show_default=True, help='Intervalo (s) de consulta à fila vazia')
+@click.option('--backoff-seconds', default=30.0, show_default=True,
+              help='Espera antes da 1ª retentativa (dobra a cada falha)')
+@click.option('--exit-when-empty', is_flag=True, help='Sair quando não houver jobs pendentes')
+def worker(concurrency: int, lease_seconds: float = 60.0, poll_interval: float = 2.0,
+           backoff_seconds: float = 30.0, exit_when_empty: bool = False):
+    """Processar jobs da fila de ingestão (Ctrl+C termina os jobs em andamento)"""
+    try:
+        ingestion_worker = IngestionWorker(
+            IngestionQueue(),
+            concurrency=concurrency,
+            lease_seconds=lease_seconds,
+            poll_interval=poll_interval,
+            backoff_seconds=backoff_seconds
+        )
+        click.echo(f"👷 Worker iniciado ({concurrency} jobs simultâneos). Ctrl+C para encerrar.")
+        processed = ingestion_worker.run(exit_when_empty=exit_when_empty)
+        click.echo(f"✅ Worker encerrado: {processed['done']} concluídos, "
+                   f"{processed['queued']} reenfileirados, {processed['failed']} falhas")
+        
+    except Exception as e:
+        click.echo(f"❌ Erro no worker: {str(e)}")
+        logger.error(f"Erro no worker: {str(e)}")
+
+@cli.command()
+@click.option('--directory', default=None, help='Diretório monitorado (padrão: DOCUMENTS_DIRECTORY)')
+@click.option('--debounce', default=2.0, show_default=True,
+              help='Segundos sem novos eventos antes de conferir um arquivo')
+@click.option('--polling', 'force_polling', is_flag=True, help='Usar varredura periódica em vez de inotify')
+@click.option('--poll-interval', default=2.0, show_default=True, help='Intervalo (s) da varredura no modo polling')
+@click.option('--concurrency', default=2, show_default=True, help='Jobs de ingestão simultâneos do worker embutido')
+@click.option('--no-worker', is_flag=True, help='Só enfileirar; os jobs ficam para o comando worker')
+def watch(directory: str = None, debounce: float = 2.0, force_polling: bool = False,
+          poll_interval: float = 2.0, concurrency: int = 2, no_worker: bool = False):
+    """Indexar automaticamente documentos novos, alterados e removidos de um diretório"""
+    directory = directory or os.getenv('DOCUMENTS_DIRECTORY', './documents')
+    if not os.path.isdir(directory):
+        click.echo(f"❌ Diretório não encontrado: {directory}")
+        return
+    
+    ingestion_worker = None
+    worker_thread = None
+    try:
+        queue = IngestionQueue()
+        watcher = DirectoryWatcher(directory, queue, debounce=debounce,
+                                   poll_interval=poll_interval, force_polling=force_polling)
+        if not no_worker:
+            ingestion_worker = IngestionWorker(queue, concurrency=concurrency, poll_interval=0.5)
+            worker_thread = threading.Thread(target=ingestion_worker.run, name="watch-worker", daemon=True)
+            worker_thread.start()
+        
+        click.echo(f"👀 Monitorando {os.path.abspath(directory)} (tenant {watcher.tenant}). Ctrl+C para encerrar.")
+        watcher.run()
+        
+    except KeyboardInterrupt:
+        click.echo("\n⏹️  Encerrando: terminando os jobs em andamento (Ctrl+C de novo para sair já)")
+    except Exception as e:
+        click.echo(f"❌ Erro no watch: {str(e)}")
+        logger.error(f"Erro no watch: {str(e)}")
+    
+    if worker_thread is not None:
+        ingestion_worker.stop()
+        try:
+            while worker_thread.is_alive():
+                worker_thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            ingestion_worker.release_active()
+
 @cli.command()
 @click.option('--request', required=True, help='Descrição do pedido para PRD')
 @click.option('--context', help='Contexto adicional (opcional)')
-def generate_prd(request: str, context: str = None):
+@click.option('--stream', is_flag=True, help='Escrever tokens no arquivo e no terminal conforme são gerados')
+@click.option('--resume', default=None, help='Retomar execução anterior (run id), pulando etapas concluídas')
+@click.option('--parallel-sections', is_flag=True,
+              help='Gerar as seções do PRD em chamadas paralelas, com busca por seção (modo simplificado)')
+def generate_prd(request: str, context: str = None, stream: bool = False,
+                 resume: str = None, parallel_sections: bool = False):
     """Gerar PRD baseado no pedido do usuário"""
+    checkpoint = None
     try:
-        if CREWAI_AVAILABLE:
-            crew = CustodyPRDCrew()
-            result = crew.generate_prd(request, context)
-        else:
+        if parallel_sections:
+            # CrewAI não executa tasks concorrentes: o modo paralelo usa os agentes diretos
             system = SimpleCustodySystem()
-            result = system.generate_prd(request, context)
+            checkpoint = _open_checkpoint(
+                system, 'generate_prd_parallel', {'request': request, 'context': context}, resume
+            )
+            generate = lambda on_token: run_async(system.agenerate_prd_parallel(
+                request, context, on_token=on_token, checkpoint=checkpoint
+            ))
+        else:
+            system = CustodyPRDCrew() if CREWAI_AVAILABLE else SimpleCustodySystem()
+            checkpoint = _open_checkpoint(system, 'generate_prd', {'request': request, 'context': context}, resume)
+            generate = lambda on_token: system.generate_prd(request, context, on_token=on_token, checkpoint=checkpoint)
         
         # Salvar resultado
         output_file = f"output/prd_{hash(request) % 10000}.md"
-        os.makedirs('output', exist_ok=True)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(result)
+        result, stats = _generate_to_file(output_file, generate, stream)
         
         click.echo(f"✅ PRD gerado com sucesso!")
         click.echo(f"📄 Salvo em: {output_file}")
-        click.echo(f"\n{result[:500]}...")
+        _echo_result(result, stats)
         
     except Exception as e:
         click.echo(f"❌ Erro ao gerar PRD: {str(e)}")
+        _echo_resume_hint(checkpoint)
         logger.error(f"Erro na geração de PRD: {str(e)}")
 
 @cli.command()
 @click.option('--request', required=True, help='Descrição da feature desejada')
 @click.option('--context', help='Contexto adicional (opcional)')
-def generate_features(request: str, context: str = None):
+@click.option('--stream', is_flag=True, help='Escrever tokens no arquivo e no terminal conforme são gerados')
+@click.option('--resume', default=None, help='Retomar execução anterior (run id), pulando etapas concluídas')
+def generate_features(request: str, context: str = None, stream: bool = False,
+                      resume: str = None):
     """Gerar features detalhadas baseadas no pedido"""
+    checkpoint = None
     try:
-        if CREWAI_AVAILABLE:
-            crew = CustodyPRDCrew()
-            result = crew.generate_features(request, context)
-        else:
-            system = SimpleCustodySystem()
-            result = system.generate_features(request, context)
+        system = CustodyPRDCrew() if CREWAI_AVAILABLE else SimpleCustodySystem()
+        checkpoint = _open_checkpoint(system, 'generate_features', {'request': request, 'context': context}, resume)
         
         # Salvar resultado
         output_file = f"output/features_{hash(request) % 10000}.md"
-        os.makedirs('output', exist_ok=True)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(result)
+        result, stats = _generate_to_file(
+            output_file,
+            lambda on_token: system.generate_features(request, context, on_token=on_token, checkpoint=checkpoint),
+            stream
+        )
         
         click.echo(f"✅ Features geradas com sucesso!")
         click.echo(f"📄 Salvo em: {output_file}")
-        click.echo(f"\n{result[:500]}...")
+        _echo_result(result, stats)
         
     except Exception as e:
         click.echo(f"❌ Erro ao gerar features: {str(e)}")
+        _echo_resume_hint(checkpoint)
         logger.error(f"Erro na geração de features: {str(e)}")
 
+@cli.command()
+@click.option('--prd-file', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='PRD em markdown de onde as features serão extraídas')
+@click.option('--context', help='Contexto adicional (opcional)')
+@click.option('--output-dir', default='output', show_default=True,
+              help='Diretório das especificações (features_NN_slug.md)')
+@click.option('--concurrency', default=4, show_default=True, help='Especificações geradas simultaneamente')
+@click.option('--max-features', type=int, default=None, help='Limitar o número de features')
+@click.option('--resume', default=None, help='Retomar execução anterior (run id), pulando etapas concluídas')
+def generate_features_from_prd(prd_file: str, context: str = None, output_dir: str = 'output',
+                               concurrency: int = 4, max_features: int = None, resume: str = None):
+    """Gerar especificações de todas as features de um PRD
+    
+    A análise regulatória é feita uma vez e as especificações são geradas em paralelo.
+    """
+    checkpoint = None
+    try:
+        with open(prd_file, 'r', encoding='utf-8') as f:
+            prd_text = f.read()
+        
+        # CrewAI não executa tasks concorrentes: o fan-out usa os agentes diretos
+        system = SimpleCustodySystem()
+        
+        def save(index, feature, spec):
+            output_file = os.path.join(output_dir, feature_filename(index, feature['title']))
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(spec)
+            click.echo(f"📄 {output_file}")
+        
+        async def plan_and_generate():
+            # Planejamento e geração no mesmo event loop (e no mesmo pool HTTP)
+            nonlocal checkpoint
+            features = await system.aplan_features(prd_text, max_features)
+            if not features:
+                return features
+            
+            click.echo(f"🧩 {len(features)} features identificadas:")
+            for index, feature in enumerate(features, 1):
+                click.echo(f"  {index:02d}. {feature['title']}")
+            
+            checkpoint = _open_checkpoint(
+                system, 'generate_features_from_prd',
+                {
+                    'prd_sha256': hashlib.sha256(prd_text.encode('utf-8')).hexdigest(),
+                    'features': [feature['title'] for feature in features],
+                    'context': context
+                },
+                resume
+            )
+            os.makedirs(output_dir, exist_ok=True)
+            await system.agenerate_features_from_prd(
+                prd_text, features, context,
+                max_concurrency=concurrency, on_feature=save, checkpoint=checkpoint
+            )
+            return features
+        
+        features = run_async(plan_and_generate())
+        if not features:
+            click.echo("📭 Nenhuma feature identificada no PRD.")
+            return
+        
+        click.echo(f"✅ {len(features)} especificações geradas em {output_dir}")
+        
+    except Exception as e:
+        click.echo(f"❌ Erro ao gerar features a partir do PRD: {str(e)}")
+        _echo_resume_hint(checkpoint)
+        logger.error(f"Erro na geração de features a partir do PRD: {str(e)}")
+
 @cli.command()
 @click.option('--regulation-area', required=True, help='Área regulatória para análise')
-def analyze_compliance(regulation_area: str):
+@click.option('--stream', is_flag=True, help='Escrever tokens no arquivo e no terminal conforme são gerados')
+@click.option('--resume', default=None, help='Retomar execução anterior (run id), pulando etapas concluídas')
+def analyze_compliance(regulation_area: str, stream: bool = False,
+                       resume: str = None):
     """Análise focada em compliance regulatório"""
+    checkpoint = None
     try:
-        if CREWAI_AVAILABLE:
-            crew = CustodyPRDCrew()
-            result = crew.analyze_compliance(regulation_area)
-        else:
-            system = SimpleCustodySystem()
-            result = system.analyze_compliance(regulation_area)
+        system = CustodyPRDCrew() if CREWAI_AVAILABLE else SimpleCustodySystem()
+        checkpoint = _open_checkpoint(system, 'analyze_compliance', {'regulation_area': regulation_area}, resume)
         
         # Salvar resultado
         output_file = f"output/compliance_{hash(regulation_area) % 10000}.md"
-        os.makedirs('output', exist_ok=True)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(result)
+        result, stats = _generate_to_file(
+            output_file,
+            lambda on_token: system.analyze_compliance(regulation_area, on_token=on_token, checkpoint=checkpoint),
+            stream
+        )
         
         click.echo(f"✅ Análise de compliance concluída!")
         click.echo(f"📄 Salvo em: {output_file}")
-        click.echo(f"\n{result[:500]}...")
+        _echo_result(result, stats)
         
     except Exception as e:
         click.echo(f"❌ Erro na análise de compliance: {str(e)}")
+        _echo_resume_hint(checkpoint)
         logger.error(f"Erro na análise de compliance: {str(e)}")
 
+@cli.command()
+@click.option('--jobs-file', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='Arquivo JSONL com jobs {"type": "prd|features|compliance", "request": ..., "context": ...}')
+@click.option('--output-dir', default='output/batch', show_default=True, help='Diretório de saída dos jobs')
+@click.option('--concurrency', default=4, show_default=True, help='Número máximo de jobs simultâneos')
+@click.option('--jobs-per-minute', type=int, default=None, help='Limite de jobs iniciados por minuto')
+@click.option('--max-retries', default=3, show_default=True, help='Tentativas extras por job em caso de erro')
+def generate_batch(jobs_file: str, output_dir: str, concurrency: int,
+                   jobs_per_minute: int = None, max_retries: int = 3):
+    """Gerar PRDs, features e análises de compliance em lote a partir de JSONL
+    
+    Jobs já concluídos em execuções anteriores (mesmo --output-dir) são pulados.
+    """
+    try:
+        jobs = load_jobs(jobs_file)
+        if not jobs:
+            click.echo("📭 Nenhum job encontrado no arquivo.")
+            return
+        
+        system = CustodyPRDCrew() if CREWAI_AVAILABLE else SimpleCustodySystem()
+        runner = BatchRunner(
+            system,
+            output_dir=output_dir,
+            max_concurrency=concurrency,
+            max_retries=max_retries,
+            jobs_per_minute=jobs_per_minute
+        )
+        summary = runner.run(jobs)
+        
+        click.echo(f"✅ Lote concluído: {summary['done']} gerados, "
+                   f"{summary['skipped']} já existentes, {len(summary['failed'])} falhas "
+                   f"(total {summary['total']})")
+        click.echo(f"📁 Saídas em: {output_dir}")
+        for failure in summary['failed']:
+            click.echo(f"  ❌ {failure['job_id']}: {failure['error']}")
+            
+    except Exception as e:
+        click.echo(f"❌ Erro na geração em lote: {str(e)}")
+        logger.error(f"Erro na geração em lote: {str(e)}")
+
 @cli.command()
 def list_documents():
     """Listar documentos indexados"""
@@ -136,6 +504,28 @@ def list_documents():
     except Exception as e:
         click.echo(f"❌ Erro ao listar documentos: {str(e)}")
 
+@cli.command()
+def list_tenants():
+    """Listar tenants com base de conhecimento e o número de chunks"""
+    try:
+        processor = DocumentProcessor()
+        tenants = []
+        for collection in processor.chroma_client.list_collections():
+            tenant = tenant_from_collection(collection.name)
+            if tenant is not None:
+                tenants.append((tenant, collection.count()))
+        
+        if not tenants:
+            click.echo("📭 Nenhuma base de conhecimento encontrada.")
+            return
+        
+        click.echo("🏢 Tenants:")
+        for tenant, chunks in sorted(tenants):
+            click.echo(f"  • {tenant} - {chunks} chunks")
+            
+    except Exception as e:
+        click.echo(f"❌ Erro ao listar tenants: {str(e)}")
+
 @cli.command()
 def setup_database():
     """Inicializar base de dados vetorial"""
@@ -146,5 +536,52 @@ def setup_database():
     except Exception as e:
         click.echo(f"❌ Erro ao inicializar base de dados: {str(e)}")
 
+@cli.command()
+def build_regulation_index():
+    """Reconstruir o índice regulatório a partir dos documentos já indexados"""
+    try:
+        processor = DocumentProcessor()
+        totals = processor.regulation_index.rebuild_from_collection(processor.collection)
+        click.echo(f"✅ Índice regulatório: {totals['sources']} documentos, "
+                   f"{totals['chunks']} chunks, {totals['items']} itens extraídos")
+
+        stats = processor.regulation_index.stats()
+        for item_type in ITEM_TYPES:
+            click.echo(f"  • {item_type}: {stats.get(item_type, 0)}")
+        click.echo(f"  • citações entre normas: {stats.get('citations', 0)}")
+
+    except Exception as e:
+        click.echo(f"❌ Erro ao construir índice regulatório: {str(e)}")
+        logger.error(f"Erro ao construir índice regulatório: {str(e)}")
+
+@cli.command()
+@click.option('--min-days', type=int, default=None, help='Prazo mínimo em dias corridos')
+@click.option('--max-days', type=int, default=None, help='Prazo máximo em dias corridos (ex.: 30)')
+@click.option('--business-days/--calendar-days', default=None,
+              help='Somente prazos em dias úteis (ou somente os demais)')
+@click.option('--topic', default=None, help='Restringir a chunks relevantes ao tópico')
+@click.option('--source', 'sources', multiple=True, help='Restringir a um documento (repetível)')
+@click.option('--limit', default=50, show_default=True, help='Número máximo de prazos')
+def list_deadlines(min_days: int = None, max_days: int = None, business_days: bool = None,
+                   topic: str = None, sources: tuple = (), limit: int = 50):
+    """Listar prazos regulatórios normalizados por faixa de dias"""
+    try:
+        index = get_regulation_index()
+        deadlines = index.deadlines(min_days, max_days, business_days, topic, sources, limit)
+
+        if not deadlines:
+            click.echo("📭 Nenhum prazo encontrado na faixa (execute build-regulation-index se necessário).")
+            return
+
+        click.echo(f"⏰ Prazos ({len(deadlines)}):")
+        for item in deadlines:
+            click.echo(f"  • {deadline_label(item)} — "
+                       f"{item['source']} (chunk {item['chunk_index']})")
+            click.echo(f"    {item['text']}")
+
+    except Exception as e:
+        click.echo(f"❌ Erro ao listar prazos: {str(e)}")
+        logger.error(f"Erro ao listar prazos: {str(e)}")
+
 if __name__ == '__main__':
     cli()
\ No newline at end of file
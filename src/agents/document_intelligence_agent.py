@@ -4,8 +4,7 @@ de regulamentação financeira brasileira (CVM, BACEN, AMBIMA)
 """
 
 from crewai import Agent
-from langchain_openai import ChatOpenAI
-import os
+from src.llm.clients import get_chat_llm
 
 def create_document_intelligence_agent():
     """Criar agente especializado em inteligência documental"""
@@ -32,10 +31,7 @@ def create_document_intelligence_agent():
         - Interpretação de normas técnicas complexas""",
         verbose=True,
         allow_delegation=False,
-        llm=ChatOpenAI(
-            model=os.getenv('OPENAI_MODEL_NAME', 'gpt-4-turbo-preview'),
-            temperature=0.1
-        )
+        llm=get_chat_llm(temperature=0.1)
     )
 
 
@@ -69,8 +65,5 @@ def create_document_analysis_specialist():
         - Requisitos de backup e continuidade""",
         verbose=True,
         allow_delegation=False,
-        llm=ChatOpenAI(
-            model=os.getenv('OPENAI_MODEL_NAME', 'gpt-4-turbo-preview'),
-            temperature=0.2
-        )
+        llm=get_chat_llm(temperature=0.2)
     )
\ No newline at end of file
@@ -4,8 +4,7 @@ para sistemas de custódia baseados em requisitos e conhecimento especializado
 """
 
 from crewai import Agent
-from langchain_openai import ChatOpenAI
-import os
+from src.llm.clients import get_chat_llm
 
 def create_feature_engineering_agent():
     """Criar agente especializado em engenharia de features"""
@@ -53,10 +52,7 @@ def create_feature_engineering_agent():
         - Chaos engineering practices""",
         verbose=True,
         allow_delegation=True,
-        llm=ChatOpenAI(
-            model=os.getenv('OPENAI_MODEL_NAME', 'gpt-4-turbo-preview'),
-            temperature=0.2
-        )
+        llm=get_chat_llm(temperature=0.2)
     )
 
 
@@ -105,10 +101,7 @@ def create_technical_architect_agent():
         - Trade lifecycle management""",
         verbose=True,
         allow_delegation=False,
-        llm=ChatOpenAI(
-            model=os.getenv('OPENAI_MODEL_NAME', 'gpt-4-turbo-preview'),
-            temperature=0.15
-        )
+        llm=get_chat_llm(temperature=0.15)
     )
 
 
@@ -157,8 +150,5 @@ def create_qa_specialist_agent():
         - Environment provisioning""",
         verbose=True,
         allow_delegation=False,
-        llm=ChatOpenAI(
-            model=os.getenv('OPENAI_MODEL_NAME', 'gpt-4-turbo-preview'),
-            temperature=0.1
-        )
+        llm=get_chat_llm(temperature=0.1)
     )
\ No newline at end of file
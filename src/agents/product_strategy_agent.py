@@ -4,8 +4,7 @@ para produtos de carteira de custódia brasileira
 """
 
 from crewai import Agent
-from langchain_openai import ChatOpenAI
-import os
+from src.llm.clients import get_chat_llm
 
 def create_product_strategy_agent():
     """Criar agente especializado em estratégia de produto"""
@@ -43,10 +42,7 @@ def create_product_strategy_agent():
         - Padrões de dados financeiros (ISO 20022, FIX)""",
         verbose=True,
         allow_delegation=True,
-        llm=ChatOpenAI(
-            model=os.getenv('OPENAI_MODEL_NAME', 'gpt-4-turbo-preview'),
-            temperature=0.3
-        )
+        llm=get_chat_llm(temperature=0.3)
     )
 
 
@@ -88,8 +84,5 @@ def create_business_analyst_agent():
         - Mockups e Wireframes conceituais""",
         verbose=True,
         allow_delegation=False,
-        llm=ChatOpenAI(
-            model=os.getenv('OPENAI_MODEL_NAME', 'gpt-4-turbo-preview'),
-            temperature=0.2
-        )
+        llm=get_chat_llm(temperature=0.2)
     )
\ No newline at end of file
@@ -0,0 +1,279 @@
+"""
+Execução em lote de gerações (PRD, features, compliance) a partir de um arquivo JSONL
+Concorrência limitada, rate limiting, retry e retomada após interrupção
+"""
+
+import asyncio
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from src.checkpoints import RunCheckpoint, run_id_for
+from src.llm.clients import run_async
+from src.tenants import normalize_tenant, tenant_scope
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Tipo de job -> (método assíncrono, método síncrono) do sistema de agentes
+JOB_TYPES = {
+    'prd': ('agenerate_prd', 'generate_prd'),
+    'features': ('agenerate_features', 'generate_features'),
+    'compliance': ('aanalyze_compliance', 'analyze_compliance')
+}
+
+MANIFEST_FILENAME = "batch_manifest.jsonl"
+
+
+def job_id_for(job_type: str, request: str, context: Optional[str], tenant: Optional[str] = None) -> str:
+    """ID estável de um job (independe de PYTHONHASHSEED)"""
+    fields = [job_type, request, context or ""]
+    if tenant:
+        fields.append(tenant)
+    payload = json.dumps(fields, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:10]
+
+
+def load_jobs(jobs_file: str) -> List[Dict[str, Any]]:
+    """Ler e validar jobs de um arquivo JSONL
+
+    Cada linha: {"type": "prd|features|compliance", "request": "...",
+    "context": "..." (opcional), "id": "..." (opcional), "tenant": "..." (opcional;
+    base de conhecimento do cliente, padrão: a do processo)}
+    """
+    jobs = []
+    seen_ids = set()
+
+    with open(jobs_file, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            try:
+                raw = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Linha {line_number}: JSON inválido ({e})")
+
+            job_type = raw.get('type')
+            if job_type not in JOB_TYPES:
+                raise ValueError(
+                    f"Linha {line_number}: tipo '{job_type}' inválido "
+                    f"(use {', '.join(JOB_TYPES)})"
+                )
+
+            request = (raw.get('request') or '').strip()
+            if not request:
+                raise ValueError(f"Linha {line_number}: campo 'request' obrigatório")
+
+            context = raw.get('context')
+            tenant = raw.get('tenant')
+            if tenant:
+                try:
+                    tenant = normalize_tenant(tenant)
+                except ValueError as e:
+                    raise ValueError(f"Linha {line_number}: {e}")
+            job_id = str(raw.get('id') or job_id_for(job_type, request, context, tenant))
+            if job_id in seen_ids:
+                raise ValueError(f"Linha {line_number}: id de job duplicado '{job_id}'")
+            seen_ids.add(job_id)
+
+            jobs.append({
+                'id': job_id,
+                'type': job_type,
+                'request': request,
+                'context': context,
+                'tenant': tenant
+            })
+
+    return jobs
+
+
+class StartRateLimiter:
+    """Espaçar o início de jobs para respeitar um limite de jobs por minuto"""
+
+    def __init__(self, per_minute: Optional[int]):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class BatchRunner:
+    """Executar jobs de geração com concorrência limitada e retomada"""
+
+    def __init__(self,
+                 system,
+                 output_dir: str = "output/batch",
+                 max_concurrency: int = 4,
+                 max_retries: int = 3,
+                 jobs_per_minute: Optional[int] = None,
+                 retry_base_delay: float = 2.0):
+        self.system = system
+        self.output_dir = output_dir
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.jobs_per_minute = jobs_per_minute
+        self.retry_base_delay = retry_base_delay
+        self.manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+
+    def output_file_for(self, job: Dict[str, Any]) -> str:
+        """Arquivo de saída de um job"""
+        return os.path.join(self.output_dir, f"{job['type']}_{job['id']}.md")
+
+    def completed_job_ids(self) -> Set[str]:
+        """IDs de jobs já concluídos (manifesto + arquivo de saída existente)"""
+        if not os.path.exists(self.manifest_path):
+            return set()
+
+        # Último evento registrado de cada job
+        last_entries = {}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Linha truncada por interrupção
+                    continue
+                last_entries[entry.get('job_id')] = entry
+
+        return {
+            job_id for job_id, entry in last_entries.items()
+            if entry.get('status') == 'done' and os.path.exists(entry.get('output_file', ''))
+        }
+
+    def _record(self, entry: Dict[str, Any]):
+        """Acrescentar evento ao manifesto"""
+        entry['timestamp'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _write_output(self, output_file: str, content: str):
+        """Gravar saída de forma atômica (arquivos parciais nunca contam como concluídos)"""
+        tmp_file = output_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_file, output_file)
+
+    async def _call_system(self, job: Dict[str, Any]) -> str:
+        """Chamar o método do sistema correspondente ao tipo do job"""
+        async_name, sync_name = JOB_TYPES[job['type']]
+
+        if job['type'] == 'compliance':
+            if job['context']:
+                logger.warning(f"Job {job['id']}: contexto ignorado em jobs de compliance")
+            args = (job['request'],)
+            params = {'regulation_area': job['request']}
+        else:
+            args = (job['request'], job['context'])
+            params = {'request': job['request'], 'context': job['context']}
+        if job.get('tenant'):
+            params['tenant'] = job['tenant']
+
+        # Retentativas (e reexecuções do lote) retomam da etapa que falhou
+        engine = type(self.system).__name__
+        checkpoint = RunCheckpoint.open(
+            sync_name, engine, params,
+            resume=run_id_for(sync_name, engine, params),
+            root_dir=os.path.join(self.output_dir, 'runs')
+        )
+
+        # Buscas do job usam a base de conhecimento do tenant dele
+        with tenant_scope(job.get('tenant')):
+            async_method = getattr(self.system, async_name, None)
+            if async_method is not None:
+                return await async_method(*args, checkpoint=checkpoint)
+
+            # CrewAI não tem API assíncrona: executar em thread (com o tenant no contexto)
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(
+                None, functools.partial(context.run, getattr(self.system, sync_name), *args,
+                                        checkpoint=checkpoint)
+            )
+
+    async def _run_job(self, job: Dict[str, Any], semaphore: asyncio.Semaphore,
+                       rate_limiter: StartRateLimiter) -> Dict[str, Any]:
+        """Executar um job com retry e backoff exponencial"""
+        output_file = self.output_file_for(job)
+
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                await rate_limiter.wait()
+                started = time.perf_counter()
+                try:
+                    logger.info(f"Job {job['id']} ({job['type']}) iniciado, tentativa {attempt + 1}")
+                    result = await self._call_system(job)
+                    self._write_output(output_file, result)
+
+                    duration = time.perf_counter() - started
+                    self._record({
+                        'job_id': job['id'],
+                        'type': job['type'],
+                        'status': 'done',
+                        'output_file': output_file,
+                        'attempts': attempt + 1,
+                        'duration_seconds': round(duration, 2)
+                    })
+                    logger.info(f"Job {job['id']} concluído em {duration:.1f}s: {output_file}")
+                    return {'job_id': job['id'], 'status': 'done', 'output_file': output_file}
+
+                except Exception as e:
+                    if attempt >= self.max_retries:
+                        self._record({
+                            'job_id': job['id'],
+                            'type': job['type'],
+                            'status': 'failed',
+                            'attempts': attempt + 1,
+                            'error': str(e)
+                        })
+                        logger.error(f"Job {job['id']} falhou após {attempt + 1} tentativas: {str(e)}")
+                        return {'job_id': job['id'], 'status': 'failed', 'error': str(e)}
+
+                    delay = self.retry_base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    logger.warning(
+                        f"Job {job['id']} falhou ({str(e)}), nova tentativa em {delay:.1f}s"
+                    )
+                    await asyncio.sleep(delay)
+
+    async def arun(self, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Executar jobs pendentes e retornar resumo"""
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        done_ids = self.completed_job_ids()
+        pending = [job for job in jobs if job['id'] not in done_ids]
+        skipped = len(jobs) - len(pending)
+        if skipped:
+            logger.info(f"Retomando lote: {skipped} jobs já concluídos serão pulados")
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        rate_limiter = StartRateLimiter(self.jobs_per_minute)
+        results = await asyncio.gather(*[
+            self._run_job(job, semaphore, rate_limiter) for job in pending
+        ])
+
+        return {
+            'total': len(jobs),
+            'skipped': skipped,
+            'done': sum(1 for r in results if r['status'] == 'done'),
+            'failed': [r for r in results if r['status'] == 'failed'],
+            'results': results
+        }
+
+    def run(self, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Versão síncrona de arun"""
+        return run_async(self.arun(jobs))
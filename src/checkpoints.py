@@ -0,0 +1,154 @@
+"""
+Checkpoint por etapa dos pipelines de geração (PRD, features, compliance)
+Cada etapa concluída é gravada no diretório da execução; uma execução retomada
+pula as etapas já gravadas e paga apenas pelas que faltam.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+RUN_MANIFEST = "run.json"
+
+
+def run_id_for(pipeline: str, engine: str, params: Dict[str, Any]) -> str:
+    """ID estável da execução: pipeline + hash do pedido"""
+    payload = json.dumps([pipeline, engine, params], ensure_ascii=False, sort_keys=True)
+    return f"{pipeline}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]}"
+
+
+def _stage_filename(index: int, name: str) -> str:
+    slug = re.sub(r'[^a-z0-9_]+', '_', name.lower()).strip('_')
+    return f"{index:02d}_{slug}.md"
+
+
+class RunCheckpoint:
+    """Diretório de uma execução com a saída de cada etapa concluída
+
+    As etapas são numeradas na ordem em que são executadas, então a
+    sequência do pipeline precisa ser determinística.
+    """
+
+    def __init__(self, run_dir: str):
+        self.run_dir = run_dir
+        self.run_id = os.path.basename(os.path.normpath(run_dir))
+        self._next_index = 1
+        self.resumed_stages = 0
+
+    @classmethod
+    def open(cls, pipeline: str, engine: str, params: Dict[str, Any],
+             resume: Optional[str] = None, root_dir: str = None) -> 'RunCheckpoint':
+        """Abrir execução nova ou retomar (resume = run id) uma anterior
+
+        Sem resume, checkpoints antigos do mesmo pedido são descartados.
+        """
+        root_dir = root_dir or os.getenv('CHECKPOINT_DIRECTORY', './data/runs')
+        run_id = run_id_for(pipeline, engine, params)
+        if resume and resume != run_id:
+            raise ValueError(
+                f"Execução '{resume}' não corresponde a este pedido (esperado '{run_id}')"
+            )
+
+        checkpoint = cls(os.path.join(root_dir, run_id))
+        if not resume:
+            checkpoint.clear()
+        os.makedirs(checkpoint.run_dir, exist_ok=True)
+        checkpoint._write_manifest({
+            'run_id': run_id,
+            'pipeline': pipeline,
+            'engine': engine,
+            'params': params,
+            'status': 'running',
+            'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        })
+        return checkpoint
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        path = os.path.join(self.run_dir, RUN_MANIFEST)
+        current = self.manifest()
+        current.update(manifest)
+        self._write_atomic(path, json.dumps(current, ensure_ascii=False, indent=2))
+
+    def _write_atomic(self, path: str, content: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def manifest(self) -> Dict[str, Any]:
+        path = os.path.join(self.run_dir, RUN_MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def clear(self):
+        """Remover saídas de etapas de uma execução anterior"""
+        if not os.path.isdir(self.run_dir):
+            return
+        for filename in os.listdir(self.run_dir):
+            if filename.endswith('.md'):
+                os.remove(os.path.join(self.run_dir, filename))
+
+    def _stage_path(self, name: str) -> str:
+        path = os.path.join(self.run_dir, _stage_filename(self._next_index, name))
+        self._next_index += 1
+        return path
+
+    def _load(self, path: str, name: str) -> Optional[str]:
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            output = f.read()
+        self.resumed_stages += 1
+        logger.info(f"Etapa '{name}' retomada do checkpoint ({self.run_id})")
+        return output
+
+    def _save(self, path: str, name: str, output: str):
+        self._write_atomic(path, output)
+        logger.info(f"Checkpoint da etapa '{name}' gravado ({self.run_id})")
+
+    def stage(self, name: str, run: Callable[[], str]) -> str:
+        """Executar etapa, ou reutilizar sua saída se já estiver gravada"""
+        path = self._stage_path(name)
+        output = self._load(path, name)
+        if output is None:
+            output = str(run())
+            self._save(path, name, output)
+        return output
+
+    async def astage(self, name: str, run: Callable[[], Awaitable[str]]) -> str:
+        """Versão assíncrona de stage (run retorna uma corrotina)"""
+        path = self._stage_path(name)
+        output = self._load(path, name)
+        if output is None:
+            output = str(await run())
+            self._save(path, name, output)
+        return output
+
+    def complete(self):
+        """Marcar execução como concluída"""
+        self._write_manifest({'status': 'done', 'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S')})
+
+
+class _NoCheckpoint:
+    """Executa as etapas diretamente quando não há checkpoint"""
+
+    def stage(self, name: str, run: Callable[[], str]) -> str:
+        return run()
+
+    async def astage(self, name: str, run: Callable[[], Awaitable[str]]) -> str:
+        return await run()
+
+    def complete(self):
+        pass
+
+
+NO_CHECKPOINT = _NoCheckpoint()
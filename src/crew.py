@@ -3,9 +3,9 @@ Sistema principal CrewAI para geração de PRDs e Features de Custódia Brasilei
 """
 
 from crewai import Crew, Process
-from langchain_openai import ChatOpenAI
-import os
-from typing import Dict, Any, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional
 
 # Importar agentes
 from src.agents.document_intelligence_agent import (
@@ -45,25 +45,71 @@ from src.tasks.feature_engineering_tasks import (
 from src.tools.document_search_tool import DocumentSearchTool
 from src.tools.context_generator_tool import ContextGeneratorTool
 from src.tools.regulation_analyzer_tool import RegulationAnalyzerTool
+from src.tools.citation_lookup_tool import CitationLookupTool
 
+from src.checkpoints import RunCheckpoint
+from src.llm.clients import get_chat_llm
+from src.tools.memo import tool_memo_scope
 from src.utils.logger import setup_logger
+from src.utils.tracing import span, traced
 
 logger = setup_logger(__name__)
 
+
+class TokenStreamHandler(BaseCallbackHandler):
+    """Repassar tokens gerados pelo LLM para um callback de streaming"""
+    
+    def __init__(self, on_token: Callable[[str], None]):
+        self.on_token = on_token
+    
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.on_token(token)
+
+
+@contextmanager
+def stream_task_llm(task, on_token: Callable[[str], None] = None):
+    """Executar a task com uma cópia do agente cujo LLM faz streaming
+    
+    O stream inclui o raciocínio do agente (Thought/Action), por isso quem
+    consome deve consolidar o arquivo com o resultado do kickoff. O LLM do
+    agente é uma visão compartilhada por temperatura (outros agentes e
+    execuções concorrentes), então nem ele nem o agente são alterados: a task
+    recebe cópias só durante a execução.
+    """
+    if on_token is None:
+        yield
+        return
+    
+    agent = task.agent
+    # copy() omite campos excluídos da serialização (client, callbacks, tags):
+    # dict(llm) traz todos, inclusive o cliente compartilhado
+    streaming_llm = agent.llm.copy(update={
+        **dict(agent.llm),
+        'streaming': True,
+        'callbacks': list(agent.llm.callbacks or []) + [TokenStreamHandler(on_token)]
+    })
+    streaming_agent = agent.model_copy(update={'llm': streaming_llm})
+    # O executor do agente guarda o LLM original: recriar com a cópia
+    streaming_agent.set_cache_handler(agent.cache_handler)
+    task.agent = streaming_agent
+    try:
+        yield
+    finally:
+        task.agent = agent
+
+
 class CustodyPRDCrew:
     """Crew principal para geração de PRDs e Features de Custódia"""
     
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=os.getenv('OPENAI_MODEL_NAME', 'gpt-4-turbo-preview'),
-            temperature=0.1
-        )
+        self.llm = get_chat_llm(temperature=0.1)
         
         # Inicializar tools compartilhadas
         self.tools = [
             DocumentSearchTool(),
             ContextGeneratorTool(),
-            RegulationAnalyzerTool()
+            RegulationAnalyzerTool(),
+            CitationLookupTool()
         ]
         
         # Inicializar agentes
@@ -98,7 +144,39 @@ class CustodyPRDCrew:
         self.qa_specialist_agent = create_qa_specialist_agent()
         self.qa_specialist_agent.tools = self.tools
     
-    def generate_prd(self, user_request: str, context: str = None) -> str:
+    def _run_crew(self, crew: Crew, stages: List[str],
+                  on_token: Callable[[str], None] = None,
+                  checkpoint: RunCheckpoint = None) -> str:
+        """Executar a crew, com checkpoint por task quando informado
+        
+        Com checkpoint, as tasks são executadas uma a uma com o mesmo
+        encadeamento do processo sequencial (a saída de cada task é o
+        contexto da seguinte), e tasks já gravadas não chamam o LLM.
+        Resultados das tools são memoizados durante toda a execução.
+        """
+        if checkpoint is None:
+            with span("crew.kickoff", tasks=len(crew.tasks)), tool_memo_scope("crew.kickoff"), \
+                    stream_task_llm(crew.tasks[-1], on_token):
+                return crew.kickoff()
+        
+        with span("crew.kickoff", tasks=len(crew.tasks), run_id=checkpoint.run_id), \
+                tool_memo_scope(checkpoint.run_id):
+            output = None
+            last_index = len(crew.tasks) - 1
+            for index, (task, stage) in enumerate(zip(crew.tasks, stages)):
+                def execute(task=task, context=output, final=index == last_index):
+                    with stream_task_llm(task, on_token if final else None):
+                        return task.execute(context)
+                
+                output = checkpoint.stage(stage, execute)
+            
+            checkpoint.complete()
+            return output
+    
+    @traced("pipeline.generate_prd")
+    def generate_prd(self, user_request: str, context: str = None,
+                     on_token: Callable[[str], None] = None,
+                     checkpoint: RunCheckpoint = None) -> str:
         """Gerar PRD completo baseado no pedido do usuário"""
         
         try:
@@ -145,7 +223,10 @@ class CustodyPRDCrew:
                 verbose=True
             )
             
-            result = crew.kickoff()
+            result = self._run_crew(
+                crew, ['document_analysis', 'business_analysis', 'market_research', 'prd'],
+                on_token, checkpoint
+            )
             
             logger.info("PRD gerado com sucesso")
             return result
@@ -154,7 +235,10 @@ class CustodyPRDCrew:
             logger.error(f"Erro na geração de PRD: {str(e)}")
             raise
     
-    def generate_features(self, user_request: str, context: str = None) -> str:
+    @traced("pipeline.generate_features")
+    def generate_features(self, user_request: str, context: str = None,
+                          on_token: Callable[[str], None] = None,
+                          checkpoint: RunCheckpoint = None) -> str:
         """Gerar especificações detalhadas de features"""
         
         try:
@@ -207,7 +291,12 @@ class CustodyPRDCrew:
                 verbose=True
             )
             
-            result = crew.kickoff()
+            result = self._run_crew(
+                crew,
+                ['regulatory_compliance', 'feature_specification', 'architecture_design',
+                 'api_specification', 'database_design'],
+                on_token, checkpoint
+            )
             
             logger.info("Features geradas com sucesso")
             return result
@@ -216,7 +305,10 @@ class CustodyPRDCrew:
             logger.error(f"Erro na geração de features: {str(e)}")
             raise
     
-    def analyze_compliance(self, regulation_area: str) -> str:
+    @traced("pipeline.analyze_compliance")
+    def analyze_compliance(self, regulation_area: str,
+                           on_token: Callable[[str], None] = None,
+                           checkpoint: RunCheckpoint = None) -> str:
         """Análise focada em compliance regulatório"""
         
         try:
@@ -244,7 +336,10 @@ class CustodyPRDCrew:
                 verbose=True
             )
             
-            result = crew.kickoff()
+            result = self._run_crew(
+                crew, ['regulatory_compliance', 'knowledge_extraction'],
+                on_token, checkpoint
+            )
             
             logger.info("Análise de compliance concluída")
             return result
@@ -253,6 +348,7 @@ class CustodyPRDCrew:
             logger.error(f"Erro na análise de compliance: {str(e)}")
             raise
     
+    @traced("pipeline.custom_analysis")
     def custom_analysis(self, 
                        request: str, 
                        agents_to_use: list = None, 
@@ -311,7 +407,8 @@ class CustodyPRDCrew:
                 verbose=True
             )
             
-            result = crew.kickoff()
+            with span("crew.kickoff", tasks=len(tasks)), tool_memo_scope("custom_analysis"):
+                result = crew.kickoff()
             
             logger.info("Análise customizada concluída")
             return result
@@ -3,227 +3,568 @@ Processador de documentos para indexação e busca semântica
 Suporta PDFs, TXT e links externos
 """
 
+import copy
 import os
+import threading
 import requests
 import fitz  # PyMuPDF
 import pypdf
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from urllib.parse import urlparse
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 import tiktoken
+from src.regulation.index import get_regulation_index
+from src.tenants import (CollectionLRU, cache_limits, collection_name_for, current_tenant,
+                         estimate_collection_bytes, normalize_tenant)
+from src.utils.concurrency import EncodeBatcher, ReadWriteLock, SingleFlight
 from src.utils.logger import setup_logger
+from src.utils.metrics import (CHUNKS_EMBEDDED, DOCUMENTS_INGESTED, EMBED_LATENCY, SEARCH_LATENCY,
+                               record_failure)
 from src.utils.text_splitter import CustomTextSplitter
+from src.utils.tracing import span
 
 logger = setup_logger(__name__)
 
-class DocumentProcessor:
-    def __init__(self):
-        self.chroma_client = self._setup_chroma()
-        self.embeddings_model = SentenceTransformer(
-            os.getenv('EMBEDDINGS_MODEL', 'all-MiniLM-L6-v2')
+# Callback de progresso da ingestão: (etapa, feitos, total)
+ProgressCallback = Callable[[str, int, int], None]
+
+# Constante da reciprocal rank fusion na busca híbrida (valor usual da literatura)
+HYBRID_RRF_K = 60
+
+# Modelos e clientes compartilhados por todas as instâncias do processo
+_shared_lock = threading.Lock()
+_encoders: Dict[str, EncodeBatcher] = {}
+_stores: Dict[str, Tuple[Any, ReadWriteLock]] = {}
+# Coleções abertas de todos os tenants (LRU com limite de memória)
+_open_collections: Optional[CollectionLRU] = None
+
+# Buscas idênticas simultâneas (vários agentes pedindo o mesmo contexto)
+_search_flights = SingleFlight('document.search')
+_context_flights = SingleFlight('document.get_context')
+
+
+def singleflight_enabled() -> bool:
+    return os.getenv('SEARCH_SINGLEFLIGHT', 'true').lower() == 'true'
+
+
+def _setup_chroma(persist_directory: str) -> chromadb.Client:
+    """Configurar cliente ChromaDB"""
+    os.makedirs(persist_directory, exist_ok=True)
+    
+    settings = {'anonymized_telemetry': False}
+    max_bytes = cache_limits()['max_bytes']
+    if max_bytes:
+        # O ChromaDB descarrega os índices das coleções frias acima do limite
+        settings.update(chroma_segment_cache_policy="LRU", chroma_memory_limit_bytes=max_bytes)
+    
+    try:
+        return chromadb.PersistentClient(
+            path=persist_directory,
+            settings=Settings(**settings)
         )
+    except Exception as e:
+        logger.warning(f"Erro ao criar PersistentClient, usando EphemeralClient: {str(e)}")
+        return chromadb.EphemeralClient()
+
+
+def get_vector_store(persist_directory: str) -> Tuple[Any, ReadWriteLock]:
+    """Cliente ChromaDB e lock leitores/escritor compartilhados do diretório"""
+    store = _stores.get(persist_directory)
+    if store is None:
+        with _shared_lock:
+            store = _stores.get(persist_directory)
+            if store is None:
+                store = _stores[persist_directory] = (_setup_chroma(persist_directory), ReadWriteLock())
+    return store
+
+
+def same_source(path: Optional[str], other: Optional[str]) -> bool:
+    """Mesmo documento de origem (caminhos relativos ou absolutos, ou mesma URL)"""
+    if not path or not other:
+        # Metadados sem caminho: não há como distinguir
+        return True
+    return path == other or os.path.abspath(path) == os.path.abspath(other)
+
+
+def get_open_collections() -> CollectionLRU:
+    """LRU de coleções do processo, com os limites lidos no primeiro uso (após o .env)"""
+    global _open_collections
+    if _open_collections is None:
+        with _shared_lock:
+            if _open_collections is None:
+                _open_collections = CollectionLRU(**cache_limits())
+    return _open_collections
+
+
+def get_encoder(model_name: str) -> EncodeBatcher:
+    """Modelo de embeddings compartilhado, com micro-lotes de consultas"""
+    encoder = _encoders.get(model_name)
+    if encoder is None:
+        with _shared_lock:
+            encoder = _encoders.get(model_name)
+            if encoder is None:
+                encoder = _encoders[model_name] = EncodeBatcher(
+                    SentenceTransformer(model_name),
+                    max_batch=int(os.getenv('EMBED_BATCH_MAX', '32')),
+                    window_ms=float(os.getenv('EMBED_BATCH_WINDOW_MS', '0'))
+                )
+                logger.info("Modelo de embeddings carregado: %s", model_name)
+    return encoder
+
+
+class DocumentProcessor:
+    """Ingestão e busca sobre a base vetorial
+    
+    Concorrência: vários leitores e um escritor. Instâncias do mesmo processo
+    compartilham o modelo de embeddings e o cliente ChromaDB, então criar uma
+    por chamada é barato. Estratégia de locks:
+    - buscas (search_documents, get_document_context) podem rodar em paralelo
+      de um pool de threads; a consulta ao ChromaDB é feita sob o lock de
+      leitura do diretório da base;
+    - a gravação dos chunks de um documento (chroma.add) usa o lock de
+      escrita, com preferência ao escritor: as buscas nunca veem um documento
+      pela metade e a ingestão não espera indefinidamente;
+    - extração, divisão em chunks e embeddings da ingestão ficam fora do lock;
+    - todas as chamadas ao modelo passam pelo EncodeBatcher (serializadas por
+      model_lock); encodes de consultas simultâneas viram um único lote;
+    - buscas e contextos idênticos em andamento são coalescidos (SingleFlight):
+      quem chega durante a execução recebe o mesmo resultado;
+    - o índice regulatório abre uma conexão SQLite (WAL) por operação, e
+      logging, métricas e tracing já são thread-safe.
+    
+    Tenants: com tenant explícito, a instância usa sempre a coleção e o
+    índice regulatório dele; sem tenant, cada operação usa o tenant atual
+    (src.tenants.current_tenant), então uma mesma instância atende jobs de
+    clientes diferentes.
+    """
+    
+    def __init__(self, tenant: str = None):
+        self.persist_directory = os.getenv('CHROMA_PERSIST_DIRECTORY', './data/chroma_db')
+        self.chroma_client, self.store_lock = get_vector_store(self.persist_directory)
+        self.encoder = get_encoder(os.getenv('EMBEDDINGS_MODEL', 'all-MiniLM-L6-v2'))
+        self.embeddings_model = self.encoder.model
         self.text_splitter = CustomTextSplitter()
-        self.collection_name = "custody_documents"
-        self.collection = self._get_or_create_collection()
-        
-    def _setup_chroma(self) -> chromadb.Client:
-        """Configurar cliente ChromaDB"""
-        persist_directory = os.getenv('CHROMA_PERSIST_DIRECTORY', './data/chroma_db')
-        os.makedirs(persist_directory, exist_ok=True)
-        
-        try:
-            return chromadb.PersistentClient(
-                path=persist_directory,
-                settings=Settings(anonymized_telemetry=False)
-            )
-        except Exception as e:
-            logger.warning(f"Erro ao criar PersistentClient, usando EphemeralClient: {str(e)}")
-            return chromadb.EphemeralClient()
+        self.tenant = normalize_tenant(tenant) if tenant else None
+        # Sobrescritas explícitas (benchmarks usam coleções e índices próprios)
+        self._collection_name = None
+        self._collection = None
+        self._regulation_index = None
+    
+    @property
+    def active_tenant(self) -> str:
+        return self.tenant or current_tenant()
+    
+    @property
+    def collection_name(self) -> str:
+        return self._collection_name or collection_name_for(self.active_tenant)
+    
+    @collection_name.setter
+    def collection_name(self, name: str):
+        self._collection_name = name
+    
+    @property
+    def collection(self):
+        """Coleção do tenant, aberta pelo LRU de coleções"""
+        if self._collection is not None:
+            return self._collection
+        name = self.collection_name
+        return get_open_collections().get((self.persist_directory, name),
+                                          lambda: self._get_or_create_collection(name),
+                                          self._estimate_bytes)
+    
+    @collection.setter
+    def collection(self, collection):
+        self._collection = collection
     
-    def _get_or_create_collection(self):
+    @property
+    def regulation_index(self):
+        return self._regulation_index or get_regulation_index(self.active_tenant)
+    
+    @regulation_index.setter
+    def regulation_index(self, index):
+        self._regulation_index = index
+    
+    def _get_or_create_collection(self, name: str = None):
         """Obter ou criar coleção no ChromaDB"""
+        name = name or self.collection_name
         try:
-            return self.chroma_client.get_collection(self.collection_name)
+            return self.chroma_client.get_collection(name)
         except Exception:
             return self.chroma_client.create_collection(
-                name=self.collection_name,
-                metadata={"description": "Documentos de custódia brasileira"}
+                name=name,
+                metadata={"description": "Documentos de custódia brasileira", "tenant": self.active_tenant}
             )
     
-    def process_document(self, file_path: str, file_type: str) -> Dict[str, Any]:
-        """Processar documento baseado no tipo"""
+    def _estimate_bytes(self, collection) -> int:
+        """Memória estimada da coleção carregada (para o LRU de coleções)"""
+        return estimate_collection_bytes(collection.count(),
+                                         self.embeddings_model.get_sentence_embedding_dimension())
+    
+    def process_document(self, file_path: str, file_type: str,
+                         on_progress: ProgressCallback = None) -> Dict[str, Any]:
+        """Processar documento baseado no tipo
+        
+        on_progress(etapa, feitos, total) é chamado ao longo das etapas
+        extract (páginas), split, embed (chunks) e store.
+        """
         try:
-            if file_type == 'pdf':
-                return self._process_pdf(file_path)
-            elif file_type == 'txt':
-                return self._process_txt(file_path)
-            elif file_type == 'url':
-                return self._process_url(file_path)
-            else:
-                raise ValueError(f"Tipo de arquivo não suportado: {file_type}")
+            with span("document.process", file_type=file_type, source=file_path):
+                if file_type == 'pdf':
+                    return self._process_pdf(file_path, on_progress)
+                elif file_type == 'txt':
+                    return self._process_txt(file_path, on_progress)
+                elif file_type == 'url':
+                    return self._process_url(file_path, on_progress)
+                else:
+                    raise ValueError(f"Tipo de arquivo não suportado: {file_type}")
                 
         except Exception as e:
+            record_failure('document.process')
             logger.error(f"Erro ao processar documento {file_path}: {str(e)}")
             raise
     
-    def _process_pdf(self, file_path: str) -> Dict[str, Any]:
+    def _process_pdf(self, file_path: str, on_progress: ProgressCallback = None) -> Dict[str, Any]:
         """Processar arquivo PDF usando PyMuPDF e pypdf como fallback"""
+        text_content = self._extract_pdf_text(file_path, on_progress)
+        return self._index_document(text_content, os.path.basename(file_path), 'pdf', file_path, on_progress)
+    
+    def _extract_pdf_text(self, file_path: str, on_progress: ProgressCallback = None) -> str:
+        """Extrair texto do PDF (PyMuPDF, com pypdf como fallback)"""
         text_content = ""
         filename = os.path.basename(file_path)
         
-        try:
-            # Tentar com PyMuPDF primeiro (melhor para layout complexo)
-            doc = fitz.open(file_path)
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text_content += f"\n--- Página {page_num + 1} ---\n"
-                text_content += page.get_text()
-            doc.close()
-            logger.info(f"PDF processado com PyMuPDF: {filename}")
-            
-        except Exception as e:
-            logger.warning(f"Erro com PyMuPDF, tentando pypdf: {str(e)}")
-            # Fallback para pypdf
+        with span("document.extract_pdf", filename=filename) as extract_span:
             try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = pypdf.PdfReader(file)
-                    for page_num, page in enumerate(pdf_reader.pages):
-                        text_content += f"\n--- Página {page_num + 1} ---\n"
-                        text_content += page.extract_text()
-                logger.info(f"PDF processado com pypdf: {filename}")
+                # Tentar com PyMuPDF primeiro (melhor para layout complexo)
+                doc = fitz.open(file_path)
+                for page_num in range(len(doc)):
+                    page = doc.load_page(page_num)
+                    text_content += f"\n--- Página {page_num + 1} ---\n"
+                    text_content += page.get_text()
+                    if on_progress:
+                        on_progress('extract', page_num + 1, len(doc))
+                extract_span.set_attributes(pages=len(doc), extractor='pymupdf')
+                doc.close()
+                logger.info(f"PDF processado com PyMuPDF: {filename}")
                 
-            except Exception as e2:
-                logger.error(f"Erro com ambos processadores de PDF: {str(e2)}")
-                raise
+            except Exception as e:
+                logger.warning(f"Erro com PyMuPDF, tentando pypdf: {str(e)}")
+                # Fallback para pypdf
+                try:
+                    with open(file_path, 'rb') as file:
+                        pdf_reader = pypdf.PdfReader(file)
+                        for page_num, page in enumerate(pdf_reader.pages):
+                            text_content += f"\n--- Página {page_num + 1} ---\n"
+                            text_content += page.extract_text()
+                            if on_progress:
+                                on_progress('extract', page_num + 1, len(pdf_reader.pages))
+                    extract_span.set_attributes(pages=len(pdf_reader.pages), extractor='pypdf')
+                    logger.info(f"PDF processado com pypdf: {filename}")
+                    
+                except Exception as e2:
+                    logger.error(f"Erro com ambos processadores de PDF: {str(e2)}")
+                    raise
+            
+            extract_span.set_attribute('chars', len(text_content))
         
-        return self._index_document(text_content, filename, 'pdf', file_path)
+        return text_content
     
-    def _process_txt(self, file_path: str) -> Dict[str, Any]:
+    def _process_txt(self, file_path: str, on_progress: ProgressCallback = None) -> Dict[str, Any]:
         """Processar arquivo TXT"""
+        text_content = self._read_txt(file_path)
+        return self._index_document(text_content, os.path.basename(file_path), 'txt', file_path, on_progress)
+    
+    def _read_txt(self, file_path: str) -> str:
+        """Ler arquivo TXT (UTF-8, com encodings latinos como fallback)"""
         filename = os.path.basename(file_path)
         
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                text_content = file.read()
-        except UnicodeDecodeError:
-            # Tentar com diferentes encodings
-            encodings = ['latin1', 'cp1252', 'iso-8859-1']
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as file:
-                        text_content = file.read()
-                    logger.info(f"Arquivo TXT lido com encoding {encoding}: {filename}")
-                    break
-                except UnicodeDecodeError:
-                    continue
-            else:
-                raise ValueError("Não foi possível decodificar o arquivo TXT")
+        with span("document.extract_txt", filename=filename) as extract_span:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    text_content = file.read()
+            except UnicodeDecodeError:
+                # Tentar com diferentes encodings
+                encodings = ['latin1', 'cp1252', 'iso-8859-1']
+                for encoding in encodings:
+                    try:
+                        with open(file_path, 'r', encoding=encoding) as file:
+                            text_content = file.read()
+                        logger.info(f"Arquivo TXT lido com encoding {encoding}: {filename}")
+                        break
+                    except UnicodeDecodeError:
+                        continue
+                else:
+                    raise ValueError("Não foi possível decodificar o arquivo TXT")
+            
+            extract_span.set_attribute('chars', len(text_content))
         
-        return self._index_document(text_content, filename, 'txt', file_path)
+        return text_content
     
-    def _process_url(self, url: str) -> Dict[str, Any]:
+    def _process_url(self, url: str, on_progress: ProgressCallback = None) -> Dict[str, Any]:
         """Processar conteúdo de URL"""
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
+            with span("document.fetch_url", url=url) as fetch_span:
+                response = requests.get(url, headers=headers, timeout=30)
+                response.raise_for_status()
+                fetch_span.set_attributes(status=response.status_code, bytes=len(response.content))
             
             # Extrair texto simples (pode ser melhorado com BeautifulSoup)
             text_content = response.text
             filename = urlparse(url).netloc + urlparse(url).path.replace('/', '_')
             
             logger.info(f"URL processada: {url}")
-            return self._index_document(text_content, filename, 'url', url)
+            return self._index_document(text_content, filename, 'url', url, on_progress)
             
         except Exception as e:
             logger.error(f"Erro ao processar URL {url}: {str(e)}")
             raise
     
-    def _index_document(self, text_content: str, filename: str, doc_type: str, source_path: str) -> Dict[str, Any]:
+    def _index_document(self, text_content: str, filename: str, doc_type: str, source_path: str,
+                        on_progress: ProgressCallback = None) -> Dict[str, Any]:
         """Indexar documento na base vetorial"""
         try:
-            # Dividir texto em chunks
-            chunks = self.text_splitter.split_text(text_content)
-            
-            if not chunks:
-                raise ValueError("Nenhum conteúdo extraído do documento")
-            
-            # Gerar embeddings
-            embeddings = self.embeddings_model.encode(chunks).tolist()
-            
-            # Preparar metadados
-            metadatas = []
-            ids = []
-            for i, chunk in enumerate(chunks):
-                chunk_id = f"{filename}_{doc_type}_{i}"
-                ids.append(chunk_id)
-                metadatas.append({
+            with span("document.index", filename=filename, doc_type=doc_type, chars=len(text_content)) as index_span:
+                # Dividir texto em chunks
+                chunks = self.text_splitter.split_text(text_content)
+                
+                if not chunks:
+                    raise ValueError("Nenhum conteúdo extraído do documento")
+                if on_progress:
+                    on_progress('split', len(chunks), len(chunks))
+                
+                # Gerar embeddings
+                with span("embeddings.encode", texts=len(chunks), chars=sum(len(c) for c in chunks)), \
+                        EMBED_LATENCY.time(operation='index'):
+                    embeddings = self.encoder.encode_many(
+                        chunks,
+                        on_progress=(lambda done: on_progress('embed', done, len(chunks))) if on_progress else None
+                    )
+                CHUNKS_EMBEDDED.inc(len(chunks), operation='index')
+                
+                # Preparar metadados
+                metadatas = []
+                ids = []
+                for i, chunk in enumerate(chunks):
+                    chunk_id = f"{filename}_{doc_type}_{i}"
+                    ids.append(chunk_id)
+                    metadatas.append({
+                        'filename': filename,
+                        'type': doc_type,
+                        'source_path': source_path,
+                        'chunk_index': i,
+                        'chunk_size': len(chunk)
+                    })
+                
+                # Substituir os chunks do documento na coleção (uma versão mais
+                # curta deixaria chunks antigos com ids que não são regravados)
+                collection = self.collection
+                with span("chroma.add", collection=self.collection_name, chunks=len(chunks),
+                          bytes=sum(len(c.encode('utf-8')) for c in chunks)), self.store_lock.write():
+                    # O nome do arquivo identifica o documento (ids, índice regulatório,
+                    # citações): outro arquivo com o mesmo nome não pode substituí-lo
+                    indexed_path = self._indexed_source_path(collection, filename)
+                    if not same_source(indexed_path, source_path):
+                        raise ValueError(
+                            f"Já existe um documento {filename} indexado a partir de {indexed_path}; "
+                            f"renomeie {source_path} ou remova o outro documento antes"
+                        )
+                    collection.delete(where={'filename': filename})
+                    collection.add(
+                        embeddings=embeddings,
+                        documents=chunks,
+                        metadatas=metadatas,
+                        ids=ids
+                    )
+                if self._collection is None:
+                    get_open_collections().resize((self.persist_directory, self.collection_name),
+                                                  self._estimate_bytes(collection))
+                if on_progress:
+                    on_progress('store', len(chunks), len(chunks))
+                
+                # Extrações regulatórias estruturadas (obrigações, prazos, ...)
+                extractions_count = 0
+                try:
+                    with span("regulation_index.add", chunks=len(chunks)) as regulation_span:
+                        extractions_count = self.regulation_index.index_chunks(
+                            filename, doc_type, source_path, ids, chunks
+                        )
+                        regulation_span.set_attribute('items', extractions_count)
+                except Exception as e:
+                    record_failure('regulation_index.add')
+                    logger.warning(f"Erro ao gravar extrações regulatórias de {filename}: {str(e)}")
+                
+                index_span.set_attributes(chunks=len(chunks), extractions=extractions_count)
+                DOCUMENTS_INGESTED.inc(type=doc_type)
+                logger.info("Documento indexado: %s (%d chunks)", filename, len(chunks))
+                
+                return {
+                    'message': f'Documento {filename} processado e indexado com sucesso',
+                    'chunks_count': len(chunks),
+                    'extractions_count': extractions_count,
                     'filename': filename,
-                    'type': doc_type,
-                    'source_path': source_path,
-                    'chunk_index': i,
-                    'chunk_size': len(chunk)
-                })
-            
-            # Adicionar à coleção
-            self.collection.add(
-                embeddings=embeddings,
-                documents=chunks,
-                metadatas=metadatas,
-                ids=ids
-            )
-            
-            logger.info(f"Documento indexado: {filename} ({len(chunks)} chunks)")
-            
-            return {
-                'message': f'Documento {filename} processado e indexado com sucesso',
-                'chunks_count': len(chunks),
-                'filename': filename,
-                'type': doc_type
-            }
-            
+                    'type': doc_type
+                }
+                
         except Exception as e:
+            record_failure('document.index')
             logger.error(f"Erro ao indexar documento {filename}: {str(e)}")
             raise
     
-    def search_documents(self, query: str, n_results: int = 10) -> List[Dict[str, Any]]:
-        """Buscar documentos relevantes usando similaridade semântica"""
+    @staticmethod
+    def _indexed_source_path(collection, filename: str) -> Optional[str]:
+        """Caminho de origem do documento indexado com o nome (None se não houver)"""
+        existing = collection.get(where={'filename': filename}, include=['metadatas'], limit=1)
+        if not existing['ids']:
+            return None
+        return existing['metadatas'][0].get('source_path')
+    
+    def remove_document(self, filename: str, source_path: str = None) -> int:
+        """Remover da base vetorial e do índice regulatório os chunks do documento
+        
+        Com source_path, o documento só é removido se foi indexado a partir
+        desse caminho (outro arquivo com o mesmo nome fica intacto).
+        Retorna o número de chunks removidos.
+        """
         try:
-            # Gerar embedding da query
-            query_embedding = self.embeddings_model.encode([query]).tolist()
-            
-            # Buscar documentos similares
-            results = self.collection.query(
-                query_embeddings=query_embedding,
-                n_results=n_results,
-                include=['documents', 'metadatas', 'distances']
-            )
-            
-            # Formatar resultados
-            formatted_results = []
-            for i, (doc, metadata, distance) in enumerate(zip(
-                results['documents'][0],
-                results['metadatas'][0], 
-                results['distances'][0]
-            )):
-                formatted_results.append({
-                    'content': doc,
-                    'metadata': metadata,
-                    'similarity_score': 1 - distance,  # Converter distância para score
-                    'rank': i + 1
-                })
-            
-            logger.info(f"Busca realizada: {len(formatted_results)} resultados para '{query[:50]}...'")
-            return formatted_results
-            
+            with span("document.remove", filename=filename) as remove_span:
+                collection = self.collection
+                with self.store_lock.write():
+                    if source_path and not same_source(self._indexed_source_path(collection, filename),
+                                                       source_path):
+                        logger.info("Documento %s não foi indexado a partir de %s; nada a remover",
+                                    filename, source_path)
+                        return 0
+                    ids = collection.get(where={'filename': filename}, include=[])['ids']
+                    if ids:
+                        collection.delete(ids=ids)
+                self.regulation_index.remove_source(filename)
+                if self._collection is None:
+                    get_open_collections().resize((self.persist_directory, self.collection_name),
+                                                  self._estimate_bytes(collection))
+                remove_span.set_attribute('chunks', len(ids))
+                logger.info("Documento removido: %s (%d chunks)", filename, len(ids))
+                return len(ids)
+                
+        except Exception as e:
+            record_failure('document.remove')
+            logger.error(f"Erro ao remover documento {filename}: {str(e)}")
+            raise
+    
+    def search_documents(self, query: str, n_results: int = 10, hybrid: bool = None) -> List[Dict[str, Any]]:
+        """Buscar documentos relevantes usando similaridade semântica
+        
+        Na busca híbrida (hybrid=True ou HYBRID_SEARCH=true), os resultados
+        vetoriais são combinados com a busca lexical (bm25) do índice
+        regulatório por reciprocal rank fusion.
+        
+        Buscas idênticas simultâneas compartilham uma única execução
+        (desative com SEARCH_SINGLEFLIGHT=false).
+        """
+        if hybrid is None:
+            hybrid = os.getenv('HYBRID_SEARCH', 'false').lower() == 'true'
+        if not singleflight_enabled():
+            return self._search_documents(query, n_results, hybrid)
+        
+        key = (self.persist_directory, self.collection_name, query, n_results, hybrid)
+        results, shared = _search_flights.do(key, lambda: self._search_documents(query, n_results, hybrid))
+        # Cada chamador pode alterar a própria lista de resultados
+        return copy.deepcopy(results) if shared else results
+    
+    def _search_documents(self, query: str, n_results: int, hybrid: bool) -> List[Dict[str, Any]]:
+        """Execução da busca (embedding da query, ChromaDB e fusão híbrida)"""
+        candidates = n_results * 2 if hybrid else n_results
+        try:
+            with span("document.search", k=n_results, query_chars=len(query), hybrid=hybrid) as search_span, \
+                    SEARCH_LATENCY.time(k=n_results):
+                # Gerar embedding da query
+                with span("embeddings.encode", texts=1, chars=len(query)), EMBED_LATENCY.time(operation='query'):
+                    query_embedding = [self.encoder.encode(query)]
+                CHUNKS_EMBEDDED.inc(operation='query')
+                
+                # Buscar documentos similares
+                collection = self.collection
+                with span("chroma.query", collection=self.collection_name, k=n_results), self.store_lock.read():
+                    results = collection.query(
+                        query_embeddings=query_embedding,
+                        n_results=candidates,
+                        include=['documents', 'metadatas', 'distances']
+                    )
+                
+                # Formatar resultados
+                formatted_results = []
+                for i, (chunk_id, doc, metadata, distance) in enumerate(zip(
+                    results['ids'][0],
+                    results['documents'][0],
+                    results['metadatas'][0], 
+                    results['distances'][0]
+                )):
+                    formatted_results.append({
+                        'chunk_id': chunk_id,
+                        'content': doc,
+                        'metadata': metadata,
+                        'similarity_score': 1 - distance,  # Converter distância para score
+                        'rank': i + 1
+                    })
+                
+                if hybrid:
+                    formatted_results = self._hybrid_results(query, formatted_results, candidates, n_results)
+                
+                search_span.set_attributes(
+                    results=len(formatted_results),
+                    bytes=sum(len(r['content'].encode('utf-8')) for r in formatted_results)
+                )
+                logger.info("Busca realizada: %d resultados para '%.50s...'", len(formatted_results), query)
+                return formatted_results
+                
         except Exception as e:
+            record_failure('document.search')
             logger.error(f"Erro na busca: {str(e)}")
             raise
     
+    def _hybrid_results(self, query: str, vector_results: List[Dict[str, Any]],
+                        candidates: int, n_results: int) -> List[Dict[str, Any]]:
+        """Fundir resultados vetoriais e lexicais por reciprocal rank fusion"""
+        try:
+            with span("regulation_index.search_chunks", k=candidates) as lexical_span:
+                lexical_results = self.regulation_index.search_chunks(query, candidates)
+                lexical_span.set_attribute('results', len(lexical_results))
+        except Exception as e:
+            record_failure('regulation_index.search_chunks')
+            logger.warning(f"Erro na busca lexical, usando apenas a vetorial: {str(e)}")
+            return vector_results[:n_results]
+        
+        scores = {}
+        merged = {}
+        for rank, result in enumerate(vector_results):
+            scores[result['chunk_id']] = 1 / (HYBRID_RRF_K + rank + 1)
+            merged[result['chunk_id']] = result
+        for rank, hit in enumerate(lexical_results):
+            chunk_id = hit['chunk_id']
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1 / (HYBRID_RRF_K + rank + 1)
+            if chunk_id not in merged:
+                # Só encontrado pela busca lexical: sem score de similaridade
+                merged[chunk_id] = {
+                    'chunk_id': chunk_id,
+                    'content': hit['content'],
+                    'metadata': {
+                        'filename': hit['source'],
+                        'type': hit['doc_type'],
+                        'source_path': hit['source_path'],
+                        'chunk_index': hit['chunk_index'],
+                        'chunk_size': len(hit['content'])
+                    },
+                    'similarity_score': 0.0
+                }
+        
+        ranked = sorted(scores, key=scores.get, reverse=True)[:n_results]
+        return [dict(merged[chunk_id], fusion_score=scores[chunk_id], rank=i + 1)
+                for i, chunk_id in enumerate(ranked)]
+    
     def list_indexed_documents(self) -> List[Dict[str, Any]]:
         """Listar documentos indexados"""
         try:
@@ -257,11 +598,8 @@ class DocumentProcessor:
             collection_names = [col.name for col in collections]
             
             if self.collection_name not in collection_names:
-                self.collection = self.chroma_client.create_collection(
-                    name=self.collection_name,
-                    metadata={"description": "Documentos de custódia brasileira"}
-                )
-                logger.info("Base de dados vetorial criada com sucesso")
+                self._get_or_create_collection()
+                logger.info("Base de dados vetorial criada com sucesso (tenant %s)", self.active_tenant)
             else:
                 logger.info("Base de dados vetorial já existe")
                 
@@ -270,8 +608,25 @@ class DocumentProcessor:
             raise
     
     def get_document_context(self, query: str, max_tokens: int = 4000) -> str:
-        """Obter contexto relevante para uma query"""
+        """Obter contexto relevante para uma query
+        
+        Pedidos idênticos simultâneos compartilham uma única montagem.
+        """
         try:
+            if not singleflight_enabled():
+                return self._build_context(query, max_tokens)
+            key = (self.persist_directory, self.collection_name, query, max_tokens)
+            context, _ = _context_flights.do(key, lambda: self._build_context(query, max_tokens))
+            return context
+            
+        except Exception as e:
+            record_failure('document.get_context')
+            logger.error(f"Erro ao gerar contexto: {str(e)}")
+            return ""
+    
+    def _build_context(self, query: str, max_tokens: int) -> str:
+        """Montar contexto com os chunks mais relevantes até o limite de tokens"""
+        with span("document.get_context", max_tokens=max_tokens) as context_span:
             # Buscar documentos relevantes
             results = self.search_documents(query, n_results=20)
             
@@ -292,10 +647,8 @@ class DocumentProcessor:
                     break
             
             context = "\n\n---\n\n".join(context_parts)
-            logger.info(f"Contexto gerado: {len(context_parts)} chunks, {total_tokens} tokens")
+            context_span.set_attributes(chunks=len(context_parts), tokens=total_tokens,
+                                        bytes=len(context.encode('utf-8')))
+            logger.info("Contexto gerado: %d chunks, %d tokens", len(context_parts), total_tokens)
             
-            return context
-            
-        except Exception as e:
-            logger.error(f"Erro ao gerar contexto: {str(e)}")
-            return ""
\ No newline at end of file
+            return context
\ No newline at end of file
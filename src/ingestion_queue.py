@@ -0,0 +1,438 @@
+"""
+Fila persistente (SQLite) de jobs de ingestão de documentos, com workers
+O comando enqueue só grava o job; workers (em outro terminal, ou em segundo
+plano) processam os jobs em paralelo. Cada job em execução tem um lease
+renovado pelo worker: se o processo morrer, o lease expira e outro worker
+retoma o job. Falhas voltam para a fila com backoff exponencial até esgotar
+as tentativas. O progresso (etapa, feitos/total, %) fica gravado no job.
+
+Jobs de uma mesma fonte (e tenant) rodam em ordem, um de cada vez: uma
+remoção enfileirada depois de uma indexação nunca é ultrapassada por ela.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.tenants import current_tenant, normalize_tenant
+from src.utils.logger import setup_logger
+from src.utils.metrics import INGESTION_JOBS
+from src.utils.tracing import span
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    tenant TEXT NOT NULL,
+    action TEXT NOT NULL DEFAULT 'index',
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    stage TEXT,
+    done INTEGER,
+    total INTEGER,
+    progress REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_source ON jobs(source, tenant, status);
+"""
+
+# Status: queued -> running -> done | failed (running -> queued em retentativas)
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Ações: indexar (ou reindexar) a fonte, ou removê-la da base
+ACTIONS = ('index', 'remove')
+
+# Colunas adicionadas depois da primeira versão da fila
+MIGRATIONS = {
+    'action': "ALTER TABLE jobs ADD COLUMN action TEXT NOT NULL DEFAULT 'index'"
+}
+
+# Faixa do progresso total ocupada por cada etapa da ingestão
+STAGE_RANGES = {
+    'extract': (0.0, 0.2),
+    'split': (0.2, 0.25),
+    'embed': (0.25, 0.9),
+    'store': (0.9, 1.0)
+}
+
+FILE_TYPES = {'.pdf': 'pdf', '.txt': 'txt'}
+
+
+def infer_file_type(source: str) -> Optional[str]:
+    """Tipo do documento pela URL ou extensão (None se não suportado)"""
+    if source.startswith(('http://', 'https://')):
+        return 'url'
+    return FILE_TYPES.get(os.path.splitext(source)[1].lower())
+
+
+def stage_progress(stage: str, done: int, total: int) -> float:
+    start, end = STAGE_RANGES.get(stage, (0.0, 1.0))
+    return start + (end - start) * (done / total if total else 1.0)
+
+
+class IngestionQueue:
+    """Jobs de ingestão gravados em SQLite (compartilhado entre processos)"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.getenv('INGESTION_QUEUE_PATH', './data/ingestion_queue.sqlite3')
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit: transações explícitas (BEGIN IMMEDIATE) onde preciso
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Transação com lock de escrita desde o início (claims atômicos entre processos)"""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue(self, source: str, file_type: str, tenant: str = None,
+                max_attempts: int = 3, action: str = 'index') -> Dict[str, Any]:
+        """Adicionar job; o último job da mesma fonte e tenant é reaproveitado se ainda na fila
+
+        O job reaproveitado passa a ter a ação pedida agora (a mais recente
+        vale). Um job já em execução pode ter lido a versão anterior da
+        fonte, então gera um novo job, que roda depois dele.
+        Retorna o job com 'created' indicando se foi criado agora.
+        """
+        if action not in ACTIONS:
+            raise ValueError(f"Ação inválida: {action} (use {', '.join(ACTIONS)})")
+        tenant = normalize_tenant(tenant) if tenant else current_tenant()
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id, status FROM jobs WHERE source = ? AND tenant = ? AND status IN ('queued', 'running') "
+                "ORDER BY id DESC LIMIT 1",
+                (source, tenant)
+            ).fetchone()
+            if row is not None and row['status'] == 'queued':
+                conn.execute(
+                    "UPDATE jobs SET action = ?, file_type = ?, updated_at = ? WHERE id = ?",
+                    (action, file_type, now, row['id'])
+                )
+                return dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone(),
+                            created=False)
+
+            cursor = conn.execute(
+                "INSERT INTO jobs (source, file_type, tenant, action, max_attempts, available_at, created_at, "
+                "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (source, file_type, tenant, action, max(1, max_attempts), now, now, now)
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (cursor.lastrowid,)).fetchone()
+        INGESTION_JOBS.inc(result='queued')
+        return dict(row, created=True)
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Pegar o próximo job disponível (ou com lease expirado) para o worker"""
+        now = time.time()
+        with self._transaction() as conn:
+            # Lease expirado sem tentativas restantes: o worker morreu na última
+            expired = conn.execute(
+                "UPDATE jobs SET status = 'failed', lease_owner = NULL, finished_at = ?, updated_at = ?, "
+                "error = 'lease expirado na última tentativa (worker interrompido)' "
+                "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts",
+                (now, now, now)
+            ).rowcount
+            # Um job espera a vez se a fonte tem outro em execução (lease válido)
+            # ou um anterior ainda pendente, inclusive em backoff de retentativa
+            row = conn.execute(
+                "SELECT * FROM jobs AS j WHERE ((j.status = 'queued' AND j.available_at <= ?) "
+                "OR (j.status = 'running' AND j.lease_expires_at < ?)) "
+                "AND NOT EXISTS (SELECT 1 FROM jobs AS r WHERE r.source = j.source AND r.tenant = j.tenant "
+                "AND r.id != j.id AND ((r.status = 'running' AND r.lease_expires_at >= ?) "
+                "OR (r.id < j.id AND r.status IN ('queued', 'running')))) "
+                "ORDER BY j.id LIMIT 1",
+                (now, now, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires_at = ?, "
+                    "attempts = attempts + 1, started_at = COALESCE(started_at, ?), updated_at = ? WHERE id = ?",
+                    (worker_id, now + lease_seconds, now, now, row['id'])
+                )
+                job = dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone())
+
+        if expired:
+            INGESTION_JOBS.inc(expired, result='failed')
+        if row is None:
+            return None
+        if row['status'] == 'running':
+            logger.warning("Job %s retomado: lease de %s expirou", row['id'], row['lease_owner'])
+        return job
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Renovar o lease; False se o job não pertence mais ao worker"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (now + lease_seconds, now, job_id, worker_id)
+            ).rowcount == 1
+
+    def report_progress(self, job_id: int, worker_id: str, stage: str, done: int, total: int,
+                        lease_seconds: float) -> bool:
+        """Gravar o progresso do job (e renovar o lease)"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "UPDATE jobs SET stage = ?, done = ?, total = ?, progress = ?, lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (stage, done, total, stage_progress(stage, done, total), now + lease_seconds, now,
+                 job_id, worker_id)
+            ).rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'done', progress = 1, stage = 'done', result = ?, error = NULL, "
+                "lease_owner = NULL, lease_expires_at = NULL, finished_at = ?, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (json.dumps(result, ensure_ascii=False, default=str), now, now, job_id, worker_id)
+            ).rowcount == 1
+        if updated:
+            INGESTION_JOBS.inc(result='done')
+        return updated
+
+    def fail(self, job_id: int, worker_id: str, error: str, backoff_seconds: float) -> Optional[str]:
+        """Registrar falha: volta para a fila com backoff ou falha de vez
+
+        Retorna o novo status (queued/failed), ou None se o lease foi perdido.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return None
+            if row['attempts'] < row['max_attempts']:
+                status = 'queued'
+                delay = backoff_seconds * 2 ** (row['attempts'] - 1)
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, available_at = ?, lease_owner = NULL, "
+                    "lease_expires_at = NULL, updated_at = ? WHERE id = ?",
+                    (error, now + delay, now, job_id)
+                )
+            else:
+                status = 'failed'
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, lease_owner = NULL, lease_expires_at = NULL, "
+                    "finished_at = ?, updated_at = ? WHERE id = ?",
+                    (error, now, now, job_id)
+                )
+        INGESTION_JOBS.inc(result='retried' if status == 'queued' else 'failed')
+        return status
+
+    def release(self, job_id: int, worker_id: str):
+        """Devolver o job à fila sem contar a tentativa (worker encerrado)"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), available_at = ?, "
+                "lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (now, now, job_id, worker_id)
+            )
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def jobs(self, status: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Jobs mais recentes (opcionalmente de um status)"""
+        sql = "SELECT * FROM jobs"
+        params: List[Any] = []
+        if status:
+            sql += " WHERE status = ?"
+            params.append(status)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def counts(self) -> Dict[str, int]:
+        """Número de jobs por status"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+
+class IngestionWorker:
+    """Processa jobs da fila em threads, renovando os leases em andamento
+
+    No primeiro Ctrl+C (ou stop), termina os jobs em andamento e não pega
+    novos; no segundo, devolve-os à fila e sai. Se o processo morrer, os
+    leases expiram e os jobs voltam para a fila de outro worker.
+    """
+
+    def __init__(self, queue: IngestionQueue, concurrency: int = 2, lease_seconds: float = 60.0,
+                 poll_interval: float = 2.0, backoff_seconds: float = 30.0,
+                 processor_factory: Callable[[str], Any] = None):
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.backoff_seconds = backoff_seconds
+        self.processor_factory = processor_factory or self._default_processor
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._active: Dict[int, str] = {}
+        self._active_lock = threading.Lock()
+        self.processed = {'done': 0, 'queued': 0, 'failed': 0}
+
+    @staticmethod
+    def _default_processor(tenant: str):
+        from src.document_processor import DocumentProcessor
+        return DocumentProcessor(tenant=tenant)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, exit_when_empty: bool = False):
+        """Processar jobs até stop() (ou até a fila esvaziar)"""
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="ingestion-heartbeat", daemon=True)
+        heartbeat.start()
+        slots = [
+            threading.Thread(target=self._slot_loop, args=(f"{self.worker_prefix}:{slot}", exit_when_empty),
+                             name=f"ingestion-worker-{slot}", daemon=True)
+            for slot in range(self.concurrency)
+        ]
+        for thread in slots:
+            thread.start()
+        try:
+            self._join(slots)
+        except KeyboardInterrupt:
+            logger.warning("Interrompido: terminando os jobs em andamento (Ctrl+C de novo para sair já)")
+            self._stop.set()
+            try:
+                self._join(slots)
+            except KeyboardInterrupt:
+                self.release_active()
+                raise
+        finally:
+            self._stop.set()
+        return self.processed
+
+    @staticmethod
+    def _join(threads: List[threading.Thread]):
+        # join com timeout para o Ctrl+C chegar à thread principal
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=0.5)
+
+    def release_active(self):
+        """Devolver à fila os jobs em andamento (encerramento imediato)"""
+        with self._active_lock:
+            active = list(self._active.items())
+        for job_id, worker_id in active:
+            self.queue.release(job_id, worker_id)
+            logger.warning("Job %s devolvido à fila", job_id)
+
+    def _slot_loop(self, worker_id: str, exit_when_empty: bool):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(worker_id, self.lease_seconds)
+            except sqlite3.Error as e:
+                logger.warning(f"Erro ao consultar a fila de ingestão: {str(e)}")
+                job = None
+            if job is None:
+                if exit_when_empty and not any(self.queue.counts().get(s) for s in ACTIVE_STATUSES):
+                    return
+                self._stop.wait(self.poll_interval)
+                continue
+            self._process(job, worker_id)
+
+    def _count(self, status: str):
+        with self._active_lock:
+            self.processed[status] += 1
+
+    def _heartbeat_loop(self):
+        """Renovar os leases dos jobs em andamento (a cada 1/3 do lease)"""
+        while not self._stop.wait(self.lease_seconds / 3):
+            with self._active_lock:
+                active = list(self._active.items())
+            for job_id, worker_id in active:
+                try:
+                    if not self.queue.heartbeat(job_id, worker_id, self.lease_seconds):
+                        logger.warning("Job %s: lease perdido por %s", job_id, worker_id)
+                except sqlite3.Error as e:
+                    logger.warning(f"Erro ao renovar lease do job {job_id}: {str(e)}")
+
+    def _process(self, job: Dict[str, Any], worker_id: str):
+        job_id = job['id']
+        last_report = 0.0
+
+        def on_progress(stage: str, done: int, total: int):
+            # No máximo uma gravação por segundo, mais o fim de cada etapa
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report >= 1.0 or done >= total:
+                last_report = now
+                self.queue.report_progress(job_id, worker_id, stage, done, total, self.lease_seconds)
+
+        with self._active_lock:
+            self._active[job_id] = worker_id
+        logger.info("Job %s iniciado (%s %s, tentativa %d/%d): %s", job_id, job['action'], job['tenant'],
+                    job['attempts'], job['max_attempts'], job['source'])
+        try:
+            with span("ingestion.job", job_id=job_id, action=job['action'], file_type=job['file_type'],
+                      attempt=job['attempts']):
+                processor = self.processor_factory(job['tenant'])
+                if job['action'] == 'remove':
+                    chunks = processor.remove_document(os.path.basename(job['source']), job['source'])
+                    result = {'message': f"Documento {job['source']} removido", 'removed_chunks': chunks}
+                else:
+                    result = processor.process_document(job['source'], job['file_type'], on_progress=on_progress)
+            if self.queue.complete(job_id, worker_id, result):
+                self._count('done')
+                logger.info("Job %s concluído: %s", job_id, result.get('message'))
+            else:
+                logger.warning("Job %s concluído após perder o lease; resultado descartado", job_id)
+        except Exception as e:
+            status = self.queue.fail(job_id, worker_id, f"{type(e).__name__}: {e}", self.backoff_seconds)
+            if status:
+                self._count(status)
+            logger.error(f"Job {job_id} falhou ({status or 'lease perdido'}): {str(e)}")
+        finally:
+            with self._active_lock:
+                self._active.pop(job_id, None)
@@ -0,0 +1,189 @@
+"""
+Registro compartilhado de clientes LLM
+Todos os agentes reutilizam um único pool HTTP keep-alive
+
+Clientes assíncronos ficam presos ao event loop que abriu as conexões, então
+o pool assíncrono é um por loop em execução. Use run_async no lugar de
+asyncio.run para fechá-lo quando o loop termina.
+
+LLM_PROVIDER=mock troca o provedor OpenAI pelo provedor local determinístico
+(src/llm/mock_provider.py), sem rede nem API key.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, Awaitable, Dict, Optional, Tuple, TypeVar
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from src.llm.mock_provider import (
+    AsyncMockChatCompletions,
+    MockChatCompletions,
+    MockLLMProvider,
+    is_mock_provider
+)
+from src.llm.rate_limiter import AsyncRateLimitedCompletions, RateLimitedCompletions, get_rate_limiter
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar('T')
+
+_lock = threading.RLock()
+_http_client: Optional[httpx.Client] = None
+_openai_client: Optional[OpenAI] = None
+# Loop -> AsyncOpenAI (com o próprio pool); loops descartados saem sozinhos
+_async_openai_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]' = \
+    weakref.WeakKeyDictionary()
+_chat_models: Dict[Tuple[str, float], Any] = {}
+_mock_provider: Optional[MockLLMProvider] = None
+
+
+def get_model_name() -> str:
+    """Nome do modelo configurado"""
+    return os.getenv('OPENAI_MODEL_NAME', 'gpt-4-turbo-preview')
+
+
+def _pool_limits() -> httpx.Limits:
+    """Limites do pool de conexões (configuráveis por ambiente)"""
+    max_connections = int(os.getenv('LLM_MAX_CONNECTIONS', '20'))
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=float(os.getenv('LLM_KEEPALIVE_SECONDS', '60'))
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """Pool HTTP síncrono compartilhado"""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(limits=_pool_limits())
+    return _http_client
+
+
+def get_openai_client() -> OpenAI:
+    """Cliente OpenAI síncrono compartilhado, criado sob demanda"""
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                # Retries ficam a cargo de RateLimitedCompletions
+                _openai_client = OpenAI(
+                    api_key=os.getenv('OPENAI_API_KEY'),
+                    http_client=get_http_client(),
+                    max_retries=0
+                )
+                logger.info("Cliente OpenAI compartilhado criado")
+    return _openai_client
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Cliente AsyncOpenAI do event loop em execução, criado sob demanda
+    
+    Conexões keep-alive de um loop já fechado não podem ser reutilizadas
+    em outro, por isso cada loop tem o próprio cliente e pool HTTP.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_openai_clients.get(loop)
+        if client is None:
+            for closed_loop in [other for other in _async_openai_clients if other.is_closed()]:
+                # Loop encerrado sem run_async: as conexões já morreram com ele
+                del _async_openai_clients[closed_loop]
+            client = _async_openai_clients[loop] = AsyncOpenAI(
+                api_key=os.getenv('OPENAI_API_KEY'),
+                http_client=httpx.AsyncClient(limits=_pool_limits()),
+                max_retries=0
+            )
+            logger.info("Cliente AsyncOpenAI criado para o event loop atual")
+    return client
+
+
+async def aclose_async_clients():
+    """Fechar o cliente assíncrono do loop em execução (se houver)"""
+    with _lock:
+        client = _async_openai_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """asyncio.run que fecha o pool HTTP assíncrono antes de encerrar o loop"""
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await aclose_async_clients()
+    return asyncio.run(runner())
+
+
+class _LoopAsyncCompletions:
+    """chat.completions resolvido no cliente do loop de cada chamada
+    
+    Permite um único AsyncRateLimitedCompletions (e ChatOpenAI) por processo,
+    usado a partir de qualquer event loop.
+    """
+
+    async def create(self, **kwargs):
+        return await get_async_openai_client().chat.completions.create(**kwargs)
+
+
+def get_mock_provider() -> MockLLMProvider:
+    """Provedor mock compartilhado (configurado por ambiente)"""
+    global _mock_provider
+    if _mock_provider is None:
+        with _lock:
+            if _mock_provider is None:
+                _mock_provider = MockLLMProvider()
+                logger.info("Provedor LLM mock ativo (LLM_PROVIDER=mock)")
+    return _mock_provider
+
+
+def get_chat_completions() -> RateLimitedCompletions:
+    """chat.completions com rate limiting e retry compartilhados"""
+    if is_mock_provider():
+        completions = MockChatCompletions(get_mock_provider())
+    else:
+        completions = get_openai_client().chat.completions
+    return RateLimitedCompletions(completions, get_rate_limiter())
+
+
+def get_async_chat_completions() -> AsyncRateLimitedCompletions:
+    """Versão assíncrona de get_chat_completions"""
+    if is_mock_provider():
+        completions = AsyncMockChatCompletions(get_mock_provider())
+    else:
+        completions = _LoopAsyncCompletions()
+    return AsyncRateLimitedCompletions(completions, get_rate_limiter())
+
+
+def get_chat_llm(temperature: float, model: str = None):
+    """Visão ChatOpenAI (LangChain) por temperatura sobre o cliente compartilhado
+    
+    Agentes com a mesma temperatura recebem a mesma instância; todas as
+    instâncias usam o mesmo pool de conexões.
+    """
+    from langchain_openai import ChatOpenAI
+    
+    key = (model or get_model_name(), float(temperature))
+    chat_llm = _chat_models.get(key)
+    if chat_llm is None:
+        with _lock:
+            chat_llm = _chat_models.get(key)
+            if chat_llm is None:
+                extra = {'openai_api_key': 'mock'} if is_mock_provider() else {}
+                chat_llm = ChatOpenAI(
+                    model=key[0],
+                    temperature=key[1],
+                    client=get_chat_completions(),
+                    async_client=get_async_chat_completions(),
+                    **extra
+                )
+                _chat_models[key] = chat_llm
+    return chat_llm
@@ -0,0 +1,221 @@
+"""
+Provedor LLM local e determinístico para benchmarks e execuções offline
+Selecionado com LLM_PROVIDER=mock; imita a interface client.chat.completions
+
+Configuração por ambiente:
+    MOCK_LLM_SCRIPT            arquivo JSON/JSONL com respostas roteirizadas
+                               [{"match": "regex", "response": "..."}]
+    MOCK_LLM_LATENCY_MS        latência até o primeiro token (padrão 0)
+    MOCK_LLM_TOKENS_PER_SEC    taxa simulada de geração (0 = instantâneo)
+    MOCK_LLM_SECTION_SENTENCES frases por seção nas respostas por template
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Seções numeradas em maiúsculas, como "1. RESUMO EXECUTIVO" nos prompts
+SECTION_PATTERN = re.compile(r'^\s*\d+\.\s+([A-ZÁÉÍÓÚÂÊÔÃÕÇ][A-ZÁÉÍÓÚÂÊÔÃÕÇ0-9 &/()-]{3,})\s*$', re.MULTILINE)
+
+FILLER_SENTENCES = [
+    "O custodiante deve manter segregação patrimonial entre os ativos próprios e os de terceiros.",
+    "A conciliação diária das posições com B3, SELIC e CETIP reduz o risco operacional.",
+    "Os controles internos devem gerar trilha de auditoria completa para cada movimentação.",
+    "Conforme a Resolução CVM 35/2021, os registros devem ser mantidos pelo prazo de 5 anos.",
+    "A integração via mensageria ISO 20022 padroniza a troca de informações com os custodiantes.",
+    "Divergências acima do limite de tolerância devem ser tratadas em até 1 dia útil.",
+    "O monitoramento contínuo de SLA permite identificar gargalos na liquidação.",
+    "Perfis de acesso devem seguir o princípio do menor privilégio e ser revisados periodicamente.",
+    "Relatórios regulatórios devem ser gerados automaticamente a partir da base conciliada.",
+    "A arquitetura orientada a eventos desacopla a captura de posições do processamento.",
+    "Os requisitos não funcionais incluem disponibilidade de 99,9% no horário de mercado.",
+    "Planos de contingência devem ser testados ao menos uma vez por ano.",
+]
+
+
+class MockLLMProvider:
+    """Gera respostas roteirizadas ou por template, com latência simulada"""
+
+    def __init__(self,
+                 script_path: str = None,
+                 latency_ms: float = None,
+                 tokens_per_second: float = None,
+                 section_sentences: int = None):
+        self.latency = (latency_ms if latency_ms is not None
+                        else float(os.getenv('MOCK_LLM_LATENCY_MS', '0'))) / 1000.0
+        self.tokens_per_second = tokens_per_second if tokens_per_second is not None \
+            else float(os.getenv('MOCK_LLM_TOKENS_PER_SEC', '0'))
+        self.section_sentences = section_sentences if section_sentences is not None \
+            else int(os.getenv('MOCK_LLM_SECTION_SENTENCES', '4'))
+        self.script = self._load_script(script_path or os.getenv('MOCK_LLM_SCRIPT'))
+
+    def _load_script(self, script_path: Optional[str]) -> List[Dict[str, Any]]:
+        """Carregar respostas roteirizadas (JSON com lista ou JSONL)"""
+        if not script_path:
+            return []
+
+        with open(script_path, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+
+        if content.startswith('['):
+            entries = json.loads(content)
+        else:
+            entries = [json.loads(line) for line in content.splitlines() if line.strip()]
+
+        script = []
+        for entry in entries:
+            script.append({
+                'pattern': re.compile(entry.get('match', '.*'), re.IGNORECASE | re.DOTALL),
+                'response': entry['response']
+            })
+        logger.info(f"Roteiro do mock LLM carregado: {len(script)} respostas")
+        return script
+
+    def respond(self, messages: List[Dict[str, Any]]) -> str:
+        """Resposta determinística para as mensagens"""
+        prompt = "\n".join(str(m.get('content') or '') for m in messages)
+
+        for entry in self.script:
+            if entry['pattern'].search(prompt):
+                return entry['response']
+
+        text = self._templated_response(messages)
+        # Agentes CrewAI (ReAct) só encerram a task com "Final Answer:"
+        if 'Final Answer' in prompt:
+            text = f"Thought: Do I need to use a tool? No\nFinal Answer: {text}"
+        return text
+
+    def _templated_response(self, messages: List[Dict[str, Any]]) -> str:
+        """Documento markdown com as seções pedidas no prompt"""
+        user_messages = [m for m in messages if m.get('role') == 'user']
+        prompt = str(user_messages[-1].get('content') or '') if user_messages else ''
+
+        seed = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16], 16)
+        rng = random.Random(seed)
+
+        first_line = next((line.strip() for line in prompt.splitlines() if line.strip()), "Documento")
+        sections = [s.strip().title() for s in SECTION_PATTERN.findall(prompt)]
+        if not sections:
+            sections = ["Resumo", "Análise", "Recomendações"]
+
+        parts = [f"# {first_line[:120]}", ""]
+        for i, section in enumerate(sections, 1):
+            parts.append(f"## {i}. {section}")
+            parts.append("")
+            parts.append(" ".join(rng.choice(FILLER_SENTENCES) for _ in range(self.section_sentences)))
+            parts.append("")
+        return "\n".join(parts).rstrip() + "\n"
+
+    def tokens(self, text: str) -> List[str]:
+        """Fatiar texto em pseudo-tokens (palavras com o espaço seguinte)"""
+        return re.findall(r'\S+\s*|\s+', text)
+
+    def generation_delay(self, token_count: int) -> float:
+        """Tempo total simulado para gerar token_count tokens"""
+        per_token = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return self.latency + per_token * token_count
+
+    def usage(self, messages: List[Dict[str, Any]], text: str) -> Dict[str, int]:
+        prompt_tokens = sum(len(str(m.get('content') or '')) for m in messages) // 4
+        completion_tokens = len(self.tokens(text))
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+
+
+def _completion(provider: MockLLMProvider, model: str, messages, text: str) -> ChatCompletion:
+    return ChatCompletion(
+        id=f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        object='chat.completion',
+        created=int(time.time()),
+        model=model,
+        choices=[{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': text},
+            'finish_reason': 'stop'
+        }],
+        usage=provider.usage(messages, text)
+    )
+
+
+def _chunk(completion_id: str, model: str, token: Optional[str], finish_reason: str = None) -> ChatCompletionChunk:
+    delta = {'content': token} if token is not None else {}
+    return ChatCompletionChunk(
+        id=completion_id,
+        object='chat.completion.chunk',
+        created=int(time.time()),
+        model=model,
+        choices=[{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+    )
+
+
+class MockChatCompletions:
+    """Substituto síncrono de client.chat.completions"""
+
+    def __init__(self, provider: MockLLMProvider):
+        self.provider = provider
+
+    def create(self, messages=None, model: str = 'mock', stream: bool = False, **kwargs):
+        messages = list(messages or [])
+        text = self.provider.respond(messages)
+
+        if stream:
+            return self._stream(model, text)
+
+        time.sleep(self.provider.generation_delay(len(self.provider.tokens(text))))
+        return _completion(self.provider, model, messages, text)
+
+    def _stream(self, model: str, text: str) -> Iterator[ChatCompletionChunk]:
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        per_token = self.provider.generation_delay(1) - self.provider.latency
+        if self.provider.latency:
+            time.sleep(self.provider.latency)
+        for token in self.provider.tokens(text):
+            if per_token:
+                time.sleep(per_token)
+            yield _chunk(completion_id, model, token)
+        yield _chunk(completion_id, model, None, 'stop')
+
+
+class AsyncMockChatCompletions(MockChatCompletions):
+    """Substituto assíncrono de client.chat.completions"""
+
+    async def create(self, messages=None, model: str = 'mock', stream: bool = False, **kwargs):
+        messages = list(messages or [])
+        text = self.provider.respond(messages)
+
+        if stream:
+            return self._astream(model, text)
+
+        await asyncio.sleep(self.provider.generation_delay(len(self.provider.tokens(text))))
+        return _completion(self.provider, model, messages, text)
+
+    async def _astream(self, model: str, text: str):
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        per_token = self.provider.generation_delay(1) - self.provider.latency
+        if self.provider.latency:
+            await asyncio.sleep(self.provider.latency)
+        for token in self.provider.tokens(text):
+            if per_token:
+                await asyncio.sleep(per_token)
+            yield _chunk(completion_id, model, token)
+        yield _chunk(completion_id, model, None, 'stop')
+
+
+def is_mock_provider() -> bool:
+    """LLM_PROVIDER=mock seleciona o provedor local"""
+    return os.getenv('LLM_PROVIDER', 'openai').lower() == 'mock'
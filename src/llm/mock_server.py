@@ -0,0 +1,229 @@
+"""
+Servidor local compatível com o endpoint de chat completions da OpenAI
+Injeta respostas 429/5xx e impõe um teto de requisições por minuto, para
+exercitar rate limiting e retry sem depender do provedor real.
+
+Uso:
+    python -m src.llm.mock_server --port 8089 --rpm 120 --error-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=mock python main.py generate-prd ...
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from src.llm.mock_provider import MockLLMProvider
+from src.llm.rate_limiter import TokenBucket
+
+
+class MockOpenAIServer:
+    """Servidor mock em background, controlável programaticamente"""
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 requests_per_minute: Optional[float] = None,
+                 error_rate: float = 0.0,
+                 server_error_rate: float = 0.0,
+                 latency: float = 0.0,
+                 retry_after: float = 1.0,
+                 seed: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute
+        self.error_rate = error_rate
+        self.server_error_rate = server_error_rate
+        self.latency = latency
+        self.retry_after = retry_after
+        # Conteúdo das respostas vem do provedor mock (roteiro ou template)
+        self.provider = MockLLMProvider(latency_ms=0, tokens_per_second=0)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._ceiling = TokenBucket(requests_per_minute, requests_per_minute / 60.0) \
+            if requests_per_minute else None
+        self.stats = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'server_errors': 0}
+        self._stats_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _roll(self) -> float:
+        with self._random_lock:
+            return self._random.random()
+
+    def _decide(self) -> Optional[int]:
+        """Status de erro a injetar (None = sucesso)"""
+        if self._ceiling:
+            wait = self._ceiling.reserve(1)
+            if wait > 0:
+                # Requisição recusada não consome a cota
+                self._ceiling.adjust(1)
+                return 429
+        roll = self._roll()
+        if roll < self.error_rate:
+            return 429
+        if roll < self.error_rate + self.server_error_rate:
+            return 503 if roll < self.error_rate + self.server_error_rate / 2 else 500
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                except json.JSONDecodeError:
+                    self._send_json(400, {'error': {'message': 'JSON inválido', 'type': 'invalid_request_error'}})
+                    return
+
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': 'Endpoint não suportado', 'type': 'not_found'}})
+                    return
+
+                server._count('requests')
+                status = server._decide()
+                if status == 429:
+                    server._count('rate_limited')
+                    self._send_json(429, {'error': {'message': 'Rate limit exceeded', 'type': 'rate_limit_error'}},
+                                    {'retry-after': f"{server.retry_after:g}"})
+                    return
+                if status:
+                    server._count('server_errors')
+                    self._send_json(status, {'error': {'message': 'Upstream error', 'type': 'server_error'}})
+                    return
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                messages = request.get('messages') or []
+                text = server.completion_text(messages)
+                server._count('ok')
+
+                if request.get('stream'):
+                    self._stream(request, text)
+                else:
+                    self._send_json(200, server.completion_payload(request, messages, text))
+
+            def _stream(self, request: Dict[str, Any], text: str):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+                for token in server.stream_tokens(text):
+                    chunk = {
+                        'id': completion_id,
+                        'object': 'chat.completion.chunk',
+                        'created': int(time.time()),
+                        'model': request.get('model', 'mock'),
+                        'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def completion_text(self, messages: List[Dict[str, Any]]) -> str:
+        """Texto da resposta simulada"""
+        return self.provider.respond(messages)
+
+    def stream_tokens(self, text: str):
+        """Fatiar o texto em pseudo-tokens para streaming"""
+        return self.provider.tokens(text)
+
+    def completion_payload(self, request: Dict[str, Any], messages: List[Dict[str, Any]], text: str) -> Dict[str, Any]:
+        """Corpo de resposta no formato chat.completion"""
+        return {
+            'id': f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'mock'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': text},
+                'finish_reason': 'stop'
+            }],
+            'usage': self.provider.usage(messages, text)
+        }
+
+    def start(self) -> 'MockOpenAIServer':
+        """Iniciar servidor em thread daemon"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Encerrar servidor"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'MockOpenAIServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor mock da API de chat completions")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--rpm', type=float, default=None, help='Teto de requisições por minuto (429 acima disso)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fração de respostas 429 aleatórias')
+    parser.add_argument('--server-error-rate', type=float, default=0.0, help='Fração de respostas 500/503')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latência por resposta em segundos')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Valor do header Retry-After nas respostas 429')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(
+        host=args.host,
+        port=args.port,
+        requests_per_minute=args.rpm,
+        error_rate=args.error_rate,
+        server_error_rate=args.server_error_rate,
+        latency=args.latency,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    print(f"Mock OpenAI em {server.base_url} (Ctrl+C para encerrar)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+        print(json.dumps(server.stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+"""
+Rate limiting (token bucket) e retry com backoff exponencial para chamadas ao LLM
+Um único limitador por processo, compartilhado por todos os agentes
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import httpx
+import openai
+
+from src.utils.logger import setup_logger
+from src.utils.metrics import LLM_LATENCY, LLM_REQUESTS, LLM_TOKENS, current_agent, record_failure
+from src.utils.tracing import span
+
+logger = setup_logger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Token bucket com reserva: o saldo pode ficar negativo e o chamador
+    recebe quanto tempo deve esperar até que sua reserva esteja coberta"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+        self._updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        """Reservar amount e retornar a espera necessária em segundos"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Pedidos maiores que a capacidade nunca caberiam no bucket
+            self._tokens -= min(amount, self.capacity)
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.refill_per_second
+
+    def adjust(self, delta: float):
+        """Corrigir o saldo após conhecer o consumo real (delta > 0 devolve)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + delta)
+
+
+class RateLimiter:
+    """Limitador com orçamentos separados de requisições e tokens por minuto
+
+    Também aplica uma pausa global quando o provedor responde 429, para que
+    todos os agentes recuem juntos em vez de insistir.
+    """
+
+    def __init__(self,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0) \
+            if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0) \
+            if tokens_per_minute else None
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, estimated_tokens: int = 0) -> float:
+        """Reservar uma requisição e retornar a espera necessária"""
+        delay = 0.0
+        if self.requests:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens and estimated_tokens:
+            delay = max(delay, self.tokens.reserve(estimated_tokens))
+        with self._lock:
+            delay = max(delay, self._blocked_until - time.monotonic())
+        return delay
+
+    def acquire(self, estimated_tokens: int = 0):
+        """Bloquear até haver orçamento (uso síncrono)"""
+        delay = self.reserve(estimated_tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self, estimated_tokens: int = 0):
+        """Aguardar orçamento sem bloquear o event loop"""
+        delay = self.reserve(estimated_tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Ajustar o bucket de tokens com o consumo real informado pela API"""
+        if self.tokens and actual_tokens is not None:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def pause(self, seconds: float):
+        """Pausar todas as chamadas do processo (ex.: após 429 com Retry-After)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Erros transitórios: 429, 5xx, timeouts e falhas de conexão"""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError,
+                          httpx.TimeoutException, httpx.TransportError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Extrair Retry-After (ou retry-after-ms) da resposta de erro, se houver"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000.0
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Backoff exponencial com jitter completo"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def estimate_request_tokens(messages: Iterable[Dict[str, Any]], max_tokens: Optional[int] = None) -> int:
+    """Estimativa barata (≈4 caracteres por token) do custo de uma chamada"""
+    prompt_chars = sum(len(str(m.get('content') or '')) for m in messages or [])
+    completion = max_tokens or int(os.getenv('LLM_EXPECTED_COMPLETION_TOKENS', '1000'))
+    return prompt_chars // 4 + completion
+
+
+def _usage_tokens(response: Any) -> Optional[int]:
+    usage = getattr(response, 'usage', None)
+    return getattr(usage, 'total_tokens', None) if usage is not None else None
+
+
+def _prompt_tokens(messages: Iterable[Dict[str, Any]]) -> int:
+    return sum(len(str(m.get('content') or '')) for m in messages or []) // 4
+
+
+def _chunk_has_content(chunk: Any) -> bool:
+    choices = getattr(chunk, 'choices', None)
+    return bool(choices and getattr(choices[0].delta, 'content', None))
+
+
+class _MeteredStream:
+    """Repassa um stream de chunks contando os tokens gerados ao final"""
+
+    def __init__(self, stream, agent: str, prompt_tokens: int):
+        self._stream = stream
+        self._agent = agent
+        self._prompt_tokens = prompt_tokens
+        self._completion_tokens = 0
+        self._recorded = False
+
+    def _record(self):
+        if not self._recorded:
+            self._recorded = True
+            _record_tokens(self._agent, self._prompt_tokens, self._completion_tokens)
+
+    def _count(self, chunk):
+        if _chunk_has_content(chunk):
+            self._completion_tokens += 1
+        return chunk
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                yield self._count(chunk)
+        finally:
+            self._record()
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield self._count(chunk)
+        finally:
+            self._record()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._record()
+        close = getattr(self._stream, 'close', None)
+        if close:
+            close()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _record_tokens(agent: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, agent=agent, direction='in')
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, agent=agent, direction='out')
+
+
+def _record_response(agent: str, response: Any, kwargs: Dict[str, Any], elapsed: float):
+    """Métricas de uma chamada bem-sucedida; streams contam tokens ao serem consumidos"""
+    LLM_REQUESTS.inc(agent=agent, status='ok')
+    LLM_LATENCY.observe(elapsed, agent=agent)
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        _record_tokens(agent, getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None))
+        return response
+    if kwargs.get('stream'):
+        return _MeteredStream(response, agent, _prompt_tokens(kwargs.get('messages')))
+    return response
+
+
+def _record_error(agent: str):
+    LLM_REQUESTS.inc(agent=agent, status='error')
+    record_failure('llm.chat_completion')
+
+
+def _annotate_span(llm_span, response: Any, attempt: int):
+    """Registrar tentativas e tokens consumidos no span da chamada"""
+    llm_span.set_attribute('attempts', attempt + 1)
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        llm_span.set_attributes(
+            prompt_tokens=getattr(usage, 'prompt_tokens', None),
+            completion_tokens=getattr(usage, 'completion_tokens', None)
+        )
+
+
+class RetryPolicy:
+    """Parâmetros de retry configuráveis por ambiente"""
+
+    def __init__(self, max_retries: int = None, base_delay: float = None, max_delay: float = None):
+        self.max_retries = max_retries if max_retries is not None \
+            else int(os.getenv('LLM_MAX_RETRIES', '6'))
+        self.base_delay = base_delay if base_delay is not None \
+            else float(os.getenv('LLM_RETRY_BASE_DELAY', '1.0'))
+        self.max_delay = max_delay if max_delay is not None \
+            else float(os.getenv('LLM_RETRY_MAX_DELAY', '60'))
+
+    def delay_for(self, attempt: int, error: BaseException) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # Jitter pequeno para não sincronizar todos os agentes
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return backoff_delay(attempt, self.base_delay, self.max_delay)
+
+
+class RateLimitedCompletions:
+    """Proxy de client.chat.completions com rate limiting e retry
+
+    Compatível com SimpleAgent e com ChatOpenAI (LangChain), que chamam
+    apenas create(**kwargs).
+    """
+
+    def __init__(self, completions, limiter: RateLimiter, policy: RetryPolicy = None):
+        self._completions = completions
+        self.limiter = limiter
+        self.policy = policy or RetryPolicy()
+
+    def create(self, **kwargs):
+        estimated = estimate_request_tokens(kwargs.get('messages'), kwargs.get('max_tokens'))
+
+        agent = current_agent()
+        start = time.perf_counter()
+        with span("llm.chat_completion", model=kwargs.get('model'), stream=bool(kwargs.get('stream')),
+                  estimated_tokens=estimated) as llm_span:
+            for attempt in range(self.policy.max_retries + 1):
+                self.limiter.acquire(estimated)
+                try:
+                    response = self._completions.create(**kwargs)
+                except Exception as e:
+                    # Chamada rejeitada não consome o orçamento de tokens
+                    self.limiter.record_usage(estimated, 0)
+                    if attempt >= self.policy.max_retries or not is_retryable(e):
+                        _record_error(agent)
+                        raise
+                    delay = self.policy.delay_for(attempt, e)
+                    if getattr(e, 'status_code', None) == 429:
+                        self.limiter.pause(delay)
+                    logger.warning(f"Chamada ao LLM falhou ({type(e).__name__}), "
+                                   f"tentativa {attempt + 2} em {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+
+                self.limiter.record_usage(estimated, _usage_tokens(response))
+                _annotate_span(llm_span, response, attempt)
+                return _record_response(agent, response, kwargs, time.perf_counter() - start)
+
+
+class AsyncRateLimitedCompletions(RateLimitedCompletions):
+    """Versão assíncrona de RateLimitedCompletions"""
+
+    async def create(self, **kwargs):
+        estimated = estimate_request_tokens(kwargs.get('messages'), kwargs.get('max_tokens'))
+
+        agent = current_agent()
+        start = time.perf_counter()
+        with span("llm.chat_completion", model=kwargs.get('model'), stream=bool(kwargs.get('stream')),
+                  estimated_tokens=estimated) as llm_span:
+            for attempt in range(self.policy.max_retries + 1):
+                await self.limiter.aacquire(estimated)
+                try:
+                    response = await self._completions.create(**kwargs)
+                except Exception as e:
+                    # Chamada rejeitada não consome o orçamento de tokens
+                    self.limiter.record_usage(estimated, 0)
+                    if attempt >= self.policy.max_retries or not is_retryable(e):
+                        _record_error(agent)
+                        raise
+                    delay = self.policy.delay_for(attempt, e)
+                    if getattr(e, 'status_code', None) == 429:
+                        self.limiter.pause(delay)
+                    logger.warning(f"Chamada ao LLM falhou ({type(e).__name__}), "
+                                   f"tentativa {attempt + 2} em {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                self.limiter.record_usage(estimated, _usage_tokens(response))
+                _annotate_span(llm_span, response, attempt)
+                return _record_response(agent, response, kwargs, time.perf_counter() - start)
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Limitador compartilhado do processo, configurado por ambiente
+
+    LLM_REQUESTS_PER_MINUTE e LLM_TOKENS_PER_MINUTE (ausentes = sem limite).
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                rpm = os.getenv('LLM_REQUESTS_PER_MINUTE')
+                tpm = os.getenv('LLM_TOKENS_PER_MINUTE')
+                _rate_limiter = RateLimiter(
+                    requests_per_minute=float(rpm) if rpm else None,
+                    tokens_per_minute=float(tpm) if tpm else None
+                )
+    return _rate_limiter
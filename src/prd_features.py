@@ -0,0 +1,127 @@
+"""
+Extração da lista de features de um PRD em markdown
+Base do comando generate-features-from-prd, que gera uma especificação por feature
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$', re.MULTILINE)
+
+# Seções do PRD onde as features são descritas
+FEATURE_SECTION_PATTERN = re.compile(
+    r'(requirements?|requisitos)\s+funcionais|funcionalidades|features|escopo funcional',
+    re.IGNORECASE
+)
+
+# Requisito funcional isolado ("RF001 - Conectores Multi-Custodiante")
+REQUIREMENT_PATTERN = re.compile(r'^RF\s*-?\d+\s*[-–:.]\s*', re.IGNORECASE)
+
+# Prefixo de numeração ("3.1 ", "2) ", "F001 - ")
+NUMBERING_PATTERN = re.compile(r'^(?:[A-Z]{1,3}\d+\s*[-–:.]\s*|\d+(?:\.\d+)*[.)]?\s+)')
+
+SLUG_STOPWORDS = {'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'com',
+                  'para', 'por', 'no', 'na', 'nos', 'nas', 'um', 'uma', 'the', 'of', 'and', 'for'}
+
+
+def _clean_title(title: str) -> str:
+    title = re.sub(r'[*_`]', '', title).strip()
+    return NUMBERING_PATTERN.sub('', title).strip()
+
+
+def slugify(title: str, max_words: int = 2) -> str:
+    """Slug curto em ASCII ("Módulo de Integração com ..." -> "modulo_integracao")"""
+    ascii_title = unicodedata.normalize('NFKD', title).encode('ascii', 'ignore').decode('ascii')
+    words = [w for w in re.findall(r'[a-z0-9]+', ascii_title.lower()) if w not in SLUG_STOPWORDS]
+    return "_".join(words[:max_words]) or "feature"
+
+
+def feature_filename(index: int, title: str) -> str:
+    """Nome numerado da saída, no padrão features_01_modulo_integracao.md"""
+    return f"features_{index:02d}_{slugify(title)}.md"
+
+
+def prd_title(prd_text: str) -> str:
+    """Título do PRD (primeiro cabeçalho), sem prefixos como "PRD -" """
+    match = HEADING_PATTERN.search(prd_text)
+    if not match:
+        return "PRD"
+    return re.sub(r'^PRD\s*[-–:]\s*', '', _clean_title(match.group(2))) or "PRD"
+
+
+def _sections(prd_text: str) -> List[Dict[str, object]]:
+    """Cabeçalhos com nível, título e corpo (até o próximo cabeçalho de nível igual ou menor)"""
+    headings = list(HEADING_PATTERN.finditer(prd_text))
+    sections = []
+    for i, match in enumerate(headings):
+        level = len(match.group(1))
+        end = len(prd_text)
+        for following in headings[i + 1:]:
+            if len(following.group(1)) <= level:
+                end = following.start()
+                break
+        sections.append({
+            'level': level,
+            'title': match.group(2),
+            'start': match.start(),
+            'end': end,
+            'body': prd_text[match.end():end].strip()
+        })
+    return sections
+
+
+def extract_features(prd_text: str, max_features: Optional[int] = None) -> List[Dict[str, str]]:
+    """Extrair features do PRD
+
+    Usa os subtópicos da seção de requisitos funcionais (ex.: "### 3.1 Módulo de
+    Integração"); sem subtópicos, usa os requisitos "RF001 - ..." do documento.
+    Retorna [{'title', 'description'}] na ordem do PRD.
+    """
+    sections = _sections(prd_text)
+    features = []
+
+    for section in sections:
+        if not FEATURE_SECTION_PATTERN.search(section['title']):
+            continue
+        children = [
+            s for s in sections
+            if section['start'] < s['start'] < section['end'] and s['level'] == section['level'] + 1
+        ]
+        for child in children:
+            features.append({'title': _clean_title(child['title']), 'description': child['body']})
+        if features:
+            break
+
+    if not features:
+        for section in sections:
+            plain_title = re.sub(r'[*_`]', '', section['title']).strip()
+            if REQUIREMENT_PATTERN.match(plain_title):
+                features.append({
+                    'title': REQUIREMENT_PATTERN.sub('', plain_title).strip(),
+                    'description': section['body']
+                })
+
+    if max_features:
+        features = features[:max_features]
+    logger.info(f"Features extraídas do PRD: {len(features)}")
+    return features
+
+
+def parse_feature_list(text: str) -> List[Dict[str, str]]:
+    """Interpretar lista "- Nome: descrição" (uma feature por linha) gerada pelo LLM"""
+    features = []
+    for line in text.splitlines():
+        match = re.match(r'^\s*(?:[-*•]|\d+[.)])\s+(.+)$', line)
+        if not match:
+            continue
+        item = re.sub(r'[*_`]', '', match.group(1)).strip()
+        title, _, description = item.partition(':')
+        title = _clean_title(title)
+        if title:
+            features.append({'title': title, 'description': description.strip()})
+    return features
@@ -0,0 +1,101 @@
+"""
+Extração de citações normativas ("nos termos do Art. 5º da Resolução CVM 35")
+Base do grafo de citações do índice regulatório: chunk que cita -> norma/artigo citado
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+# Tipo de norma; o mais longo primeiro na alternância
+NORM_KINDS = ('Lei Complementar', 'Medida Provisória', 'Carta Circular', 'Ofício Circular',
+              'Resolução Conjunta', 'Resolução', 'Instrução', 'Circular', 'Deliberação',
+              'Comunicado', 'Decreto', 'Lei')
+
+# Emissor como aparece no texto -> forma canônica
+ISSUERS = {'CVM': 'CVM', 'BCB': 'BCB', 'BACEN': 'BCB', 'CMN': 'CMN', 'ANBIMA': 'ANBIMA',
+           'AMBIMA': 'ANBIMA', 'B3': 'B3', 'SUSEP': 'SUSEP', 'PREVIC': 'PREVIC'}
+
+_KIND_ALTERNATION = "|".join(re.escape(kind).replace(r'\ ', r'[\s-]+') for kind in NORM_KINDS)
+_ISSUER_ALTERNATION = "|".join(sorted(ISSUERS, key=len, reverse=True))
+
+NORM_PATTERN = (
+    rf"(?P<kind>{_KIND_ALTERNATION})\s+"
+    rf"(?:(?P<issuer>{_ISSUER_ALTERNATION})\s+)?"
+    r"(?:n[º°o.]?\s*)?(?P<number>\d{1,3}(?:\.\d{3})+|\d+)"
+    r"(?:\s*/\s*(?P<year>\d{2,4}))?"
+)
+CODE_PATTERN = rf"(?P<code>Código\s+(?P<code_issuer>{_ISSUER_ALTERNATION}))"
+
+# Artigo opcional antes da norma: "Art. 5º, § 2º, da", "artigo 12 do"
+ARTICLE_PREFIX = (
+    r"(?:\b(?:Artigo|Arts?\.?)\s*(?P<article>\d+)\s*[º°o]?"
+    r"(?:\s*,?\s*(?:§|inciso|parágrafo|caput|alínea)[^,;.]{0,30}?)?,?\s+(?:da|do|na|no|pela|pelo)\s+)?"
+)
+
+CITATION = re.compile(ARTICLE_PREFIX + rf"(?:{NORM_PATTERN}|{CODE_PATTERN})", re.IGNORECASE)
+
+# Trecho inicial do documento onde a própria norma costuma ser identificada
+OWN_NORM_WINDOW = 400
+
+
+def _ascii(text: str) -> str:
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+
+def _canonical_kind(kind: str) -> str:
+    collapsed = re.sub(r'[\s-]+', ' ', kind).lower()
+    for canonical in NORM_KINDS:
+        if canonical.lower() == collapsed:
+            return canonical
+    return kind
+
+
+def _norm_from_match(match: re.Match) -> Dict[str, str]:
+    """Identificador (ascii, minúsculo) e rótulo canônico da norma citada"""
+    if match.group('code'):
+        issuer = ISSUERS[match.group('code_issuer').upper()]
+        label = f"Código {issuer}"
+    else:
+        kind = _canonical_kind(match.group('kind'))
+        issuer = ISSUERS.get((match.group('issuer') or '').upper(), '')
+        number = match.group('number').replace('.', '')
+        label = " ".join(part for part in (kind, issuer, number) if part)
+    return {'norm_id': "-".join(_ascii(label).lower().split()), 'norm_label': label}
+
+
+def extract_citations(content: str) -> List[Dict[str, object]]:
+    """Citações do texto: norma, artigo (quando houver), trecho e posição"""
+    citations = []
+    for match in CITATION.finditer(content):
+        norm = _norm_from_match(match)
+        article = match.group('article')
+        citations.append({
+            'norm_id': norm['norm_id'],
+            'norm_label': norm['norm_label'],
+            'article': int(article) if article else None,
+            'text': match.group(0).strip(),
+            'position': match.start()
+        })
+    return citations
+
+
+def document_norm(first_chunk: str) -> Optional[Dict[str, str]]:
+    """Norma que o próprio documento publica (primeira referência no cabeçalho)"""
+    match = CITATION.search(first_chunk[:OWN_NORM_WINDOW])
+    if not match or match.group('article'):
+        return None
+    return _norm_from_match(match)
+
+
+def parse_reference(reference: str) -> Optional[Dict[str, object]]:
+    """Interpretar "Art. 5 da Resolução CVM 35" ou "Resolução CVM nº 35/2021"
+
+    Retorna {'norm_id', 'norm_label', 'article'} ou None se não houver norma.
+    """
+    match = CITATION.search(reference)
+    if not match:
+        return None
+    norm = _norm_from_match(match)
+    article = match.group('article')
+    return {**norm, 'article': int(article) if article else None}
@@ -0,0 +1,245 @@
+"""
+Extração estruturada de conteúdo regulatório: obrigações, prazos, penalidades e artigos
+Usada na ingestão (índice regulatório) e pelo RegulationAnalyzerTool
+
+Os padrões são compilados uma vez e combinados num único scanner: uma
+passada por chunk localiza os inícios de cada tipo e as áreas de foco, e só
+então o padrão completo do tipo é aplicado na posição.
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Tipo de extração -> (padrão, flags)
+PATTERNS = {
+    'obligation': (r'(?:deve|deverá|é obrigatório|é necessário|obriga-se)[\s\w,.:;-]+[.!]', re.IGNORECASE),
+    'deadline': (r'(?:prazo de|até|no prazo máximo de|em até)\s+\d+\s+(?:dias|meses|anos)[\s\w,.:;-]*[.!]', re.IGNORECASE),
+    'penalty': (r'(?:multa|penalidade|sanção|advertência)[\s\w,.:;-]+[.!]', re.IGNORECASE),
+    'article': (r'(?:Art\.|Artigo)\s+\d+[\s\w,.:;-]+[.!]', 0)
+}
+
+# Início de cada tipo, em minúsculas: toda ocorrência começa por um destes termos
+# (para 'article', o padrão completo confere a caixa na posição)
+TRIGGERS = {
+    'obligation': ('deve', 'é obrigatório', 'é necessário', 'obriga-se'),
+    'deadline': ('prazo de', 'até', 'no prazo máximo de', 'em até'),
+    'penalty': ('multa', 'penalidade', 'sanção', 'advertência'),
+    'article': ('art.', 'artigo')
+}
+
+ITEM_TYPES = tuple(PATTERNS)
+
+# Tipo de extração -> chave na análise do RegulationAnalyzerTool
+ANALYSIS_KEYS = {
+    'obligation': 'obligations',
+    'deadline': 'deadlines',
+    'penalty': 'penalties',
+    'article': 'key_articles'
+}
+
+COMPILED_PATTERNS = {item_type: re.compile(pattern, flags) for item_type, (pattern, flags) in PATTERNS.items()}
+
+TRIGGER_TYPES = {trigger: item_type for item_type, triggers in TRIGGERS.items() for trigger in triggers}
+
+# Duração de um prazo extraído: quantidade, unidade e qualificador de dias
+DEADLINE_DURATION = re.compile(r'(\d+)\s+(dias|meses|anos)(?:\s+(úteis|uteis|corridos))?', re.IGNORECASE)
+
+# Cada prazo dentro de uma extração (o padrão 'deadline' é guloso e pode conter vários)
+DEADLINE_PHRASE = re.compile(
+    r'(?:prazo de|até|no prazo máximo de|em até)\s+' + DEADLINE_DURATION.pattern + r'[^.!]*[.!]?',
+    re.IGNORECASE
+)
+
+# Unidade do texto -> (unidade normalizada, dias corridos por unidade)
+DEADLINE_UNITS = {'dias': ('days', 1), 'meses': ('months', 30), 'anos': ('years', 365)}
+
+
+class RegulationScanner:
+    """Scanner combinado dos tipos de extração e de um conjunto de áreas de foco
+
+    O resultado é idêntico a aplicar cada padrão com finditer e separar o
+    texto em frases por área. A busca combinada roda sobre o texto em
+    minúsculas sem IGNORECASE, o que permite ao re saltar direto para os
+    candidatos; o padrão completo do tipo só é aplicado nessas posições.
+    """
+
+    def __init__(self, focus_areas: Iterable[str] = ()):
+        self.focus_areas = tuple(dict.fromkeys(focus_areas))
+        # Áreas com '.' nunca cabem numa frase; mais longas primeiro na alternância
+        self._searchable = sorted({a.lower() for a in self.focus_areas if a and '.' not in a},
+                                  key=len, reverse=True)
+
+        # Alternância sem grupos nomeados (grupos impedem o re de saltar por prefixo);
+        # o tipo sai do termo encontrado. Termos de tipo vêm antes das áreas: se uma
+        # área é reportada, nenhum termo de tipo começa naquela posição
+        triggers = [trigger for item_type in ITEM_TYPES for trigger in TRIGGERS[item_type]]
+        self.focus_pattern = None
+        alternation = triggers
+        if self._searchable:
+            self.focus_pattern = re.compile("|".join(re.escape(area) for area in self._searchable))
+            alternation = triggers + self._searchable
+        # Área -> áreas que são prefixo dela; termos de tipo que podem coincidir com uma área
+        self._area_prefixes = {area: [other for other in self._searchable if area.startswith(other)]
+                               for area in self._searchable}
+        self._trigger_overlaps = {trigger for trigger in triggers
+                                  if any(trigger.startswith(a) or a.startswith(trigger) for a in self._searchable)}
+        self.pattern = re.compile("|".join(re.escape(term) for term in alternation))
+
+    def _areas_at(self, lowered: str, position: int, matched: str) -> List[str]:
+        """Áreas que começam na posição (a mais longa contém as demais como prefixo)"""
+        areas = self._area_prefixes.get(matched)
+        if areas is not None:
+            return areas
+        if matched not in self._trigger_overlaps:
+            return []
+        match = self.focus_pattern.match(lowered, position)
+        return self._area_prefixes[match.group(0)] if match else []
+
+    def scan(self, content: str, limits: Optional[Dict[str, int]] = None) -> Dict[str, object]:
+        """Itens por tipo e frases por área de foco, em uma passada
+
+        limits (tipo -> máximo) encerra a extração do tipo ao atingir o limite.
+        Retorna {'items': [{type, text, position}], 'focus': {área: [frases]}}.
+        """
+        lowered = content.lower()
+        if len(lowered) != len(content):
+            # lower() mudou o tamanho (ex.: 'İ'): posições não se alinham
+            return self._scan_unaligned(content, limits)
+
+        found: Dict[str, List[Dict[str, object]]] = {item_type: [] for item_type in ITEM_TYPES}
+        next_start = dict.fromkeys(ITEM_TYPES, 0)
+        remaining = {item_type: (limits or {}).get(item_type) for item_type in ITEM_TYPES}
+        active = {item_type for item_type in ITEM_TYPES if remaining[item_type] != 0}
+        area_hits: Dict[str, List[int]] = {}
+        search = self.pattern.search
+        track_focus = self.focus_pattern is not None
+
+        position = 0
+        while active or track_focus:
+            hit = search(lowered, position)
+            if hit is None:
+                break
+            hit_start = hit.start()
+            # Próxima busca na posição seguinte: candidatos sobrepostos continuam visíveis
+            position = hit_start + 1
+
+            matched = hit.group(0)
+            kind = TRIGGER_TYPES.get(matched)
+            if track_focus:
+                for area in self._areas_at(lowered, hit_start, matched):
+                    area_hits.setdefault(area, []).append(hit_start)
+            if kind not in active or hit_start < next_start[kind]:
+                continue
+
+            # Mesmo tipo não se sobrepõe (semântica do finditer)
+            match = COMPILED_PATTERNS[kind].match(content, hit_start)
+            if match:
+                found[kind].append({'type': kind, 'text': match.group(0).strip(), 'position': hit_start})
+                next_start[kind] = match.end()
+                if remaining[kind] is not None:
+                    remaining[kind] -= 1
+                    if remaining[kind] == 0:
+                        active.discard(kind)
+                        if not active and track_focus:
+                            # Tipos encerrados: o restante da passada só procura áreas
+                            search = self.focus_pattern.search
+            if not track_focus and active:
+                # Sem áreas de foco, nada útil antes do fim da última ocorrência de cada tipo
+                position = max(position, min(next_start[item_type] for item_type in active))
+
+        items = [item for item_type in ITEM_TYPES for item in found[item_type]]
+        return {'items': items, 'focus': self._focus_sentences(content, area_hits)}
+
+    def _focus_sentences(self, content: str, area_hits: Dict[str, List[int]]) -> Dict[str, List[str]]:
+        focus = {}
+        for area in self.focus_areas:
+            positions = area_hits.get(area.lower())
+            if not positions:
+                continue
+            sentences = []
+            last_start = -1
+            for position in positions:
+                # Mesmas frases de content.split('.')
+                start = content.rfind('.', 0, position) + 1
+                if start == last_start:
+                    continue
+                last_start = start
+                end = content.find('.', position)
+                sentences.append(content[start:end if end != -1 else len(content)].strip() + '.')
+            focus[area] = sentences
+        return focus
+
+    def _scan_unaligned(self, content: str, limits: Optional[Dict[str, int]] = None) -> Dict[str, object]:
+        """Extração padrão a padrão (referência), para textos cujo lower() muda o tamanho"""
+        items = []
+        for item_type in ITEM_TYPES:
+            limit = (limits or {}).get(item_type)
+            for count, match in enumerate(COMPILED_PATTERNS[item_type].finditer(content)):
+                if limit is not None and count >= limit:
+                    break
+                items.append({'type': item_type, 'text': match.group(0).strip(), 'position': match.start()})
+
+        focus = {}
+        sentences = content.split('.')
+        for area in self.focus_areas:
+            area_lower = area.lower()
+            relevant = [s.strip() + '.' for s in sentences if area_lower in s.lower()]
+            if relevant:
+                focus[area] = relevant
+        return {'items': items, 'focus': focus}
+
+
+def _duration(match: re.Match) -> Dict[str, object]:
+    amount = int(match.group(1))
+    unit, unit_days = DEADLINE_UNITS[match.group(2).lower()]
+    business_days = unit == 'days' and (match.group(3) or '').lower() in ('úteis', 'uteis')
+    days = math.ceil(amount * 7 / 5) if business_days else amount * unit_days
+    return {'amount': amount, 'unit': unit, 'business_days': business_days, 'days': days}
+
+
+def deadline_durations(text: str) -> List[Dict[str, object]]:
+    """Prazos normalizados de uma extração ("em até 5 dias úteis ...")
+
+    Um item por prazo: {'amount', 'unit' (days/months/years), 'business_days',
+    'days', 'text', 'offset'}, onde days é o equivalente em dias corridos
+    (dias úteis × 7/5, mês = 30, ano = 365) e offset a posição no texto.
+    """
+    durations = []
+    for match in DEADLINE_PHRASE.finditer(text):
+        duration = _duration(match)
+        duration.update({'text': match.group(0).strip(), 'offset': match.start()})
+        durations.append(duration)
+    return durations
+
+
+def deadline_label(duration: Dict[str, object]) -> str:
+    """Prazo normalizado para exibição ("5 dias úteis ≈ 7 dias corridos")"""
+    units = {'days': 'dias úteis' if duration['business_days'] else 'dias', 'months': 'meses', 'years': 'anos'}
+    label = f"{duration['amount']} {units[duration['unit']]}"
+    if duration['unit'] != 'days' or duration['business_days']:
+        label += f" ≈ {duration['days']} dias corridos"
+    return label
+
+
+@lru_cache(maxsize=128)
+def get_scanner(focus_areas: Tuple[str, ...] = ()) -> RegulationScanner:
+    """Scanner compilado para o conjunto de áreas de foco (reaproveitado entre chamadas)"""
+    return RegulationScanner(focus_areas)
+
+
+def scan(content: str, focus_areas: Iterable[str] = (),
+         limits: Optional[Dict[str, int]] = None) -> Dict[str, object]:
+    """Itens e frases de foco do texto em uma passada (ver RegulationScanner.scan)"""
+    return get_scanner(tuple(focus_areas)).scan(content, limits)
+
+
+def extract_items(content: str) -> List[Dict[str, object]]:
+    """Todas as ocorrências de cada tipo no texto, com a posição de início"""
+    return get_scanner().scan(content)['items']
+
+
+def focus_sentences(content: str, area: str) -> List[str]:
+    """Frases do texto que mencionam a área de foco"""
+    return get_scanner((area,)).scan(content)['focus'].get(area, [])
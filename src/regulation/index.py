@@ -0,0 +1,483 @@
+"""
+Índice regulatório estruturado (SQLite) com as extrações de cada chunk
+Preenchido na ingestão; consultas por tópico (FTS5), fonte e tipo de extração,
+prazos normalizados em dias para consultas por faixa e o grafo de citações
+entre normas (quem cita X / o que X cita), com um arquivo por tenant
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.regulation.citations import document_norm, extract_citations, parse_reference
+from src.regulation.extractor import ITEM_TYPES, deadline_durations, extract_items, focus_sentences
+from src.tenants import DEFAULT_TENANT, current_tenant
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    doc_type TEXT,
+    source_path TEXT,
+    chunk_index INTEGER,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source);
+CREATE TABLE IF NOT EXISTS extractions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chunk_id TEXT NOT NULL REFERENCES chunks(chunk_id) ON DELETE CASCADE,
+    item_type TEXT NOT NULL,
+    text TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_extractions_type ON extractions(item_type);
+CREATE INDEX IF NOT EXISTS idx_extractions_chunk ON extractions(chunk_id);
+CREATE TABLE IF NOT EXISTS deadlines (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chunk_id TEXT NOT NULL REFERENCES chunks(chunk_id) ON DELETE CASCADE,
+    amount INTEGER NOT NULL,
+    unit TEXT NOT NULL,
+    business_days INTEGER NOT NULL DEFAULT 0,
+    days INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deadlines_days ON deadlines(days);
+CREATE INDEX IF NOT EXISTS idx_deadlines_chunk ON deadlines(chunk_id);
+CREATE TABLE IF NOT EXISTS citations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chunk_id TEXT NOT NULL REFERENCES chunks(chunk_id) ON DELETE CASCADE,
+    source TEXT NOT NULL,
+    norm_id TEXT NOT NULL,
+    norm_label TEXT NOT NULL,
+    article INTEGER,
+    text TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_citations_norm ON citations(norm_id, article);
+CREATE INDEX IF NOT EXISTS idx_citations_source ON citations(source);
+CREATE TABLE IF NOT EXISTS document_norms (
+    source TEXT PRIMARY KEY,
+    norm_id TEXT NOT NULL,
+    norm_label TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_document_norms_norm ON document_norms(norm_id);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    content, chunk_id UNINDEXED, tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+TOPIC_STOPWORDS = {'de', 'da', 'do', 'das', 'dos', 'para', 'com', 'por', 'que', 'uma', 'the', 'and', 'nos', 'nas'}
+
+
+def topic_terms(topic: Optional[str]) -> List[str]:
+    """Termos relevantes do tópico (sem stopwords e palavras curtas)"""
+    if not topic:
+        return []
+    return [t for t in re.findall(r'\w+', topic.lower()) if len(t) > 2 and t not in TOPIC_STOPWORDS]
+
+
+class RegulationIndex:
+    """Extrações regulatórias por chunk, com proveniência (fonte e posição)"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.getenv('REGULATION_INDEX_PATH', './data/regulation_index.sqlite3')
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.fts_enabled = True
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _init_schema(self):
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+            except sqlite3.OperationalError as e:
+                # SQLite sem FTS5: filtro por tópico com LIKE
+                logger.warning(f"FTS5 indisponível, busca por tópico via LIKE: {str(e)}")
+                self.fts_enabled = False
+            conn.commit()
+
+    def _delete_source(self, conn: sqlite3.Connection, source: str):
+        if self.fts_enabled:
+            conn.execute(
+                "DELETE FROM chunks_fts WHERE chunk_id IN (SELECT chunk_id FROM chunks WHERE source = ?)",
+                (source,)
+            )
+        conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+        conn.execute("DELETE FROM document_norms WHERE source = ?", (source,))
+
+    def index_chunks(self, source: str, doc_type: str, source_path: str,
+                     chunk_ids: List[str], chunks: List[str]) -> int:
+        """Extrair e gravar itens de todos os chunks de um documento
+
+        Reindexar a mesma fonte substitui as extrações anteriores.
+        Retorna o número de itens extraídos.
+        """
+        chunk_rows = []
+        extraction_rows = []
+        deadline_rows = []
+        citation_rows = []
+        own_norm = document_norm(chunks[0]) if chunks else None
+        for chunk_index, (chunk_id, content) in enumerate(zip(chunk_ids, chunks)):
+            chunk_rows.append((chunk_id, source, doc_type, source_path, chunk_index, content))
+            for citation in extract_citations(content):
+                # Referências à própria norma do documento não são arestas
+                if own_norm and citation['norm_id'] == own_norm['norm_id']:
+                    continue
+                citation_rows.append((chunk_id, source, citation['norm_id'], citation['norm_label'],
+                                      citation['article'], citation['text'], citation['position']))
+            for item in extract_items(content):
+                extraction_rows.append((chunk_id, item['type'], item['text'], item['position']))
+                if item['type'] != 'deadline':
+                    continue
+                for duration in deadline_durations(item['text']):
+                    deadline_rows.append((chunk_id, duration['amount'], duration['unit'],
+                                          int(duration['business_days']), duration['days'],
+                                          duration['text'], item['position'] + duration['offset']))
+
+        with closing(self._connect()) as conn, conn:
+            self._delete_source(conn, source)
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, source, doc_type, source_path, chunk_index, content) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                chunk_rows
+            )
+            if self.fts_enabled:
+                conn.executemany(
+                    "INSERT INTO chunks_fts (content, chunk_id) VALUES (?, ?)",
+                    [(row[5], row[0]) for row in chunk_rows]
+                )
+            conn.executemany(
+                "INSERT INTO extractions (chunk_id, item_type, text, position) VALUES (?, ?, ?, ?)",
+                extraction_rows
+            )
+            conn.executemany(
+                "INSERT INTO deadlines (chunk_id, amount, unit, business_days, days, text, position) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                deadline_rows
+            )
+            conn.executemany(
+                "INSERT INTO citations (chunk_id, source, norm_id, norm_label, article, text, position) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                citation_rows
+            )
+            if own_norm:
+                conn.execute(
+                    "INSERT OR REPLACE INTO document_norms (source, norm_id, norm_label) VALUES (?, ?, ?)",
+                    (source, own_norm['norm_id'], own_norm['norm_label'])
+                )
+
+        logger.info("Índice regulatório: %s (%d chunks, %d itens)", source, len(chunk_rows), len(extraction_rows))
+        return len(extraction_rows)
+
+    def remove_source(self, source: str):
+        """Remover chunks e extrações de uma fonte"""
+        with closing(self._connect()) as conn, conn:
+            self._delete_source(conn, source)
+
+    def rebuild_from_collection(self, collection, batch_size: int = 1000) -> Dict[str, int]:
+        """Reconstruir o índice a partir dos chunks já gravados no ChromaDB"""
+        by_source: Dict[str, Dict[str, Any]] = {}
+        offset = 0
+        while True:
+            batch = collection.get(include=['documents', 'metadatas'], limit=batch_size, offset=offset)
+            if not batch['ids']:
+                break
+            for chunk_id, content, metadata in zip(batch['ids'], batch['documents'], batch['metadatas']):
+                entry = by_source.setdefault(metadata['filename'], {
+                    'doc_type': metadata.get('type'),
+                    'source_path': metadata.get('source_path'),
+                    'chunks': []
+                })
+                entry['chunks'].append((metadata.get('chunk_index', 0), chunk_id, content))
+            offset += len(batch['ids'])
+
+        totals = {'sources': 0, 'chunks': 0, 'items': 0}
+        for source, entry in by_source.items():
+            ordered = sorted(entry['chunks'])
+            totals['items'] += self.index_chunks(
+                source, entry['doc_type'], entry['source_path'],
+                [chunk_id for _, chunk_id, _ in ordered],
+                [content for _, _, content in ordered]
+            )
+            totals['sources'] += 1
+            totals['chunks'] += len(ordered)
+        return totals
+
+    def has_data(self) -> bool:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM chunks LIMIT 1").fetchone() is not None
+
+    def stats(self) -> Dict[str, int]:
+        """Quantidade de fontes, chunks e itens por tipo"""
+        with closing(self._connect()) as conn:
+            stats = {
+                'sources': conn.execute("SELECT COUNT(DISTINCT source) FROM chunks").fetchone()[0],
+                'chunks': conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            }
+            for row in conn.execute("SELECT item_type, COUNT(*) FROM extractions GROUP BY item_type"):
+                stats[row[0]] = row[1]
+            stats['normalized_deadlines'] = conn.execute("SELECT COUNT(*) FROM deadlines").fetchone()[0]
+            stats['citations'] = conn.execute("SELECT COUNT(*) FROM citations").fetchone()[0]
+        return stats
+
+    def _topic_filter(self, topic: Optional[str], match_all: bool = False):
+        """Subconsulta (chunk_id, rank) dos chunks relevantes ao tópico"""
+        terms = topic_terms(topic)
+        if not terms:
+            return None, []
+        if self.fts_enabled:
+            operator = ' AND ' if match_all else ' OR '
+            query = operator.join(f'"{term}"' for term in terms)
+            return ("SELECT chunk_id, bm25(chunks_fts) AS rank FROM chunks_fts WHERE chunks_fts MATCH ?",
+                    [query])
+        operator = ' AND ' if match_all else ' OR '
+        condition = operator.join("LOWER(content) LIKE ?" for _ in terms)
+        return (f"SELECT chunk_id, 0 AS rank FROM chunks WHERE {condition}",
+                [f"%{term}%" for term in terms])
+
+    def query(self, topic: str = None, item_types: Iterable[str] = None,
+              sources: Iterable[str] = None, limit_per_type: int = 10) -> List[Dict[str, Any]]:
+        """Itens extraídos, filtrados por tópico, tipo e fonte
+
+        Com tópico, os itens vêm dos chunks mais relevantes (bm25) primeiro.
+        Sem item_types (None) valem todos os tipos; uma lista vazia não retorna nada.
+        """
+        item_types = [t for t in (ITEM_TYPES if item_types is None else item_types) if t in ITEM_TYPES]
+        if not item_types:
+            return []
+        sources = list(sources or [])
+        topic_sql, params = self._topic_filter(topic)
+
+        joins = ""
+        order = "c.source, c.chunk_index, e.position"
+        if topic_sql:
+            joins = f"JOIN ({topic_sql}) m ON m.chunk_id = c.chunk_id"
+            order = "m.rank, " + order
+
+        conditions = [f"e.item_type IN ({','.join('?' for _ in item_types)})"]
+        params.extend(item_types)
+        if sources:
+            conditions.append(f"c.source IN ({','.join('?' for _ in sources)})")
+            params.extend(sources)
+
+        sql = f"""
+            SELECT * FROM (
+                SELECT e.item_type, e.text, e.position, c.chunk_id, c.source, c.doc_type, c.chunk_index,
+                       ROW_NUMBER() OVER (PARTITION BY e.item_type ORDER BY {order}) AS type_rank
+                FROM extractions e
+                JOIN chunks c ON c.chunk_id = e.chunk_id
+                {joins}
+                WHERE {' AND '.join(conditions)}
+            )
+            WHERE type_rank <= ?
+            ORDER BY item_type, type_rank
+        """
+        params.append(limit_per_type)
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [{key: row[key] for key in row.keys() if key != 'type_rank'} for row in rows]
+
+    def search_chunks(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Chunks mais relevantes à consulta por bm25 (busca lexical)
+
+        Sem FTS5 retorna lista vazia: o LIKE não ordena por relevância.
+        """
+        topic_sql, params = self._topic_filter(query)
+        if not self.fts_enabled or not topic_sql:
+            return []
+        sql = f"""
+            SELECT c.chunk_id, c.source, c.doc_type, c.source_path, c.chunk_index, c.content, m.rank
+            FROM ({topic_sql}) m
+            JOIN chunks c ON c.chunk_id = m.chunk_id
+            ORDER BY m.rank
+            LIMIT ?
+        """
+        params.append(limit)
+
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    def deadlines(self, min_days: int = None, max_days: int = None, business_days: bool = None,
+                  topic: str = None, sources: Iterable[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Prazos normalizados numa faixa de dias corridos (limites inclusivos)
+
+        Ordenados pelo prazo mais curto; com tópico, só chunks relevantes a ele.
+        """
+        sources = list(sources or [])
+        conditions = []
+        params: List[Any] = []
+        topic_sql, topic_params = self._topic_filter(topic)
+
+        joins = ""
+        if topic_sql:
+            joins = f"JOIN ({topic_sql}) m ON m.chunk_id = c.chunk_id"
+            params.extend(topic_params)
+        if min_days is not None:
+            conditions.append("d.days >= ?")
+            params.append(min_days)
+        if max_days is not None:
+            conditions.append("d.days <= ?")
+            params.append(max_days)
+        if business_days is not None:
+            conditions.append("d.business_days = ?")
+            params.append(int(business_days))
+        if sources:
+            conditions.append(f"c.source IN ({','.join('?' for _ in sources)})")
+            params.extend(sources)
+
+        sql = f"""
+            SELECT d.amount, d.unit, d.business_days, d.days, d.text, d.position,
+                   c.chunk_id, c.source, c.doc_type, c.chunk_index
+            FROM deadlines d
+            JOIN chunks c ON c.chunk_id = d.chunk_id
+            {joins}
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ORDER BY d.days, c.source, c.chunk_index, d.position
+            LIMIT ?
+        """
+        params.append(limit)
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(row, business_days=bool(row['business_days'])) for row in rows]
+
+    def resolve_reference(self, reference: str) -> Optional[Dict[str, Any]]:
+        """Norma (e artigo) de uma referência textual ou nome de documento indexado
+
+        Retorna {'norm_id', 'norm_label', 'article', 'source'}; source é o
+        documento do corpus que publica a norma (ou None se não indexado).
+        """
+        parsed = parse_reference(reference)
+        with closing(self._connect()) as conn:
+            if parsed:
+                row = conn.execute("SELECT source FROM document_norms WHERE norm_id = ?",
+                                   (parsed['norm_id'],)).fetchone()
+                return {**parsed, 'source': row['source'] if row else None}
+
+            row = conn.execute(
+                "SELECT c.source, d.norm_id, d.norm_label FROM chunks c "
+                "LEFT JOIN document_norms d ON d.source = c.source WHERE c.source = ? LIMIT 1",
+                (reference.strip(),)
+            ).fetchone()
+        if not row:
+            return None
+        return {'norm_id': row['norm_id'], 'norm_label': row['norm_label'] or row['source'],
+                'article': None, 'source': row['source']}
+
+    def cited_by(self, norm_id: str, article: int = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Trechos que citam a norma (ou o artigo dela), com documento e chunk"""
+        sql = """
+            SELECT c.source, ch.chunk_index, c.article, c.text
+            FROM citations c
+            JOIN chunks ch ON ch.chunk_id = c.chunk_id
+            WHERE c.norm_id = ?
+        """
+        params: List[Any] = [norm_id]
+        if article is not None:
+            sql += " AND c.article = ?"
+            params.append(article)
+        sql += " ORDER BY c.source, ch.chunk_index, c.position LIMIT ?"
+        params.append(limit)
+
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def cites(self, source: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Normas citadas pelo documento, agrupadas por norma e artigo
+
+        indexed_source indica o documento do corpus que publica a norma citada.
+        """
+        sql = """
+            SELECT c.norm_id, c.norm_label, c.article, COUNT(*) AS citations,
+                   MIN(ch.chunk_index) AS first_chunk,
+                   (SELECT d.source FROM document_norms d WHERE d.norm_id = c.norm_id LIMIT 1) AS indexed_source
+            FROM citations c
+            JOIN chunks ch ON ch.chunk_id = c.chunk_id
+            WHERE c.source = ?
+            GROUP BY c.norm_id, c.article
+            ORDER BY citations DESC, first_chunk
+            LIMIT ?
+        """
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, (source, limit))]
+
+    def focus(self, area: str, topic: str = None, sources: Iterable[str] = None,
+              limit: int = 2) -> List[Dict[str, Any]]:
+        """Frases que mencionam a área de foco, nos chunks mais relevantes ao tópico"""
+        area_sql, params = self._topic_filter(area, match_all=True)
+        if not area_sql:
+            return []
+        sources = list(sources or [])
+
+        sql = f"""
+            SELECT c.chunk_id, c.source, c.chunk_index, c.content
+            FROM chunks c
+            JOIN ({area_sql}) a ON a.chunk_id = c.chunk_id
+        """
+        topic_sql, topic_params = self._topic_filter(topic)
+        if topic_sql:
+            sql += f" LEFT JOIN ({topic_sql}) m ON m.chunk_id = c.chunk_id"
+            params.extend(topic_params)
+        if sources:
+            sql += f" WHERE c.source IN ({','.join('?' for _ in sources)})"
+            params.extend(sources)
+        sql += " ORDER BY " + ("m.rank IS NULL, m.rank, " if topic_sql else "") + "a.rank, c.source, c.chunk_index"
+
+        items = []
+        with closing(self._connect()) as conn:
+            for row in conn.execute(sql, params):
+                for sentence in focus_sentences(row['content'], area):
+                    items.append({
+                        'text': sentence,
+                        'source': row['source'],
+                        'chunk_id': row['chunk_id'],
+                        'chunk_index': row['chunk_index']
+                    })
+                    if len(items) >= limit:
+                        return items
+        return items
+
+
+_regulation_indexes: Dict[str, RegulationIndex] = {}
+_regulation_index_lock = threading.Lock()
+
+
+def regulation_index_path(tenant: str = DEFAULT_TENANT) -> str:
+    """Arquivo do índice do tenant (o padrão usa REGULATION_INDEX_PATH)"""
+    path = os.getenv('REGULATION_INDEX_PATH', './data/regulation_index.sqlite3')
+    if tenant == DEFAULT_TENANT:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{tenant}{ext}"
+
+
+def get_regulation_index(tenant: str = None) -> RegulationIndex:
+    """Índice compartilhado do processo para o tenant (padrão: tenant atual)"""
+    path = regulation_index_path(tenant or current_tenant())
+    index = _regulation_indexes.get(path)
+    if index is None:
+        with _regulation_index_lock:
+            index = _regulation_indexes.get(path)
+            if index is None:
+                index = _regulation_indexes[path] = RegulationIndex(path)
+    return index
@@ -3,14 +3,38 @@ Sistema simplificado de agentes para Python 3.9
 Funciona sem CrewAI usando OpenAI diretamente
 """
 
-import os
-from typing import Dict, List, Any, Optional
-from openai import OpenAI
+import asyncio
+import contextvars
+import functools
+from typing import Callable, Dict, List, Any, Optional
+from src.checkpoints import NO_CHECKPOINT, RunCheckpoint
 from src.document_processor import DocumentProcessor
+from src.llm.clients import get_async_chat_completions, get_chat_completions, get_model_name
+from src.prd_features import extract_features, parse_feature_list, prd_title
 from src.utils.logger import setup_logger
+from src.utils.metrics import agent_scope, record_failure
+from src.utils.tracing import span, traced
 
 logger = setup_logger(__name__)
 
+
+def _chunk_text(chunk) -> Optional[str]:
+    """Extrair texto de um chunk de streaming do chat completions"""
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content
+
+
+async def _run_blocking(func, *args):
+    """Executar função bloqueante (busca vetorial) sem travar o event loop
+    
+    O contexto (span atual do tracing) é propagado para a thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(None, functools.partial(context.run, func, *args))
+
+
 class SimpleAgent:
     """Agente base simplificado"""
     
@@ -18,15 +42,21 @@ class SimpleAgent:
         self.name = name
         self.role = role
         self.expertise = expertise
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        self.model = os.getenv('OPENAI_MODEL_NAME', 'gpt-4-turbo-preview')
+        self.model = get_model_name()
         self.document_processor = DocumentProcessor()
     
-    def execute_task(self, task_description: str, context: str = None) -> str:
-        """Executar uma task específica"""
-        try:
-            # Construir prompt com contexto
-            system_prompt = f"""Você é um {self.role} especializado em {self.expertise}.
+    @property
+    def completions(self):
+        """chat.completions compartilhado, com rate limiting e retry
+        
+        O cliente é criado na primeira chamada ao LLM.
+        """
+        return get_chat_completions()
+    
+    def _build_messages(self, task_description: str, context: str = None,
+                        relevant_docs: str = None) -> List[Dict[str, str]]:
+        """Construir mensagens do prompt com contexto e documentos recuperados"""
+        system_prompt = f"""Você é um {self.role} especializado em {self.expertise}.
             
             Sua expertise inclui:
             - Mercado financeiro brasileiro
@@ -36,30 +66,108 @@ class SimpleAgent:
             - Tecnologia financeira
             
             Forneça respostas detalhadas, técnicas e baseadas em conhecimento especializado."""
-            
-            user_prompt = task_description
-            if context:
-                user_prompt += f"\n\nCONTEXTO ADICIONAL:\n{context}"
-            
-            # Buscar informações relevantes nos documentos
-            relevant_docs = self.document_processor.get_document_context(task_description, 3000)
-            if relevant_docs:
-                user_prompt += f"\n\nINFORMAÇÕES DOS DOCUMENTOS INDEXADOS:\n{relevant_docs}"
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                temperature=0.1,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
-            )
-            
-            return response.choices[0].message.content
-            
+        
+        user_prompt = task_description
+        if context:
+            user_prompt += f"\n\nCONTEXTO ADICIONAL:\n{context}"
+        
+        if relevant_docs:
+            user_prompt += f"\n\nINFORMAÇÕES DOS DOCUMENTOS INDEXADOS:\n{relevant_docs}"
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def retrieve_context(self, task_description: str, max_tokens: int = 3000) -> str:
+        """Buscar informações relevantes nos documentos para a task"""
+        return self.document_processor.get_document_context(task_description, max_tokens)
+    
+    async def aretrieve_context(self, task_description: str, max_tokens: int = 3000) -> str:
+        """Versão assíncrona de retrieve_context"""
+        return await _run_blocking(self.retrieve_context, task_description, max_tokens)
+    
+    def execute_task(self, task_description: str, context: str = None,
+                     on_token: Callable[[str], None] = None) -> str:
+        """Executar uma task específica
+        
+        Se on_token for informado, a resposta é recebida via streaming e cada
+        token é repassado ao callback conforme chega.
+        """
+        try:
+            with span("agent.execute_task", agent=self.name, stream=on_token is not None), \
+                    agent_scope(self.name):
+                relevant_docs = self.retrieve_context(task_description)
+                messages = self._build_messages(task_description, context, relevant_docs)
+                
+                if on_token is None:
+                    response = self.completions.create(
+                        model=self.model,
+                        temperature=0.1,
+                        messages=messages
+                    )
+                    return response.choices[0].message.content
+                
+                stream = self.completions.create(
+                    model=self.model,
+                    temperature=0.1,
+                    messages=messages,
+                    stream=True
+                )
+                parts = []
+                for chunk in stream:
+                    token = _chunk_text(chunk)
+                    if token:
+                        parts.append(token)
+                        on_token(token)
+                return "".join(parts)
+                
         except Exception as e:
+            record_failure('agent.execute_task')
             logger.error(f"Erro na execução do agente {self.name}: {str(e)}")
             raise
+    
+    async def aexecute_task(self, task_description: str, context: str = None,
+                            relevant_docs: str = None,
+                            on_token: Callable[[str], None] = None) -> str:
+        """Executar task de forma assíncrona
+        
+        Se relevant_docs for informado (pré-carregado em paralelo), a busca
+        nos documentos é pulada.
+        """
+        try:
+            with span("agent.execute_task", agent=self.name, stream=on_token is not None), \
+                    agent_scope(self.name):
+                if relevant_docs is None:
+                    relevant_docs = await self.aretrieve_context(task_description)
+                messages = self._build_messages(task_description, context, relevant_docs)
+                
+                if on_token is None:
+                    response = await get_async_chat_completions().create(
+                        model=self.model,
+                        temperature=0.1,
+                        messages=messages
+                    )
+                    return response.choices[0].message.content
+                
+                stream = await get_async_chat_completions().create(
+                    model=self.model,
+                    temperature=0.1,
+                    messages=messages,
+                    stream=True
+                )
+                parts = []
+                async for chunk in stream:
+                    token = _chunk_text(chunk)
+                    if token:
+                        parts.append(token)
+                        on_token(token)
+                return "".join(parts)
+                
+        except Exception as e:
+            record_failure('agent.execute_task')
+            logger.error(f"Erro na execução assíncrona do agente {self.name}: {str(e)}")
+            raise
 
 
 class DocumentIntelligenceAgent(SimpleAgent):
@@ -72,9 +180,9 @@ class DocumentIntelligenceAgent(SimpleAgent):
             expertise="análise de documentos regulatórios brasileiros, extração de requisitos legais, interpretação de normas CVM/BACEN/AMBIMA"
         )
     
-    def analyze_documents(self, query: str) -> str:
-        """Analisar documentos para uma consulta específica"""
-        task = f"""Analise os documentos indexados e extraia informações relevantes para: {query}
+    def analysis_task(self, query: str) -> str:
+        """Montar descrição da task de análise de documentos"""
+        return f"""Analise os documentos indexados e extraia informações relevantes para: {query}
 
         FOQUE EM:
         1. Requisitos regulatórios obrigatórios
@@ -89,8 +197,54 @@ class DocumentIntelligenceAgent(SimpleAgent):
         - Análise de riscos
         - Recomendações práticas
         - Referências dos documentos"""
-        
-        return self.execute_task(task)
+    
+    def analyze_documents(self, query: str, on_token: Callable[[str], None] = None) -> str:
+        """Analisar documentos para uma consulta específica"""
+        return self.execute_task(self.analysis_task(query), on_token=on_token)
+    
+    async def aanalyze_documents(self, query: str, on_token: Callable[[str], None] = None) -> str:
+        """Versão assíncrona de analyze_documents"""
+        return await self.aexecute_task(self.analysis_task(query), on_token=on_token)
+
+
+# Seções do PRD: (título, tópicos obrigatórios)
+PRD_SECTIONS = [
+    ("RESUMO EXECUTIVO", [
+        "Visão e objetivos do produto",
+        "Value proposition",
+        "Success metrics (KPIs)"
+    ]),
+    ("CONTEXTO DE MERCADO", [
+        "Landscape regulatório brasileiro",
+        "Oportunidade de mercado",
+        "Análise competitiva"
+    ]),
+    ("REQUIREMENTS FUNCIONAIS", [
+        "User stories detalhadas",
+        "Acceptance criteria",
+        "Business rules"
+    ]),
+    ("REQUIREMENTS NÃO-FUNCIONAIS", [
+        "Performance",
+        "Security",
+        "Scalability",
+        "Compliance"
+    ]),
+    ("INTEGRAÇÃO E TÉCNICO", [
+        "Sistemas externos (B3, SELIC, CETIP)",
+        "Arquitetura de alto nível",
+        "Considerações de segurança"
+    ]),
+    ("ROADMAP DE IMPLEMENTAÇÃO", [
+        "Fases de desenvolvimento",
+        "Milestones",
+        "Dependências",
+        "Risk assessment"
+    ])
+]
+
+# Tokens de documentos recuperados por seção no modo paralelo
+SECTION_CONTEXT_TOKENS = 1500
 
 
 class ProductStrategyAgent(SimpleAgent):
@@ -103,47 +257,106 @@ class ProductStrategyAgent(SimpleAgent):
             expertise="desenvolvimento de PRDs, análise de mercado financeiro, estratégia de produto para soluções de custódia"
         )
     
-    def generate_prd(self, request: str, context: str = None) -> str:
-        """Gerar PRD completo"""
-        task = f"""Crie um PRD (Product Requirements Document) detalhado para: {request}
+    def prd_task(self, request: str) -> str:
+        """Montar descrição da task de geração de PRD"""
+        sections = "\n        \n        ".join(
+            f"{number}. {title}\n" + "\n".join(f"           - {topic}" for topic in topics)
+            for number, (title, topics) in enumerate(PRD_SECTIONS, 1)
+        )
+        return f"""Crie um PRD (Product Requirements Document) detalhado para: {request}
 
         O PRD DEVE INCLUIR:
         
-        1. RESUMO EXECUTIVO
-           - Visão e objetivos do produto
-           - Value proposition
-           - Success metrics (KPIs)
+        {sections}
         
-        2. CONTEXTO DE MERCADO
-           - Landscape regulatório brasileiro
-           - Oportunidade de mercado
-           - Análise competitiva
+        Use formato markdown estruturado."""
+    
+    def section_query(self, request: str, index: int) -> str:
+        """Consulta de busca focada em uma seção do PRD"""
+        title, topics = PRD_SECTIONS[index]
+        return f"{request} - {title.lower()}: {', '.join(topics)}"
+    
+    def section_task(self, request: str, index: int) -> str:
+        """Montar descrição da task de uma única seção do PRD"""
+        title, topics = PRD_SECTIONS[index]
+        number = index + 1
+        topics_text = "\n".join(f"        - {topic}" for topic in topics)
+        return f"""Escreva SOMENTE a seção {number} do PRD (Product Requirements Document) para: {request}
+
+        {number}. {title}
+{topics_text}
         
-        3. REQUIREMENTS FUNCIONAIS
-           - User stories detalhadas
-           - Acceptance criteria
-           - Business rules
+        As demais seções estão sendo escritas em paralelo por outros especialistas:
+        não as repita. Comece com o cabeçalho "## {number}. {title}" e use formato
+        markdown estruturado."""
+    
+    def summary_task(self, request: str, sections: List[str]) -> str:
+        """Montar descrição da etapa de consolidação (resumo executivo)"""
+        title, topics = PRD_SECTIONS[0]
+        topics_text = "\n".join(f"        - {topic}" for topic in topics)
+        drafts = "\n\n".join(sections)
+        return f"""Com base nas seções já escritas do PRD para: {request}
+
+        Escreva a seção 1 do PRD:
         
-        4. REQUIREMENTS NÃO-FUNCIONAIS
-           - Performance
-           - Security
-           - Scalability
-           - Compliance
+        1. {title}
+{topics_text}
         
-        5. INTEGRAÇÃO E TÉCNICO
-           - Sistemas externos (B3, SELIC, CETIP)
-           - Arquitetura de alto nível
-           - Considerações de segurança
+        Verifique também a consistência entre as seções (métricas, prazos, nomes de
+        sistemas e premissas). Se houver contradições, liste-as ao final do resumo em
+        "### Pontos de Atenção" indicando a seção e a correção sugerida.
+        Comece com o cabeçalho "## 1. {title}" e use formato markdown estruturado.
         
-        6. ROADMAP DE IMPLEMENTAÇÃO
-           - Fases de desenvolvimento
-           - Milestones
-           - Dependências
-           - Risk assessment
+        SEÇÕES ESCRITAS:
+        {drafts}"""
+    
+    def feature_list_task(self, prd_text: str, max_features: int = None) -> str:
+        """Montar descrição da task que lista as features de um PRD"""
+        limit = f" (no máximo {max_features})" if max_features else ""
+        return f"""Liste as features{limit} que precisam de especificação técnica própria
+        no PRD abaixo, na ordem em que aparecem.
         
-        Use formato markdown estruturado."""
+        Responda SOMENTE com uma feature por linha, no formato:
+        - Nome da feature: descrição em uma frase
         
-        return self.execute_task(task, context)
+        PRD:
+        {prd_text}"""
+    
+    @staticmethod
+    def merge_sections(request: str, sections: List[str]) -> str:
+        """Montar documento final a partir das seções, na ordem do PRD"""
+        parts = [f"# PRD: {request}"]
+        for number, ((title, _), text) in enumerate(zip(PRD_SECTIONS, sections), 1):
+            text = text.strip()
+            if not text.startswith('#'):
+                text = f"## {number}. {title}\n\n{text}"
+            parts.append(text)
+        return "\n\n".join(parts) + "\n"
+    
+    def generate_prd(self, request: str, context: str = None,
+                     on_token: Callable[[str], None] = None) -> str:
+        """Gerar PRD completo"""
+        return self.execute_task(self.prd_task(request), context, on_token)
+    
+    async def agenerate_prd(self, request: str, context: str = None,
+                            relevant_docs: str = None,
+                            on_token: Callable[[str], None] = None) -> str:
+        """Versão assíncrona de generate_prd"""
+        return await self.aexecute_task(self.prd_task(request), context, relevant_docs, on_token)
+    
+    async def agenerate_section(self, request: str, index: int, context: str = None,
+                                relevant_docs: str = None) -> str:
+        """Gerar uma seção do PRD com o contexto recuperado para ela"""
+        return await self.aexecute_task(self.section_task(request, index), context, relevant_docs)
+    
+    async def agenerate_summary(self, request: str, sections: List[str],
+                                on_token: Callable[[str], None] = None) -> str:
+        """Gerar resumo executivo e revisão de consistência a partir das seções
+        
+        As seções já trazem os documentos relevantes, então não há nova busca.
+        """
+        return await self.aexecute_task(self.summary_task(request, sections), relevant_docs="",
+                                        on_token=on_token)
 
 
 class FeatureEngineeringAgent(SimpleAgent):
@@ -156,9 +369,9 @@ class FeatureEngineeringAgent(SimpleAgent):
             expertise="especificações técnicas detalhadas, arquitetura de sistemas financeiros, APIs e integrações"
         )
     
-    def generate_feature_specs(self, request: str, context: str = None) -> str:
-        """Gerar especificações técnicas de features"""
-        task = f"""Crie especificações técnicas detalhadas para: {request}
+    def feature_specs_task(self, request: str) -> str:
+        """Montar descrição da task de especificação de features"""
+        return f"""Crie especificações técnicas detalhadas para: {request}
 
         ESPECIFICAÇÕES DEVEM INCLUIR:
         
@@ -200,8 +413,19 @@ class FeatureEngineeringAgent(SimpleAgent):
            - Security testing
         
         Use formato markdown estruturado com exemplos práticos."""
-        
-        return self.execute_task(task, context)
+    
+    def generate_feature_specs(self, request: str, context: str = None,
+                               on_token: Callable[[str], None] = None) -> str:
+        """Gerar especificações técnicas de features"""
+        return self.execute_task(self.feature_specs_task(request), context, on_token)
+    
+    async def agenerate_feature_specs(self, request: str, context: str = None,
+                                      relevant_docs: str = None,
+                                      on_token: Callable[[str], None] = None) -> str:
+        """Versão assíncrona de generate_feature_specs"""
+        return await self.aexecute_task(
+            self.feature_specs_task(request), context, relevant_docs, on_token
+        )
 
 
 class SimpleCustodySystem:
@@ -215,20 +439,33 @@ class SimpleCustodySystem:
         
         logger.info("SimpleCustodySystem inicializado com sucesso")
     
-    def generate_prd(self, user_request: str, context: str = None) -> str:
-        """Gerar PRD usando múltiplos agentes"""
+    @traced("pipeline.generate_prd")
+    def generate_prd(self, user_request: str, context: str = None,
+                     on_token: Callable[[str], None] = None,
+                     checkpoint: RunCheckpoint = None) -> str:
+        """Gerar PRD usando múltiplos agentes
+        
+        on_token recebe, via streaming, os tokens do documento final.
+        Com checkpoint, etapas já concluídas em uma execução anterior são puladas.
+        """
+        checkpoint = checkpoint or NO_CHECKPOINT
         try:
             logger.info(f"Gerando PRD para: {user_request[:100]}...")
             
             # 1. Análise de documentos primeiro
-            doc_analysis = self.doc_agent.analyze_documents(user_request)
+            doc_analysis = checkpoint.stage(
+                'document_analysis', lambda: self.doc_agent.analyze_documents(user_request)
+            )
             
             # 2. Gerar PRD com contexto da análise
             full_context = doc_analysis
             if context:
                 full_context += f"\n\nCONTEXTO ADICIONAL:\n{context}"
             
-            prd = self.product_agent.generate_prd(user_request, full_context)
+            prd = checkpoint.stage(
+                'prd', lambda: self.product_agent.generate_prd(user_request, full_context, on_token)
+            )
+            checkpoint.complete()
             
             logger.info("PRD gerado com sucesso")
             return prd
@@ -237,20 +474,30 @@ class SimpleCustodySystem:
             logger.error(f"Erro na geração de PRD: {str(e)}")
             raise
     
-    def generate_features(self, user_request: str, context: str = None) -> str:
+    @traced("pipeline.generate_features")
+    def generate_features(self, user_request: str, context: str = None,
+                          on_token: Callable[[str], None] = None,
+                          checkpoint: RunCheckpoint = None) -> str:
         """Gerar especificações de features"""
+        checkpoint = checkpoint or NO_CHECKPOINT
         try:
             logger.info(f"Gerando features para: {user_request[:100]}...")
             
             # 1. Análise regulatória primeiro
-            regulatory_analysis = self.doc_agent.analyze_documents(user_request)
+            regulatory_analysis = checkpoint.stage(
+                'regulatory_analysis', lambda: self.doc_agent.analyze_documents(user_request)
+            )
             
             # 2. Gerar specs com contexto regulatório
             full_context = regulatory_analysis
             if context:
                 full_context += f"\n\nCONTEXTO ADICIONAL:\n{context}"
             
-            features = self.feature_agent.generate_feature_specs(user_request, full_context)
+            features = checkpoint.stage(
+                'feature_specs',
+                lambda: self.feature_agent.generate_feature_specs(user_request, full_context, on_token)
+            )
+            checkpoint.complete()
             
             logger.info("Features geradas com sucesso")
             return features
@@ -259,18 +506,249 @@ class SimpleCustodySystem:
             logger.error(f"Erro na geração de features: {str(e)}")
             raise
     
-    def analyze_compliance(self, regulation_area: str) -> str:
+    @traced("pipeline.analyze_compliance")
+    def analyze_compliance(self, regulation_area: str,
+                           on_token: Callable[[str], None] = None,
+                           checkpoint: RunCheckpoint = None) -> str:
         """Análise focada em compliance"""
+        checkpoint = checkpoint or NO_CHECKPOINT
         try:
             logger.info(f"Analisando compliance para: {regulation_area}")
             
-            result = self.doc_agent.analyze_documents(
-                f"Análise completa de compliance para {regulation_area}"
+            result = checkpoint.stage('compliance_analysis', lambda: self.doc_agent.analyze_documents(
+                f"Análise completa de compliance para {regulation_area}",
+                on_token=on_token
+            ))
+            checkpoint.complete()
+            
+            logger.info("Análise de compliance concluída")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Erro na análise de compliance: {str(e)}")
+            raise
+
+    async def _with_prefetch(self, first_stage, prefetch):
+        """Executar primeira etapa enquanto a busca da etapa seguinte roda em paralelo
+        
+        A busca nos documentos da etapa final não depende do resultado da
+        primeira etapa, então ambas são sobrepostas.
+        """
+        prefetch_task = asyncio.ensure_future(prefetch)
+        try:
+            first_result = await first_stage
+        except BaseException:
+            prefetch_task.cancel()
+            raise
+        return first_result, await prefetch_task
+    
+    @traced("pipeline.generate_prd")
+    async def agenerate_prd(self, user_request: str, context: str = None,
+                            on_token: Callable[[str], None] = None,
+                            checkpoint: RunCheckpoint = None) -> str:
+        """Versão assíncrona de generate_prd"""
+        checkpoint = checkpoint or NO_CHECKPOINT
+        try:
+            logger.info(f"Gerando PRD (async) para: {user_request[:100]}...")
+            
+            doc_analysis, prd_docs = await self._with_prefetch(
+                checkpoint.astage('document_analysis', lambda: self.doc_agent.aanalyze_documents(user_request)),
+                self.product_agent.aretrieve_context(self.product_agent.prd_task(user_request))
+            )
+            
+            full_context = doc_analysis
+            if context:
+                full_context += f"\n\nCONTEXTO ADICIONAL:\n{context}"
+            
+            prd = await checkpoint.astage('prd', lambda: self.product_agent.agenerate_prd(
+                user_request, full_context, prd_docs, on_token
+            ))
+            checkpoint.complete()
+            
+            logger.info("PRD gerado com sucesso")
+            return prd
+            
+        except Exception as e:
+            logger.error(f"Erro na geração de PRD: {str(e)}")
+            raise
+    
+    @traced("pipeline.generate_prd_parallel")
+    async def agenerate_prd_parallel(self, user_request: str, context: str = None,
+                                     on_token: Callable[[str], None] = None,
+                                     checkpoint: RunCheckpoint = None) -> str:
+        """Gerar PRD por seções em paralelo
+        
+        Cada seção (2 a 6) recebe sua própria busca nos documentos e é gerada
+        em uma chamada concorrente; a etapa final escreve o resumo executivo a
+        partir das seções e aponta inconsistências entre elas. O tempo total
+        fica próximo de duas chamadas ao LLM em vez de uma única resposta longa.
+        on_token recebe os tokens da etapa final.
+        """
+        checkpoint = checkpoint or NO_CHECKPOINT
+        agent = self.product_agent
+        section_indexes = range(1, len(PRD_SECTIONS))
+        try:
+            logger.info(f"Gerando PRD por seções (paralelo) para: {user_request[:100]}...")
+            
+            doc_analysis, section_docs = await self._with_prefetch(
+                checkpoint.astage('document_analysis', lambda: self.doc_agent.aanalyze_documents(user_request)),
+                asyncio.gather(*(
+                    agent.aretrieve_context(agent.section_query(user_request, index), SECTION_CONTEXT_TOKENS)
+                    for index in section_indexes
+                ))
+            )
+            
+            full_context = doc_analysis
+            if context:
+                full_context += f"\n\nCONTEXTO ADICIONAL:\n{context}"
+            
+            sections = await asyncio.gather(*(
+                checkpoint.astage(
+                    f'section_{index + 1}',
+                    functools.partial(agent.agenerate_section, user_request, index, full_context, docs)
+                )
+                for index, docs in zip(section_indexes, section_docs)
+            ))
+            
+            summary = await checkpoint.astage(
+                'executive_summary', lambda: agent.agenerate_summary(user_request, sections, on_token)
+            )
+            prd = agent.merge_sections(user_request, [summary] + list(sections))
+            checkpoint.complete()
+            
+            logger.info(f"PRD gerado com sucesso ({len(PRD_SECTIONS)} seções)")
+            return prd
+            
+        except Exception as e:
+            logger.error(f"Erro na geração de PRD por seções: {str(e)}")
+            raise
+    
+    async def aplan_features(self, prd_text: str, max_features: int = None) -> List[Dict[str, str]]:
+        """Features do PRD: pelos cabeçalhos dos requisitos funcionais ou, sem
+        estrutura reconhecível, listadas pelo agente de produto"""
+        features = extract_features(prd_text, max_features)
+        if features:
+            return features
+        
+        logger.info("PRD sem seção de requisitos estruturada, listando features com o LLM")
+        answer = await self.product_agent.aexecute_task(
+            self.product_agent.feature_list_task(prd_text, max_features), relevant_docs=""
+        )
+        features = parse_feature_list(answer)
+        return features[:max_features] if max_features else features
+    
+    @traced("pipeline.generate_features_from_prd")
+    async def agenerate_features_from_prd(self, prd_text: str, features: List[Dict[str, str]],
+                                          context: str = None, max_concurrency: int = 4,
+                                          on_feature: Callable[[int, Dict[str, str], str], None] = None,
+                                          checkpoint: RunCheckpoint = None) -> List[str]:
+        """Gerar a especificação de cada feature de um PRD
+        
+        A análise regulatória é feita uma única vez e compartilhada; as
+        especificações são geradas concorrentemente (até max_concurrency), cada
+        uma com sua própria busca nos documentos. on_feature(índice, feature,
+        especificação) é chamado assim que cada uma fica pronta.
+        """
+        checkpoint = checkpoint or NO_CHECKPOINT
+        agent = self.feature_agent
+        title = prd_title(prd_text)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        try:
+            logger.info(f"Gerando {len(features)} features a partir do PRD: {title}")
+            
+            feature_names = ", ".join(feature['title'] for feature in features)
+            regulatory_analysis = await checkpoint.astage(
+                'regulatory_analysis',
+                lambda: self.doc_agent.aanalyze_documents(f"{title} - features: {feature_names}")
+            )
+            
+            shared_context = regulatory_analysis
+            if context:
+                shared_context += f"\n\nCONTEXTO ADICIONAL:\n{context}"
+            
+            async def generate(index: int, feature: Dict[str, str]) -> str:
+                request = f"{feature['title']} (parte do produto: {title})"
+                feature_context = shared_context
+                if feature['description']:
+                    feature_context = f"DESCRIÇÃO NO PRD:\n{feature['description']}\n\n{shared_context}"
+                async with semaphore:
+                    spec = await agent.agenerate_feature_specs(request, feature_context)
+                logger.info(f"Feature {index}/{len(features)} gerada: {feature['title']}")
+                return spec
+            
+            async def stage(index: int, feature: Dict[str, str]) -> str:
+                spec = await checkpoint.astage(
+                    f"feature_{index:02d}", functools.partial(generate, index, feature)
+                )
+                if on_feature:
+                    on_feature(index, feature, spec)
+                return spec
+            
+            # Aguardar todas antes de propagar erros, para que as concluídas
+            # fiquem gravadas e uma retomada refaça apenas as que falharam
+            specs = await asyncio.gather(*(
+                stage(index, feature) for index, feature in enumerate(features, 1)
+            ), return_exceptions=True)
+            errors = [spec for spec in specs if isinstance(spec, BaseException)]
+            if errors:
+                raise errors[0]
+            checkpoint.complete()
+            
+            logger.info(f"Features geradas com sucesso: {len(specs)}")
+            return list(specs)
+            
+        except Exception as e:
+            logger.error(f"Erro na geração de features a partir do PRD: {str(e)}")
+            raise
+    
+    @traced("pipeline.generate_features")
+    async def agenerate_features(self, user_request: str, context: str = None,
+                                 on_token: Callable[[str], None] = None,
+                                 checkpoint: RunCheckpoint = None) -> str:
+        """Versão assíncrona de generate_features"""
+        checkpoint = checkpoint or NO_CHECKPOINT
+        try:
+            logger.info(f"Gerando features (async) para: {user_request[:100]}...")
+            
+            regulatory_analysis, feature_docs = await self._with_prefetch(
+                checkpoint.astage('regulatory_analysis', lambda: self.doc_agent.aanalyze_documents(user_request)),
+                self.feature_agent.aretrieve_context(self.feature_agent.feature_specs_task(user_request))
             )
             
+            full_context = regulatory_analysis
+            if context:
+                full_context += f"\n\nCONTEXTO ADICIONAL:\n{context}"
+            
+            features = await checkpoint.astage('feature_specs', lambda: self.feature_agent.agenerate_feature_specs(
+                user_request, full_context, feature_docs, on_token
+            ))
+            checkpoint.complete()
+            
+            logger.info("Features geradas com sucesso")
+            return features
+            
+        except Exception as e:
+            logger.error(f"Erro na geração de features: {str(e)}")
+            raise
+    
+    @traced("pipeline.analyze_compliance")
+    async def aanalyze_compliance(self, regulation_area: str,
+                                  on_token: Callable[[str], None] = None,
+                                  checkpoint: RunCheckpoint = None) -> str:
+        """Versão assíncrona de analyze_compliance"""
+        checkpoint = checkpoint or NO_CHECKPOINT
+        try:
+            logger.info(f"Analisando compliance (async) para: {regulation_area}")
+            
+            result = await checkpoint.astage('compliance_analysis', lambda: self.doc_agent.aanalyze_documents(
+                f"Análise completa de compliance para {regulation_area}",
+                on_token=on_token
+            ))
+            checkpoint.complete()
+            
             logger.info("Análise de compliance concluída")
             return result
             
         except Exception as e:
             logger.error(f"Erro na análise de compliance: {str(e)}")
-            raise
\ No newline at end of file
+            raise
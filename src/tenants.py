@@ -0,0 +1,169 @@
+"""
+Bases de conhecimento por cliente (tenant)
+
+Cada tenant tem a própria coleção no ChromaDB e o próprio índice regulatório
+(SQLite): as buscas de um cliente só tocam os vetores dele. O tenant de cada
+operação vem, nesta ordem, de tenant_scope (por requisição ou job), de
+set_default_tenant (--tenant na CLI) ou da variável TENANT; sem nenhum deles
+vale o tenant "default", que usa a coleção e o índice originais.
+
+As coleções abertas ficam num LRU com limite de memória estimada
+(TENANT_CACHE_MAX_MB, vetores x dimensão mais o grafo HNSW) e de quantidade
+(TENANT_CACHE_MAX_COLLECTIONS). Os tenants frios saem do LRU; o mesmo limite
+de memória é repassado ao cache de segmentos do ChromaDB (política LRU), que
+é quem descarrega da memória os índices HNSW das coleções menos usadas.
+"""
+
+import contextvars
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+from src.utils.logger import setup_logger
+from src.utils.metrics import TENANT_COLLECTIONS, TENANT_EVICTIONS, record_cache
+
+logger = setup_logger(__name__)
+
+DEFAULT_TENANT = "default"
+BASE_COLLECTION = "custody_documents"
+COLLECTION_SEPARATOR = "__"
+
+# Nomes de coleção do ChromaDB: 3-63 caracteres, começando e terminando em alfanumérico
+TENANT_PATTERN = re.compile(r'^[a-z0-9](?:[a-z0-9_-]{0,38}[a-z0-9])?$')
+
+# Memória por vetor além do embedding: vizinhos do HNSW (M=16) e rótulos
+HNSW_BYTES_PER_VECTOR = 160
+
+_current_tenant: contextvars.ContextVar = contextvars.ContextVar('poagent_tenant', default=None)
+_default_tenant: Optional[str] = None
+
+
+def normalize_tenant(tenant: str) -> str:
+    """Validar e normalizar o identificador do tenant (ex.: 'BTG' -> 'btg')"""
+    normalized = str(tenant or '').strip().lower()
+    if not TENANT_PATTERN.match(normalized) or '__' in normalized:
+        raise ValueError(
+            f"Tenant inválido: '{tenant}' (use letras, números, '-' ou '_', até 40 caracteres)"
+        )
+    return normalized
+
+
+def set_default_tenant(tenant: Optional[str]):
+    """Tenant do processo (ex.: --tenant na CLI); None volta ao padrão"""
+    global _default_tenant
+    _default_tenant = normalize_tenant(tenant) if tenant else None
+
+
+def current_tenant() -> str:
+    tenant = _current_tenant.get()
+    if tenant:
+        return tenant
+    if _default_tenant:
+        return _default_tenant
+    env_tenant = os.getenv('TENANT')
+    return normalize_tenant(env_tenant) if env_tenant else DEFAULT_TENANT
+
+
+@contextmanager
+def tenant_scope(tenant: Optional[str]) -> Iterator[str]:
+    """Usar o tenant nas operações do bloco (propaga para tarefas asyncio)"""
+    if not tenant:
+        yield current_tenant()
+        return
+    token = _current_tenant.set(normalize_tenant(tenant))
+    try:
+        yield _current_tenant.get()
+    finally:
+        _current_tenant.reset(token)
+
+
+def collection_name_for(tenant: str) -> str:
+    """Coleção do tenant; o padrão mantém a coleção original"""
+    if tenant == DEFAULT_TENANT:
+        return BASE_COLLECTION
+    return f"{BASE_COLLECTION}{COLLECTION_SEPARATOR}{tenant}"
+
+
+def tenant_from_collection(name: str) -> Optional[str]:
+    """Tenant dono da coleção (None se não for uma coleção de documentos)"""
+    if name == BASE_COLLECTION:
+        return DEFAULT_TENANT
+    prefix = BASE_COLLECTION + COLLECTION_SEPARATOR
+    return name[len(prefix):] if name.startswith(prefix) else None
+
+
+def cache_limits() -> Dict[str, int]:
+    """Limites do LRU de coleções (0 bytes = sem limite de memória)"""
+    return {
+        'max_bytes': int(float(os.getenv('TENANT_CACHE_MAX_MB', '0')) * 2**20),
+        'max_entries': int(os.getenv('TENANT_CACHE_MAX_COLLECTIONS', '32'))
+    }
+
+
+def estimate_collection_bytes(count: int, dimension: int) -> int:
+    """Memória estimada do índice HNSW de uma coleção carregada"""
+    return count * (dimension * 4 + HNSW_BYTES_PER_VECTOR)
+
+
+class CollectionLRU:
+    """Coleções abertas, das menos para as mais recentemente usadas"""
+
+    def __init__(self, max_bytes: int = 0, max_entries: int = 32):
+        self.max_bytes = max_bytes
+        self.max_entries = max(1, max_entries)
+        self._entries: 'OrderedDict[Hashable, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, loader: Callable[[], Any], estimate: Callable[[Any], int]) -> Any:
+        """Coleção da chave, abrindo com loader (e medindo com estimate) se fria"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                record_cache('tenant_collections', True)
+                return entry['collection']
+
+        record_cache('tenant_collections', False)
+        # Abrir fora do lock: outros tenants não esperam pela coleção fria
+        collection = loader()
+        size = estimate(collection)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {'collection': collection, 'bytes': size}
+            self._entries.move_to_end(key)
+            self._evict()
+            return entry['collection']
+
+    def resize(self, key: Hashable, size: int):
+        """Atualizar a memória estimada (ex.: após indexar documentos)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['bytes'] = size
+                self._evict()
+
+    def _evict(self):
+        """Fechar as coleções frias até caber nos limites (chamado com o lock)"""
+        while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes and self._total_bytes() > self.max_bytes)):
+            key, entry = self._entries.popitem(last=False)
+            TENANT_EVICTIONS.inc()
+            logger.info("Coleção fria fechada: %s (%.1f MB estimados)", key, entry['bytes'] / 2**20)
+        self._update_gauges()
+
+    def _total_bytes(self) -> int:
+        return sum(entry['bytes'] for entry in self._entries.values())
+
+    def _update_gauges(self):
+        TENANT_COLLECTIONS.set(len(self._entries), measure='open')
+        TENANT_COLLECTIONS.set(self._total_bytes(), measure='bytes')
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Coleções abertas, da mais para a menos recentemente usada"""
+        with self._lock:
+            return [{'key': key, 'bytes': entry['bytes']} for key, entry in reversed(self._entries.items())]
@@ -0,0 +1,105 @@
+"""
+Tool para consulta do grafo de citações entre normas regulatórias
+"""
+
+from crewai_tools import BaseTool
+from typing import Type, Dict, List
+from pydantic import BaseModel, Field
+from src.regulation.index import get_regulation_index
+from src.tools.memo import memoized
+from src.utils.logger import setup_logger
+from src.utils.metrics import TOOL_CALLS, TOOL_LATENCY, record_failure
+from src.utils.tracing import span
+
+logger = setup_logger(__name__)
+
+DIRECTIONS = ('both', 'cited_by', 'cites')
+
+class CitationLookupInput(BaseModel):
+    """Input para consulta de citações"""
+    reference: str = Field(..., description="Norma, artigo ou documento (ex.: 'Art. 5 da Resolução CVM 35', 'Circular BCB 3.978', 'resolucao_cvm_35.pdf')")
+    direction: str = Field(default="both", description="cited_by (quem cita), cites (o que cita) ou both")
+    max_results: int = Field(default=10, description="Número máximo de itens por direção")
+
+class CitationLookupTool(BaseTool):
+    name: str = "citation_lookup"
+    description: str = """Ferramenta para navegar pelas citações entre normas (CVM, BACEN, CMN, ANBIMA).
+    Responde, sem nova busca semântica:
+    - Quais documentos citam uma norma ou artigo ("quem cita a Resolução CVM 35?")
+    - Quais normas um documento ou norma cita ("o que a Resolução CVM 35 cita?")
+    
+    Use para obter o contexto regulatório de um salto a partir de uma referência
+    encontrada em outro resultado.
+    """
+    args_schema: Type[BaseModel] = CitationLookupInput
+    
+    def _run(self, reference: str, direction: str = "both", max_results: int = 10) -> str:
+        try:
+            TOOL_CALLS.inc(tool='citation_lookup')
+            return memoized(self.name, lambda: self._lookup(reference, direction, max_results),
+                            reference=reference, direction=direction, max_results=max_results)
+        
+        except Exception as e:
+            record_failure('tool.citation_lookup')
+            logger.error(f"Erro na consulta de citações: {str(e)}")
+            return f"Erro ao consultar citações: {str(e)}"
+    
+    def _lookup(self, reference: str, direction: str, max_results: int) -> str:
+        """Resolver a referência e consultar as arestas do grafo"""
+        direction = direction if direction in DIRECTIONS else "both"
+        with span("tool.citation_lookup", direction=direction) as tool_span, \
+                TOOL_LATENCY.time(tool='citation_lookup'):
+            index = get_regulation_index()
+            resolved = index.resolve_reference(reference)
+            if not resolved:
+                return f"Referência não reconhecida como norma ou documento indexado: {reference}"
+            
+            cited_by = []
+            if direction in ('both', 'cited_by') and resolved['norm_id']:
+                cited_by = index.cited_by(resolved['norm_id'], resolved['article'], max_results)
+            cites = []
+            if direction in ('both', 'cites') and resolved['source']:
+                cites = index.cites(resolved['source'], max_results)
+            
+            output = self._format_citations(resolved, direction, cited_by, cites)
+            tool_span.set_attributes(cited_by=len(cited_by), cites=len(cites), bytes=len(output))
+            return output
+    
+    def _format_citations(self, resolved: Dict, direction: str,
+                          cited_by: List[Dict], cites: List[Dict]) -> str:
+        """Formatar as citações encontradas"""
+        title = resolved['norm_label']
+        if resolved['article'] is not None:
+            title = f"Art. {resolved['article']} da {title}"
+        
+        sections = [f"CITAÇÕES: {title}", "=" * 50, ""]
+        if resolved['source']:
+            sections.extend([f"Documento no corpus: {resolved['source']}", ""])
+        
+        if direction in ('both', 'cited_by'):
+            sections.append(f"📥 CITADA POR ({len(cited_by)}):")
+            sections.append("")
+            for i, item in enumerate(cited_by, 1):
+                sections.append(f"{i}. {item['source']} (chunk {item['chunk_index']}): {item['text']}")
+            if not cited_by:
+                sections.append("Nenhum documento indexado cita esta referência.")
+            sections.append("")
+        
+        if direction in ('both', 'cites'):
+            sections.append(f"📤 CITA ({len(cites)}):")
+            sections.append("")
+            for i, item in enumerate(cites, 1):
+                label = item['norm_label']
+                if item['article'] is not None:
+                    label = f"Art. {item['article']} da {label}"
+                line = f"{i}. {label} — {item['citations']} referência(s), a partir do chunk {item['first_chunk']}"
+                if item['indexed_source']:
+                    line += f" [no corpus: {item['indexed_source']}]"
+                sections.append(line)
+            if not resolved['source']:
+                sections.append("A norma não está no corpus indexado; não há citações de saída.")
+            elif not cites:
+                sections.append("O documento não cita outras normas.")
+            sections.append("")
+        
+        return "\n".join(sections)
@@ -6,7 +6,10 @@ from crewai_tools import BaseTool
 from typing import Type, Any
 from pydantic import BaseModel, Field
 from src.document_processor import DocumentProcessor
+from src.tools.memo import memoized
 from src.utils.logger import setup_logger
+from src.utils.metrics import TOOL_CALLS, TOOL_LATENCY, record_failure
+from src.utils.tracing import span
 
 logger = setup_logger(__name__)
 
@@ -34,6 +37,19 @@ class ContextGeneratorTool(BaseTool):
     
     def _run(self, topic: str, max_tokens: int = 4000) -> str:
         try:
+            TOOL_CALLS.inc(tool='context_generator')
+            return memoized(self.name, lambda: self._generate_context(topic, max_tokens),
+                            topic=topic, max_tokens=max_tokens)
+            
+        except Exception as e:
+            record_failure('tool.context_generator')
+            logger.error(f"Erro na geração de contexto: {str(e)}")
+            return f"Erro ao gerar contexto: {str(e)}"
+    
+    def _generate_context(self, topic: str, max_tokens: int) -> str:
+        """Montar o contexto estruturado do tópico"""
+        with span("tool.context_generator", max_tokens=max_tokens) as tool_span, \
+                TOOL_LATENCY.time(tool='context_generator'):
             processor = DocumentProcessor()
             context = processor.get_document_context(topic, max_tokens)
             
@@ -51,9 +67,6 @@ NOTA: Este contexto foi gerado automaticamente a partir dos documentos indexados
 Verifique sempre as fontes originais para informações críticas.
 """
             
-            logger.info(f"Contexto gerado para tópico: {topic}")
-            return structured_context
-            
-        except Exception as e:
-            logger.error(f"Erro na geração de contexto: {str(e)}")
-            return f"Erro ao gerar contexto: {str(e)}"
\ No newline at end of file
+            tool_span.set_attribute('bytes', len(structured_context))
+            logger.info("Contexto gerado para tópico: %s", topic)
+            return structured_context
\ No newline at end of file
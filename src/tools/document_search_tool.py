@@ -6,7 +6,10 @@ from crewai_tools import BaseTool
 from typing import Type, Any
 from pydantic import BaseModel, Field
 from src.document_processor import DocumentProcessor
+from src.tools.memo import memoized
 from src.utils.logger import setup_logger
+from src.utils.metrics import TOOL_CALLS, TOOL_LATENCY, record_failure
+from src.utils.tracing import span
 
 logger = setup_logger(__name__)
 
@@ -30,6 +33,19 @@ class DocumentSearchTool(BaseTool):
     
     def _run(self, query: str, max_results: int = 10) -> str:
         try:
+            TOOL_CALLS.inc(tool='document_search')
+            return memoized(self.name, lambda: self._search(query, max_results),
+                            query=query, max_results=max_results)
+            
+        except Exception as e:
+            record_failure('tool.document_search')
+            logger.error(f"Erro na busca de documentos: {str(e)}")
+            return f"Erro ao buscar documentos: {str(e)}"
+    
+    def _search(self, query: str, max_results: int) -> str:
+        """Executar a busca e formatar os resultados"""
+        with span("tool.document_search", max_results=max_results) as tool_span, \
+                TOOL_LATENCY.time(tool='document_search'):
             processor = DocumentProcessor()
             results = processor.search_documents(query, max_results)
             
@@ -53,8 +69,6 @@ Conteúdo:
 """
                 formatted_results.append(formatted_result)
             
-            return "\n".join(formatted_results)
-            
-        except Exception as e:
-            logger.error(f"Erro na busca de documentos: {str(e)}")
-            return f"Erro ao buscar documentos: {str(e)}"
\ No newline at end of file
+            output = "\n".join(formatted_results)
+            tool_span.set_attributes(results=len(results), bytes=len(output))
+            return output
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Memoização de resultados das tools durante uma execução (kickoff da crew)
+Agentes diferentes costumam repetir a mesma busca; dentro do escopo da
+execução, chamadas com argumentos equivalentes reutilizam o resultado.
+"""
+
+import contextvars
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from src.utils.logger import setup_logger
+from src.utils.metrics import record_cache
+
+logger = setup_logger(__name__)
+
+_current_memo: contextvars.ContextVar = contextvars.ContextVar('poagent_tool_memo', default=None)
+
+
+def normalize_argument(value: Any) -> Any:
+    """Forma canônica de um argumento: textos sem caixa, espaços e pontuação final"""
+    if isinstance(value, str):
+        text = re.sub(r'\s+', ' ', value).strip().lower()
+        return text.strip(' .,;:!?"\'')
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted({normalize_argument(item) for item in value if item is not None}))
+    return value
+
+
+def memo_key(tool: str, arguments: Dict[str, Any]) -> Tuple:
+    return (tool,) + tuple(sorted((name, normalize_argument(value)) for name, value in arguments.items()))
+
+
+class ToolMemo:
+    """Resultados das tools de uma execução, com estatísticas por tool"""
+
+    def __init__(self, run_name: str = "run"):
+        self.run_name = run_name
+        self._results: Dict[Tuple, Tuple[str, float]] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _tool_stats(self, tool: str) -> Dict[str, float]:
+        return self._stats.setdefault(tool, {'calls': 0, 'hits': 0, 'misses': 0, 'saved_seconds': 0.0})
+
+    def get_or_compute(self, tool: str, arguments: Dict[str, Any], compute: Callable[[], str]) -> str:
+        """Retornar resultado memoizado ou calcular e guardar
+
+        Exceções não são memoizadas: a próxima chamada tenta de novo.
+        """
+        key = memo_key(tool, arguments)
+        with self._lock:
+            stats = self._tool_stats(tool)
+            stats['calls'] += 1
+            cached = self._results.get(key)
+            if cached is not None:
+                stats['hits'] += 1
+                stats['saved_seconds'] += cached[1]
+        if cached is not None:
+            record_cache(f"tool.{tool}", True)
+            logger.debug("Tool %s: resultado reutilizado (%s)", tool, self.run_name)
+            return cached[0]
+
+        record_cache(f"tool.{tool}", False)
+        started = time.perf_counter()
+        result = compute()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._results[key] = (result, elapsed)
+            self._tool_stats(tool)['misses'] += 1
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Chamadas, hits, misses e segundos economizados por tool"""
+        with self._lock:
+            return {tool: dict(values) for tool, values in self._stats.items()}
+
+    def summary(self) -> str:
+        parts = []
+        for tool, values in sorted(self.stats().items()):
+            parts.append(f"{tool}: {values['hits']:.0f}/{values['calls']:.0f} repetidas "
+                         f"({values['saved_seconds']:.1f}s economizados)")
+        return "; ".join(parts) or "nenhuma chamada"
+
+
+@contextmanager
+def tool_memo_scope(run_name: str = "run") -> Iterator[ToolMemo]:
+    """Ativar memoização das tools no bloco (um escopo por execução)
+
+    Escopos aninhados reutilizam o memo mais externo.
+    """
+    current = _current_memo.get()
+    if current is not None:
+        yield current
+        return
+
+    memo = ToolMemo(run_name)
+    token = _current_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _current_memo.reset(token)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Memo das tools (%s): %s", run_name, memo.summary())
+
+
+def current_memo() -> Optional[ToolMemo]:
+    return _current_memo.get()
+
+
+def memoized(tool: str, compute: Callable[[], str], **arguments: Any) -> str:
+    """Executar compute via memo da execução atual (sem escopo ativo, executa direto)"""
+    memo = _current_memo.get()
+    if memo is None:
+        return compute()
+    return memo.get_or_compute(tool, arguments, compute)
@@ -3,11 +3,15 @@ Tool especializada para análise de regulamentação financeira brasileira
 """
 
 from crewai_tools import BaseTool
-from typing import Type, Any, List, Dict
+from typing import Type, Any, List, Dict, Optional
 from pydantic import BaseModel, Field
 from src.document_processor import DocumentProcessor
+from src.regulation.extractor import ANALYSIS_KEYS, ITEM_TYPES, deadline_durations, deadline_label, scan
+from src.regulation.index import get_regulation_index
+from src.tools.memo import memoized
 from src.utils.logger import setup_logger
-import re
+from src.utils.metrics import TOOL_CALLS, TOOL_LATENCY, record_failure
+from src.utils.tracing import span
 
 logger = setup_logger(__name__)
 
@@ -15,6 +19,16 @@ class RegulationAnalyzerInput(BaseModel):
     """Input para análise de regulamentação"""
     regulation_topic: str = Field(..., description="Tópico específico da regulamentação a ser analisado")
     focus_areas: List[str] = Field(default=[], description="Áreas específicas de foco (opcional)")
+    sources: List[str] = Field(default=[], description="Restringir a documentos específicos (nomes de arquivo, opcional)")
+    item_types: List[str] = Field(default=[], description="Tipos a extrair: obligation, deadline, penalty, article (opcional)")
+    min_deadline_days: Optional[int] = Field(default=None, description="Prazos de pelo menos N dias corridos (opcional)")
+    max_deadline_days: Optional[int] = Field(default=None, description="Prazos de até N dias corridos, ex.: 30 (opcional)")
+
+# Prazos listados quando a análise tem faixa de dias
+DEADLINE_RANGE_LIMIT = 20
+
+# Itens por chunk quando a análise cai no fallback por busca vetorial
+FALLBACK_LIMITS = {'obligation': 3, 'deadline': 2, 'penalty': 2, 'article': 2}
 
 class RegulationAnalyzerTool(BaseTool):
     name: str = "regulation_analyzer"
@@ -34,29 +48,71 @@ class RegulationAnalyzerTool(BaseTool):
     """
     args_schema: Type[BaseModel] = RegulationAnalyzerInput
     
-    def _run(self, regulation_topic: str, focus_areas: List[str] = None) -> str:
+    def _run(self, regulation_topic: str, focus_areas: List[str] = None,
+             sources: List[str] = None, item_types: List[str] = None,
+             min_deadline_days: int = None, max_deadline_days: int = None) -> str:
         try:
+            TOOL_CALLS.inc(tool='regulation_analyzer')
+            deadline_range = (min_deadline_days, max_deadline_days)
+            return memoized(self.name,
+                            lambda: self._analyze(regulation_topic, focus_areas, sources, item_types,
+                                                  deadline_range),
+                            regulation_topic=regulation_topic, focus_areas=focus_areas,
+                            sources=sources, item_types=item_types,
+                            min_deadline_days=min_deadline_days, max_deadline_days=max_deadline_days)
+            
+        except Exception as e:
+            record_failure('tool.regulation_analyzer')
+            logger.error(f"Erro na análise de regulamentação: {str(e)}")
+            return f"Erro ao analisar regulamentação: {str(e)}"
+    
+    def _analyze(self, regulation_topic: str, focus_areas: List[str],
+                 sources: List[str] = None, item_types: List[str] = None,
+                 deadline_range: tuple = (None, None)) -> str:
+        """Analisar a regulamentação do tópico
+        
+        Lê o índice regulatório construído na ingestão (corpus inteiro); se o
+        índice estiver vazio, extrai dos 20 chunks mais similares. Com faixa
+        de prazo (min, max em dias corridos), os prazos vêm da tabela normalizada.
+        """
+        item_types = [t for t in (item_types or ITEM_TYPES) if t in ITEM_TYPES] or list(ITEM_TYPES)
+        with span("tool.regulation_analyzer", focus_areas=len(focus_areas or [])) as tool_span, \
+                TOOL_LATENCY.time(tool='regulation_analyzer'):
+            index = get_regulation_index()
+            if index.has_data():
+                with span("regulation_index.query", sources=len(sources or []), item_types=len(item_types)):
+                    analysis = self._analysis_from_index(
+                        index, regulation_topic, focus_areas or [], sources or [], item_types, deadline_range
+                    )
+                if not any(analysis[key] for key in ANALYSIS_KEYS.values()) and not analysis['focus_analysis']:
+                    return f"Nenhuma regulamentação encontrada para: {regulation_topic}"
+                
+                output = self._format_analysis(regulation_topic, analysis)
+                tool_span.set_attributes(source='index', bytes=len(output))
+                return output
+            
             processor = DocumentProcessor()
             
             # Buscar documentos relevantes
             results = processor.search_documents(regulation_topic, 20)
+            if sources:
+                results = [r for r in results if r['metadata']['filename'] in sources]
             
             if not results:
                 return f"Nenhuma regulamentação encontrada para: {regulation_topic}"
             
             # Analisar e estruturar informações
-            analysis = self._analyze_regulation_content(results, focus_areas or [])
-            
-            return self._format_analysis(regulation_topic, analysis)
+            with span("regulation.analyze_content", chunks=len(results)):
+                analysis = self._analyze_regulation_content(results, focus_areas or [], item_types)
+            if deadline_range != (None, None):
+                analysis['deadlines'] = self._filter_deadlines(analysis['deadlines'], *deadline_range)
             
-        except Exception as e:
-            logger.error(f"Erro na análise de regulamentação: {str(e)}")
-            return f"Erro ao analisar regulamentação: {str(e)}"
+            output = self._format_analysis(regulation_topic, analysis)
+            tool_span.set_attributes(source='vector_search', chunks=len(results), bytes=len(output))
+            return output
     
-    def _analyze_regulation_content(self, results: List[Dict], focus_areas: List[str]) -> Dict:
-        """Analisar conteúdo regulatório e extrair informações estruturadas"""
-        
-        analysis = {
+    def _empty_analysis(self) -> Dict:
+        return {
             'obligations': [],
             'deadlines': [],
             'penalties': [],
@@ -64,56 +120,88 @@ class RegulationAnalyzerTool(BaseTool):
             'key_articles': [],
             'focus_analysis': {}
         }
+    
+    def _analysis_from_index(self, index, topic: str, focus_areas: List[str],
+                             sources: List[str], item_types: List[str],
+                             deadline_range: tuple = (None, None)) -> Dict:
+        """Montar a análise a partir do índice regulatório"""
+        analysis = self._empty_analysis()
+        
+        ranged = deadline_range != (None, None) and 'deadline' in item_types
+        query_types = [t for t in item_types if t != 'deadline'] if ranged else item_types
+        # Só prazos com faixa de dias: os demais tipos não são consultados
+        for item in index.query(topic, query_types, sources) if query_types else []:
+            analysis[ANALYSIS_KEYS[item['item_type']]].append({
+                'text': item['text'],
+                'source': item['source'],
+                'chunk_index': item['chunk_index']
+            })
+        
+        if ranged:
+            min_days, max_days = deadline_range
+            analysis['deadlines'] = [
+                dict(item, duration=deadline_label(item))
+                for item in index.deadlines(min_days, max_days, topic=topic, sources=sources,
+                                            limit=DEADLINE_RANGE_LIMIT)
+            ]
+        
+        for area in focus_areas:
+            items = index.focus(area, topic, sources)
+            if items:
+                analysis['focus_analysis'][area] = items
+        
+        return analysis
+    
+    def _analyze_regulation_content(self, results: List[Dict], focus_areas: List[str],
+                                    item_types: List[str] = ITEM_TYPES) -> Dict:
+        """Analisar conteúdo regulatório e extrair informações estruturadas"""
+        
+        analysis = self._empty_analysis()
+        
+        # Um scanner compilado por conjunto de áreas; uma passada por chunk
+        limits = {item_type: FALLBACK_LIMITS[item_type] if item_type in item_types else 0
+                  for item_type in ITEM_TYPES}
         
         for result in results:
-            content = result['content']
             metadata = result['metadata']
+            scanned = scan(result['content'], focus_areas, limits)
             
-            # Extrair obrigações (verbos imperativos)
-            obligations = re.findall(r'(?:deve|deverá|é obrigatório|é necessário|obriga-se)[\s\w,.:;-]+[.!]', content, re.IGNORECASE)
-            analysis['obligations'].extend([{
-                'text': ob.strip(),
-                'source': metadata['filename']
-            } for ob in obligations[:3]])  # Limitar a 3 por documento
-            
-            # Extrair prazos
-            deadlines = re.findall(r'(?:prazo de|até|no prazo máximo de|em até)\s+\d+\s+(?:dias|meses|anos)[\s\w,.:;-]*[.!]', content, re.IGNORECASE)
-            analysis['deadlines'].extend([{
-                'text': dl.strip(),
-                'source': metadata['filename']
-            } for dl in deadlines[:2]])
-            
-            # Extrair penalidades
-            penalties = re.findall(r'(?:multa|penalidade|sanção|advertência)[\s\w,.:;-]+[.!]', content, re.IGNORECASE)
-            analysis['penalties'].extend([{
-                'text': pen.strip(),
-                'source': metadata['filename']
-            } for pen in penalties[:2]])
-            
-            # Extrair artigos importantes
-            articles = re.findall(r'(?:Art\.|Artigo)\s+\d+[\s\w,.:;-]+[.!]', content)
-            analysis['key_articles'].extend([{
-                'text': art.strip(),
-                'source': metadata['filename']
-            } for art in articles[:2]])
+            # Obrigações, prazos, penalidades e artigos (limitados por chunk)
+            for item in scanned['items']:
+                analysis[ANALYSIS_KEYS[item['type']]].append({
+                    'text': item['text'],
+                    'source': metadata['filename']
+                })
             
             # Análise focada em áreas específicas
-            for area in focus_areas:
-                if area.lower() in content.lower():
-                    if area not in analysis['focus_analysis']:
-                        analysis['focus_analysis'][area] = []
-                    
-                    # Extrair parágrafos relevantes
-                    sentences = content.split('.')
-                    relevant_sentences = [s.strip() + '.' for s in sentences if area.lower() in s.lower()]
-                    
-                    analysis['focus_analysis'][area].extend([{
-                        'text': sent,
-                        'source': metadata['filename']
-                    } for sent in relevant_sentences[:2]])
+            for area, relevant_sentences in scanned['focus'].items():
+                analysis['focus_analysis'].setdefault(area, []).extend([{
+                    'text': sent,
+                    'source': metadata['filename']
+                } for sent in relevant_sentences[:2]])
         
         return analysis
     
+    def _filter_deadlines(self, deadlines: List[Dict], min_days: int = None, max_days: int = None) -> List[Dict]:
+        """Filtrar prazos extraídos pela faixa de dias corridos (caminho sem índice)"""
+        filtered = []
+        for item in deadlines:
+            for duration in deadline_durations(item['text']):
+                if min_days is not None and duration['days'] < min_days:
+                    continue
+                if max_days is not None and duration['days'] > max_days:
+                    continue
+                filtered.append((duration['days'], dict(item, text=duration['text'],
+                                                        duration=deadline_label(duration))))
+        return [item for _, item in sorted(filtered, key=lambda pair: pair[0])]
+    
+    @staticmethod
+    def _source_label(item: Dict) -> str:
+        """Fonte do item, com o chunk quando vem do índice regulatório"""
+        if item.get('chunk_index') is not None:
+            return f"{item['source']} (chunk {item['chunk_index']})"
+        return item['source']
+    
     def _format_analysis(self, topic: str, analysis: Dict) -> str:
         """Formatar análise em texto estruturado"""
         
@@ -131,7 +219,7 @@ class RegulationAnalyzerTool(BaseTool):
             ])
             for i, obligation in enumerate(analysis['obligations'][:5], 1):
                 sections.append(f"{i}. {obligation['text']}")
-                sections.append(f"   Fonte: {obligation['source']}")
+                sections.append(f"   Fonte: {self._source_label(obligation)}")
                 sections.append("")
         
         # Prazos
@@ -140,9 +228,15 @@ class RegulationAnalyzerTool(BaseTool):
                 "⏰ PRAZOS E DEADLINES:",
                 ""
             ])
-            for i, deadline in enumerate(analysis['deadlines'][:3], 1):
-                sections.append(f"{i}. {deadline['text']}")
-                sections.append(f"   Fonte: {deadline['source']}")
+            # Com faixa de prazo, todos os prazos encontrados (já limitados na consulta)
+            ranged = any('duration' in deadline for deadline in analysis['deadlines'])
+            shown = analysis['deadlines'] if ranged else analysis['deadlines'][:3]
+            for i, deadline in enumerate(shown, 1):
+                if 'duration' in deadline:
+                    sections.append(f"{i}. [{deadline['duration']}] {deadline['text']}")
+                else:
+                    sections.append(f"{i}. {deadline['text']}")
+                sections.append(f"   Fonte: {self._source_label(deadline)}")
                 sections.append("")
         
         # Penalidades
@@ -153,7 +247,7 @@ class RegulationAnalyzerTool(BaseTool):
             ])
             for i, penalty in enumerate(analysis['penalties'][:3], 1):
                 sections.append(f"{i}. {penalty['text']}")
-                sections.append(f"   Fonte: {penalty['source']}")
+                sections.append(f"   Fonte: {self._source_label(penalty)}")
                 sections.append("")
         
         # Artigos importantes
@@ -164,7 +258,7 @@ class RegulationAnalyzerTool(BaseTool):
             ])
             for i, article in enumerate(analysis['key_articles'][:3], 1):
                 sections.append(f"{i}. {article['text']}")
-                sections.append(f"   Fonte: {article['source']}")
+                sections.append(f"   Fonte: {self._source_label(article)}")
                 sections.append("")
         
         # Análise focada
@@ -177,7 +271,7 @@ class RegulationAnalyzerTool(BaseTool):
                 sections.append(f"► {area.upper()}:")
                 for item in items[:2]:
                     sections.append(f"  • {item['text']}")
-                    sections.append(f"    Fonte: {item['source']}")
+                    sections.append(f"    Fonte: {self._source_label(item)}")
                 sections.append("")
         
         sections.extend([
@@ -0,0 +1,223 @@
+"""
+Primitivas de concorrência do DocumentProcessor
+
+ReadWriteLock: vários leitores simultâneos ou um escritor, com preferência
+ao escritor (uma ingestão não espera indefinidamente atrás de buscas).
+
+EncodeBatcher: agrega encodes de consultas concorrentes num único
+model.encode. O primeiro chamador sem líder ativo vira líder, leva as
+consultas pendentes (até max_batch) e distribui os vetores; quem chega
+enquanto o modelo está ocupado entra no próximo lote. Com window_ms > 0, o
+líder ainda espera essa janela por mais consultas quando já há concorrência
+(por padrão não espera: o lote se forma enquanto o modelo trabalha).
+Todas as chamadas ao modelo passam por model_lock: os tokenizers rápidos do
+Hugging Face não aceitam uso simultâneo de várias threads.
+
+SingleFlight: chamadas idênticas simultâneas (mesma chave) compartilham uma
+única execução; quem chega enquanto ela está em andamento espera e recebe o
+mesmo resultado (ou a mesma exceção). Nada é guardado depois que a execução
+termina: não é um cache.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from src.utils.metrics import EMBED_BATCH_SIZE, SINGLEFLIGHT_CALLS
+from src.utils.tracing import span
+
+
+class ReadWriteLock:
+    """Lock leitores/escritor com preferência ao escritor"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class _EncodeRequest:
+    __slots__ = ('text', 'vector', 'error', 'done')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.vector: Optional[List[float]] = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+
+
+class EncodeBatcher:
+    """Micro-lotes de encodes concorrentes sobre um modelo compartilhado"""
+
+    def __init__(self, model: Any, max_batch: int = 32, window_ms: float = 0.0):
+        self.model = model
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.model_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._pending: List[_EncodeRequest] = []
+        self._leader_active = False
+        self._batches = 0
+        self._texts = 0
+
+    def encode(self, text: str) -> List[float]:
+        """Embedding de um texto, possivelmente junto com consultas concorrentes"""
+        request = _EncodeRequest(text)
+        with self._cond:
+            self._pending.append(request)
+            if self._leader_active and len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+            while not request.done:
+                if self._leader_active:
+                    self._cond.wait()
+                    continue
+                self._lead()
+        if request.error is not None:
+            raise request.error
+        return request.vector
+
+    def _lead(self):
+        """Processar um lote como líder (chamado com self._cond adquirido)"""
+        self._leader_active = True
+        # Só espera pela janela se já há concorrência; sozinho, encoda na hora
+        if self.window > 0 and 1 < len(self._pending) < self.max_batch:
+            self._cond.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.window)
+        batch = self._pending[:self.max_batch]
+        del self._pending[:self.max_batch]
+
+        self._cond.release()
+        try:
+            vectors, error = None, None
+            try:
+                with span("embeddings.batch", texts=len(batch)), self.model_lock:
+                    vectors = self.model.encode([r.text for r in batch])
+            except Exception as e:
+                error = e
+        finally:
+            self._cond.acquire()
+
+        for i, pending in enumerate(batch):
+            if error is not None:
+                pending.error = error
+            else:
+                pending.vector = vectors[i].tolist()
+            pending.done = True
+        self._batches += 1
+        self._texts += len(batch)
+        EMBED_BATCH_SIZE.observe(len(batch))
+        self._leader_active = False
+        self._cond.notify_all()
+
+    def encode_many(self, texts: List[str], batch_size: int = 64,
+                    on_progress: Callable[[int], None] = None) -> List[List[float]]:
+        """Embeddings de muitos textos (ingestão), em lotes
+
+        O model_lock é liberado entre os lotes para que consultas
+        concorrentes não esperem a ingestão inteira. on_progress recebe o
+        número de textos já convertidos após cada lote.
+        """
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            with self.model_lock:
+                vectors.extend(self.model.encode(texts[start:start + batch_size]).tolist())
+            if on_progress:
+                on_progress(len(vectors))
+        return vectors
+
+    def stats(self) -> dict:
+        """Lotes processados e tamanho médio dos lotes de consultas"""
+        with self._cond:
+            return {
+                'batches': self._batches,
+                'texts': self._texts,
+                'mean_batch': self._texts / self._batches if self._batches else 0.0
+            }
+
+
+class _Flight:
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalescência de chamadas idênticas em andamento"""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Executar fn uma vez por chave em andamento
+
+        Retorna (resultado, compartilhado). Compartilhado indica que o mesmo
+        objeto foi entregue a mais de um chamador: copie antes de alterá-lo.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+
+        if not leader:
+            SINGLEFLIGHT_CALLS.inc(operation=self.operation, result='coalesced')
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        SINGLEFLIGHT_CALLS.inc(operation=self.operation, result='executed')
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # Fora do mapa antes de acordar: o número de esperas fica fixo
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+        return flight.result, flight.waiters > 0
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
@@ -1,37 +1,83 @@
 """
 Sistema de logging configurável
+
+Com LOG_QUEUE=true, os loggers apenas enfileiram os registros; uma thread
+de fundo (QueueListener) formata e escreve no console/arquivo. Com
+LOG_FORMAT=json, cada registro vira uma linha JSON. Nos caminhos quentes,
+use argumentos no estilo % (logger.info("... %s", valor)): a mensagem só é
+formatada se o registro passar pelo nível configurado.
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
 from datetime import datetime
+from typing import List, Optional
 
-def setup_logger(name: str, level: str = None) -> logging.Logger:
-    """Configurar logger com formatação padronizada"""
-    
-    # Determinar nível de log
-    log_level = level or os.getenv('LOG_LEVEL', 'INFO')
-    numeric_level = getattr(logging, log_level.upper(), logging.INFO)
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Atributos padrão de LogRecord; o restante veio de extra= e vai para o JSON
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_queue_handler: Optional[logging.Handler] = None
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+_queue_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha: timestamp, nível, logger, mensagem e campos extras"""
     
-    # Criar logger
-    logger = logging.getLogger(name)
-    logger.setLevel(numeric_level)
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que só resolve a mensagem na thread de quem loga
     
-    # Evitar duplicação de handlers
-    if logger.handlers:
-        return logger
+    O QueueHandler padrão formata a linha inteira em prepare() e copia o
+    registro para poder serializá-lo; na fila em memória basta fixar
+    msg % args (argumentos mutáveis ainda podem mudar depois da chamada) e
+    a formatação (data, JSON, traceback) fica para a thread do listener.
+    """
     
-    # Criar formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _formatter() -> logging.Formatter:
+    if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+
+def _output_handlers(numeric_level: int) -> List[logging.Handler]:
+    """Handlers de saída: console e arquivo (opcional)"""
+    formatter = _formatter()
     
     # Handler para console
     console_handler = logging.StreamHandler()
     console_handler.setLevel(numeric_level)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # Handler para arquivo (opcional)
     if os.getenv('LOG_TO_FILE', 'false').lower() == 'true':
@@ -42,6 +88,56 @@ def setup_logger(name: str, level: str = None) -> logging.Logger:
         file_handler = logging.FileHandler(log_file, encoding='utf-8')
         file_handler.setLevel(numeric_level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    return handlers
+
+
+def _shared_queue_handler() -> logging.Handler:
+    """QueueHandler do processo; o listener é iniciado na primeira chamada"""
+    global _queue_handler, _queue_listener
+    with _queue_lock:
+        if _queue_handler is None:
+            log_queue = queue.SimpleQueue()
+            # O nível fica nos loggers; o listener escreve tudo o que chega
+            _queue_listener = logging.handlers.QueueListener(
+                log_queue, *_output_handlers(logging.NOTSET), respect_handler_level=True
+            )
+            _queue_listener.start()
+            _queue_handler = _InProcessQueueHandler(log_queue)
+            atexit.register(stop_logging)
+        return _queue_handler
+
+
+def stop_logging():
+    """Parar o listener da fila, escrevendo os registros pendentes"""
+    global _queue_listener
+    with _queue_lock:
+        if _queue_listener is not None:
+            _queue_listener.stop()
+            _queue_listener = None
+
+
+def setup_logger(name: str, level: str = None) -> logging.Logger:
+    """Configurar logger com formatação padronizada"""
+    
+    # Determinar nível de log
+    log_level = level or os.getenv('LOG_LEVEL', 'INFO')
+    numeric_level = getattr(logging, log_level.upper(), logging.INFO)
+    
+    # Criar logger
+    logger = logging.getLogger(name)
+    logger.setLevel(numeric_level)
+    
+    # Evitar duplicação de handlers
+    if logger.handlers:
+        return logger
+    
+    if os.getenv('LOG_QUEUE', 'false').lower() == 'true':
+        logger.addHandler(_shared_queue_handler())
+        return logger
+    
+    for handler in _output_handlers(numeric_level):
+        logger.addHandler(handler)
     
-    return logger
\ No newline at end of file
+    return logger
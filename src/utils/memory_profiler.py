@@ -0,0 +1,197 @@
+"""
+Perfil de memória por etapa do pipeline (tracemalloc + pico de RSS)
+
+Ativado com --profile-memory (ou PROFILE_MEMORY=true). Cada span de
+src.utils.tracing vira uma etapa, que acumula memória líquida alocada, pico
+acima do início da etapa e crescimento do pico de RSS do processo. Nas
+etapas externas (ex.: document.process, document.search), snapshots do
+tracemalloc na entrada e na saída apontam as linhas que mais alocaram;
+nas internas os snapshots inflariam o próprio RSS medido. O tracemalloc é
+global ao processo: com threads alocando em paralelo, os números de etapas
+simultâneas se misturam, então meça execuções de uma thread só. No Python
+3.8 (sem tracemalloc.reset_peak) o pico de cada etapa é aproximado pela
+memória alocada nas entradas e saídas das etapas.
+"""
+
+import os
+import sys
+import threading
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows: sem pico de RSS
+    resource = None
+
+# Pontos de alocação guardados por etapa
+TOP_SITES = 5
+
+# tracemalloc.reset_peak só existe a partir do Python 3.9
+HAS_RESET_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Pico de RSS do processo até agora (None se indisponível)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB; macOS, em bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def traced_memory() -> Tuple[int, int]:
+    """Memória atual e pico desde o último reset_peak (sem ele, a atual)"""
+    current, peak = tracemalloc.get_traced_memory()
+    return (current, peak) if HAS_RESET_PEAK else (current, current)
+
+
+class _StageFrame:
+    __slots__ = ('name', 'start_current', 'observed_peak', 'start_rss', 'snapshot')
+
+    def __init__(self, name: str, start_current: int, start_rss: Optional[int], snapshot):
+        self.name = name
+        self.start_current = start_current
+        self.observed_peak = 0
+        self.start_rss = start_rss
+        self.snapshot = snapshot
+
+
+class MemoryProfiler:
+    """Acumula alocações por etapa a partir de snapshots do tracemalloc"""
+
+    def __init__(self, frames: int = 1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            # Alocações dos próprios spans
+            tracemalloc.Filter(False, os.path.join(os.path.dirname(__file__), 'tracing.py'))
+        ]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def _stack(self) -> List[_StageFrame]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self._filters)
+
+    def enter(self, name: str) -> _StageFrame:
+        """Início de etapa; o pico do tracemalloc passa a valer para ela"""
+        stack = self._stack()
+        snapshot = None if stack else self._snapshot()
+        current, peak = traced_memory()
+        if stack:
+            # O pico visto até aqui pertence à etapa externa
+            stack[-1].observed_peak = max(stack[-1].observed_peak, peak)
+        if HAS_RESET_PEAK:
+            tracemalloc.reset_peak()
+        frame = _StageFrame(name, current, peak_rss_bytes(), snapshot)
+        stack.append(frame)
+        return frame
+
+    def exit(self, frame: _StageFrame) -> Dict[str, int]:
+        """Fim de etapa: acumula as medidas e retorna as da chamada"""
+        current, peak = traced_memory()
+        peak = max(frame.observed_peak, peak)
+        stack = self._stack()
+        if frame in stack:
+            stack.remove(frame)
+        if stack:
+            stack[-1].observed_peak = max(stack[-1].observed_peak, peak)
+
+        rss = peak_rss_bytes()
+        allocated = current - frame.start_current
+        stage_peak = peak - frame.start_current
+        sites = []
+        if frame.snapshot is not None:
+            differences = self._snapshot().compare_to(frame.snapshot, 'lineno')
+            sites = [(str(diff.traceback[0]), diff.size_diff) for diff in differences[:TOP_SITES]
+                     if diff.size_diff > 0]
+            frame.snapshot = None
+
+        with self._lock:
+            stage = self.stages.setdefault(frame.name, {
+                'calls': 0, 'allocated_bytes': 0, 'peak_bytes': 0,
+                'rss_peak_bytes': None, 'rss_growth_bytes': 0, 'sites': {}
+            })
+            stage['calls'] += 1
+            stage['allocated_bytes'] += allocated
+            stage['peak_bytes'] = max(stage['peak_bytes'], stage_peak)
+            if rss is not None:
+                stage['rss_peak_bytes'] = max(stage['rss_peak_bytes'] or 0, rss)
+                stage['rss_growth_bytes'] += rss - frame.start_rss
+            for site, size in sites:
+                stage['sites'][site] = stage['sites'].get(site, 0) + size
+
+        return {'mem_allocated_bytes': allocated, 'mem_peak_bytes': stage_peak}
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Medidas por etapa, com os maiores pontos de alocação"""
+        with self._lock:
+            report = {}
+            for name, stage in self.stages.items():
+                entry = {key: value for key, value in stage.items() if key != 'sites'}
+                top = sorted(stage['sites'].items(), key=lambda item: -item[1])[:TOP_SITES]
+                entry['top_sites'] = [{'site': site, 'bytes': size} for site, size in top]
+                report[name] = entry
+            return report
+
+    def format_report(self) -> str:
+        """Tabela por etapa, da que teve o maior pico para a menor"""
+        def mb(value):
+            return f"{value / 2**20:.1f}" if value is not None else "n/d"
+
+        lines = [f"{'etapa':<34} {'chamadas':>8} {'alocado MB':>10} {'pico MB':>8} "
+                 f"{'RSS máx MB':>10} {'ΔRSS MB':>8}"]
+        report = self.report()
+        for name, stage in sorted(report.items(), key=lambda item: -item[1]['peak_bytes']):
+            lines.append(f"{name:<34} {stage['calls']:>8} {mb(stage['allocated_bytes']):>10} "
+                         f"{mb(stage['peak_bytes']):>8} {mb(stage['rss_peak_bytes']):>10} "
+                         f"{mb(stage['rss_growth_bytes']):>8}")
+            for site in stage['top_sites'][:3]:
+                if site['bytes'] < 2**20 / 10:
+                    continue
+                lines.append(f"    {mb(site['bytes']):>8} MB  {site['site']}")
+        return "\n".join(lines)
+
+
+_profiler: Optional[MemoryProfiler] = None
+_configured = False
+_config_lock = threading.Lock()
+
+
+def enable_memory_profiling(frames: int = 1) -> MemoryProfiler:
+    """Ativar o perfil de memória (inicia o tracemalloc)"""
+    global _profiler, _configured
+    with _config_lock:
+        if _profiler is None:
+            _profiler = MemoryProfiler(frames)
+        _configured = True
+        return _profiler
+
+
+def disable_memory_profiling() -> Optional[MemoryProfiler]:
+    """Desativar o perfil e parar o tracemalloc; retorna o perfil coletado"""
+    global _profiler, _configured
+    with _config_lock:
+        profiler, _profiler = _profiler, None
+        _configured = True
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return profiler
+
+
+def active_profiler() -> Optional[MemoryProfiler]:
+    global _configured
+    if not _configured:
+        if os.getenv('PROFILE_MEMORY', 'false').lower() == 'true':
+            enable_memory_profiling()
+        _configured = True
+    return _profiler
@@ -0,0 +1,299 @@
+"""
+Registro de métricas (contadores, gauges e histogramas) com exposição no
+formato texto do Prometheus, via arquivo ou endpoint HTTP local
+
+    python main.py --metrics-port 9464 generate-batch --jobs-file jobs.jsonl
+    curl http://127.0.0.1:9464/metrics
+"""
+
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+METRIC_PREFIX = "custody_prd_"
+
+# Limites (segundos) adequados de consultas rápidas a chamadas ao LLM
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_current_agent: contextvars.ContextVar = contextvars.ContextVar('poagent_metrics_agent', default='unknown')
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base das métricas: séries indexadas pelos valores dos labels"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Labels inválidos para {self.name}: esperado {self.labelnames}, recebido {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def exposition(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Contador monotônico"""
+
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Contadores só podem ser incrementados")
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._series.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Valor instantâneo (pode subir e descer)"""
+
+    metric_type = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+
+class Histogram(_Metric):
+    """Histograma com buckets cumulativos, soma e contagem"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observar a duração do bloco em segundos"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels) -> Optional[Dict[str, object]]:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return {'counts': list(series['counts']), 'sum': series['sum'], 'count': series['count']} \
+                if series else None
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, dict(series, counts=list(series['counts']))) for key, series in self._series.items())
+
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series['counts']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas do processo"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        full_name = name if name.startswith(METRIC_PREFIX) else METRIC_PREFIX + name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = cls(full_name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Métrica {full_name} já registrada com outro tipo ou labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def exposition(self) -> str:
+        """Todas as métricas no formato texto do Prometheus (0.0.4)"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "\n".join(metric.exposition() for metric in metrics) + "\n"
+
+    def write(self, path: str):
+        """Gravar exposição em arquivo (atômico; compatível com o textfile collector)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.exposition())
+        os.replace(tmp_path, path)
+
+
+REGISTRY = MetricsRegistry()
+
+# Ingestão
+DOCUMENTS_INGESTED = REGISTRY.counter(
+    'documents_ingested_total', 'Documentos processados e indexados', ['type'])
+CHUNKS_EMBEDDED = REGISTRY.counter(
+    'chunks_embedded_total', 'Textos convertidos em embeddings', ['operation'])
+WATCH_CHANGES = REGISTRY.counter(
+    'watch_changes_total', 'Documentos conferidos pelo watch por ação (index/remove/unchanged/duplicate)', ['action'])
+EMBED_LATENCY = REGISTRY.histogram(
+    'embed_latency_seconds', 'Latência da geração de embeddings', ['operation'])
+INGESTION_JOBS = REGISTRY.counter(
+    'ingestion_jobs_total', 'Jobs da fila de ingestão por resultado (queued/done/retried/failed)', ['result'])
+EMBED_BATCH_SIZE = REGISTRY.histogram(
+    'embed_batch_size', 'Consultas agregadas por chamada ao modelo de embeddings',
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+
+# Busca
+SEARCH_LATENCY = REGISTRY.histogram(
+    'search_latency_seconds', 'Latência da busca semântica por k', ['k'])
+CACHE_REQUESTS = REGISTRY.counter(
+    'cache_requests_total', 'Consultas a caches por resultado (hit/miss)', ['cache', 'result'])
+SINGLEFLIGHT_CALLS = REGISTRY.counter(
+    'singleflight_calls_total', 'Buscas executadas ou coalescidas com uma idêntica em andamento',
+    ['operation', 'result'])
+TENANT_COLLECTIONS = REGISTRY.gauge(
+    'tenant_collections', 'Coleções de tenants abertas no LRU (open) e memória estimada (bytes)', ['measure'])
+TENANT_EVICTIONS = REGISTRY.counter(
+    'tenant_collection_evictions_total', 'Coleções frias fechadas pelo LRU de tenants')
+TOOL_CALLS = REGISTRY.counter(
+    'tool_calls_total', 'Chamadas às ferramentas dos agentes', ['tool'])
+TOOL_LATENCY = REGISTRY.histogram(
+    'tool_latency_seconds', 'Latência das ferramentas dos agentes', ['tool'])
+
+# LLM
+LLM_REQUESTS = REGISTRY.counter(
+    'llm_requests_total', 'Chamadas ao LLM por agente e resultado', ['agent', 'status'])
+LLM_LATENCY = REGISTRY.histogram(
+    'llm_latency_seconds', 'Latência das chamadas ao LLM (inclui retries)', ['agent'])
+LLM_TOKENS = REGISTRY.counter(
+    'llm_tokens_total', 'Tokens consumidos por agente e direção (in/out)', ['agent', 'direction'])
+
+# Falhas
+FAILURES = REGISTRY.counter(
+    'failures_total', 'Falhas por etapa', ['stage'])
+
+
+@contextmanager
+def agent_scope(agent: str) -> Iterator[None]:
+    """Atribuir ao agente as chamadas ao LLM feitas dentro do bloco"""
+    token = _current_agent.set(agent)
+    try:
+        yield
+    finally:
+        _current_agent.reset(token)
+
+
+def current_agent() -> str:
+    return _current_agent.get()
+
+
+def record_failure(stage: str):
+    FAILURES.inc(stage=stage)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Servir /metrics em thread daemon"""
+    registry = REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split('?', 1)[0].rstrip('/') not in ('', '/metrics'):
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = registry.exposition().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
@@ -0,0 +1,88 @@
+"""
+Escrita incremental (streaming) de documentos gerados em arquivo e terminal
+"""
+
+import sys
+import time
+from typing import Dict, Optional, TextIO
+
+
+class StreamingOutput:
+    """Recebe tokens do LLM e os grava imediatamente no arquivo e no terminal
+
+    Mede time-to-first-token (a partir da abertura) e tokens/segundo.
+    """
+
+    def __init__(self, output_file: str, echo: bool = True, terminal: TextIO = None):
+        self.output_file = output_file
+        self.echo = echo
+        self.terminal = terminal or sys.stdout
+        self._file = None
+        self._parts = []
+        self.token_count = 0
+        self.started_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def __enter__(self) -> 'StreamingOutput':
+        self._file = open(self.output_file, 'w', encoding='utf-8')
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finished_at = time.perf_counter()
+        if self._file:
+            self._file.close()
+            self._file = None
+        if self.echo and self.token_count:
+            self.terminal.write("\n")
+            self.terminal.flush()
+        return False
+
+    def on_token(self, token: str):
+        """Callback chamado a cada token recebido"""
+        if not token:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.token_count += 1
+        self._parts.append(token)
+
+        self._file.write(token)
+        self._file.flush()
+
+        if self.echo:
+            self.terminal.write(token)
+            self.terminal.flush()
+
+    @property
+    def text(self) -> str:
+        """Texto recebido via streaming até o momento"""
+        return "".join(self._parts)
+
+    def finalize(self, result: str):
+        """Garantir que o arquivo contenha o resultado final
+
+        No modo CrewAI o stream inclui o raciocínio intermediário do agente,
+        então o arquivo é reescrito com o resultado consolidado.
+        """
+        if result is None or result == self.text:
+            return
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(result)
+        self._file.flush()
+
+    def stats(self) -> Dict[str, float]:
+        """Métricas de latência e throughput do streaming"""
+        end = self.finished_at or time.perf_counter()
+        ttft = (self.first_token_at - self.started_at) if self.first_token_at else None
+        generation_time = (end - self.first_token_at) if self.first_token_at else 0.0
+        tokens_per_second = self.token_count / generation_time if generation_time > 0 else 0.0
+
+        return {
+            'time_to_first_token': ttft,
+            'total_time': end - self.started_at,
+            'tokens': self.token_count,
+            'tokens_per_second': tokens_per_second
+        }
@@ -5,6 +5,7 @@ Divisor de texto inteligente para processamento de documentos
 import re
 import tiktoken
 from typing import List, Optional
+from src.utils.tracing import span
 
 class CustomTextSplitter:
     def __init__(self, 
@@ -20,24 +21,26 @@ class CustomTextSplitter:
         if not text.strip():
             return []
         
-        # Limpar texto
-        text = self._clean_text(text)
-        
-        # Dividir por seções maiores primeiro
-        sections = self._split_by_sections(text)
-        
-        chunks = []
-        for section in sections:
-            # Se a seção é pequena, adicionar diretamente
-            if self._count_tokens(section) <= self.chunk_size:
-                if section.strip():
-                    chunks.append(section.strip())
-            else:
-                # Dividir seção grande em chunks menores
-                section_chunks = self._split_section(section)
-                chunks.extend(section_chunks)
-        
-        return chunks
+        with span("text_splitter.split_text", chars=len(text), chunk_size=self.chunk_size) as split_span:
+            # Limpar texto
+            text = self._clean_text(text)
+            
+            # Dividir por seções maiores primeiro
+            sections = self._split_by_sections(text)
+            
+            chunks = []
+            for section in sections:
+                # Se a seção é pequena, adicionar diretamente
+                if self._count_tokens(section) <= self.chunk_size:
+                    if section.strip():
+                        chunks.append(section.strip())
+                else:
+                    # Dividir seção grande em chunks menores
+                    section_chunks = self._split_section(section)
+                    chunks.extend(section_chunks)
+            
+            split_span.set_attributes(sections=len(sections), chunks=len(chunks))
+            return chunks
     
     def _clean_text(self, text: str) -> str:
         """Limpar e normalizar texto"""
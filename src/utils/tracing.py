@@ -0,0 +1,258 @@
+"""
+Tracing leve com spans aninhados, exportados em JSON-lines
+
+Ativado pela variável TRACE_FILE (ou enable_tracing). Cada linha do arquivo é
+um evento completo ("ph": "X") do formato Chrome Trace Event; para visualizar
+como flame chart no Perfetto ou chrome://tracing:
+
+    python -m src.utils.tracing trace.jsonl -o trace.json
+
+Os mesmos spans delimitam as etapas do perfil de memória
+(src.utils.memory_profiler, ativado por --profile-memory).
+"""
+
+import argparse
+import asyncio
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from src.utils.memory_profiler import active_profiler
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('poagent_current_span', default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """Intervalo de execução com atributos (chunks, tokens, bytes...)"""
+
+    __slots__ = ('name', 'attributes', 'span_id', 'parent_id', 'start_ns', 'start_wall_us', 'error')
+
+    def __init__(self, name: str, attributes: Dict[str, Any], parent: Optional['Span']):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.start_wall_us = time.time_ns() // 1000
+        self.start_ns = time.perf_counter_ns()
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+
+class _NoopSpan:
+    """Span descartável usado quando o tracing está desativado"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class JsonLinesExporter:
+    """Grava spans finalizados, um JSON por linha"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._lanes: Dict[Any, int] = {}
+
+    def _lane(self) -> int:
+        """Faixa do flame chart: tarefa asyncio atual ou thread"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = ('task', id(task)) if task is not None else ('thread', threading.get_ident())
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = len(self._lanes) + 1
+        return lane
+
+    def export(self, span: Span, duration_ns: int):
+        args = dict(span.attributes)
+        args['span_id'] = span.span_id
+        if span.parent_id is not None:
+            args['parent_id'] = span.parent_id
+        if span.error:
+            args['error'] = span.error
+
+        with self._lock:
+            event = {
+                'name': span.name,
+                'cat': span.name.split('.', 1)[0],
+                'ph': 'X',
+                'ts': span.start_wall_us,
+                'dur': duration_ns / 1000.0,
+                'pid': os.getpid(),
+                'tid': self._lane(),
+                'args': args
+            }
+            self._file.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+_exporter: Optional[JsonLinesExporter] = None
+_configured = False
+_config_lock = threading.Lock()
+
+
+def enable_tracing(path: str):
+    """Ativar tracing gravando em path"""
+    global _exporter, _configured
+    with _config_lock:
+        if _exporter:
+            _exporter.close()
+        _exporter = JsonLinesExporter(path)
+        _configured = True
+
+
+def disable_tracing():
+    """Desativar tracing e fechar o arquivo"""
+    global _exporter, _configured
+    with _config_lock:
+        if _exporter:
+            _exporter.close()
+        _exporter = None
+        _configured = True
+
+
+def _get_exporter() -> Optional[JsonLinesExporter]:
+    global _configured
+    if not _configured:
+        trace_file = os.getenv('TRACE_FILE')
+        if trace_file:
+            enable_tracing(trace_file)
+        _configured = True
+    return _exporter
+
+
+def tracing_enabled() -> bool:
+    return _get_exporter() is not None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Abrir span aninhado ao span atual
+
+    Uso:
+        with span("document.search", k=10) as s:
+            ...
+            s.set_attribute("results", len(results))
+    """
+    exporter = _get_exporter()
+    profiler = active_profiler()
+    if exporter is None and profiler is None:
+        yield _NOOP_SPAN
+        return
+
+    # Snapshot de entrada antes de iniciar o relógio do span
+    memory_frame = profiler.enter(name) if profiler is not None else None
+    current = Span(name, attributes, _current_span.get())
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration_ns = time.perf_counter_ns() - current.start_ns
+        _current_span.reset(token)
+        if memory_frame is not None:
+            current.set_attributes(**profiler.exit(memory_frame))
+        if exporter is not None:
+            exporter.export(current, duration_ns)
+
+
+def traced(name: str = None):
+    """Decorador que envolve a função (síncrona ou assíncrona) em um span"""
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def convert_to_chrome_trace(jsonl_path: str, output_path: str) -> int:
+    """Converter JSON-lines em arquivo JSON carregável no Perfetto/chrome://tracing"""
+    events = []
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+    return len(events)
+
+
+def summarize(jsonl_path: str) -> Dict[str, Dict[str, float]]:
+    """Tempo total e contagem por nome de span"""
+    summary: Dict[str, Dict[str, float]] = {}
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            entry = summary.setdefault(event['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            duration_ms = event['dur'] / 1000.0
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converter e resumir traces JSON-lines")
+    parser.add_argument('trace_file', help='Arquivo JSON-lines gerado com TRACE_FILE')
+    parser.add_argument('-o', '--output', help='Gravar trace no formato Chrome (JSON) para flame chart')
+    args = parser.parse_args()
+
+    if args.output:
+        count = convert_to_chrome_trace(args.trace_file, args.output)
+        print(f"{count} spans gravados em {args.output}")
+
+    print(f"{'span':<40} {'qtd':>6} {'total ms':>12} {'max ms':>10}")
+    for name, entry in sorted(summarize(args.trace_file).items(), key=lambda item: -item[1]['total_ms']):
+        print(f"{name:<40} {entry['count']:>6} {entry['total_ms']:>12.1f} {entry['max_ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
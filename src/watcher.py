@@ -0,0 +1,392 @@
+"""
+Monitoramento de diretório para indexação incremental (comando watch)
+
+Eventos de arquivo vêm do inotify (Linux, via ctypes) ou, sem ele, de uma
+varredura periódica de stat. Cada caminho alterado espera o debounce (sem
+novos eventos) e então é conferido pelo hash SHA-256 contra o estado gravado
+(WATCH_STATE_PATH): documentos novos ou modificados viram jobs de indexação
+na fila de ingestão e os removidos, jobs de remoção. Só no início (e num
+overflow da fila do inotify) o diretório inteiro é reconciliado; depois,
+apenas os caminhos com eventos são lidos. Caminhos cujo último job falhou
+de vez voltam para a fila na reconciliação seguinte.
+
+O nome do arquivo identifica o documento na base (ids dos chunks, índice
+regulatório, citações): um segundo arquivo com o mesmo nome em outro
+subdiretório é ignorado, com aviso, até que um dos dois seja renomeado.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import os
+import select
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from contextlib import closing
+from typing import Dict, Iterator, List, Optional, Set
+
+from src.ingestion_queue import IngestionQueue, infer_file_type
+from src.tenants import current_tenant, normalize_tenant
+from src.utils.logger import setup_logger
+from src.utils.metrics import WATCH_CHANGES
+
+logger = setup_logger(__name__)
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watched_files (
+    path TEXT NOT NULL,
+    tenant TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    job_id INTEGER,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (path, tenant)
+);
+"""
+
+# Colunas adicionadas depois da primeira versão do estado
+STATE_MIGRATIONS = {
+    'job_id': "ALTER TABLE watched_files ADD COLUMN job_id INTEGER"
+}
+
+# Arquivo removido cuja remoção foi enfileirada (size -1): fica no estado até o job concluir
+REMOVED_SIZE = -1
+
+# Constantes de <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+# struct inotify_event: wd, mask, cookie, len (seguido do nome)
+EVENT_HEADER = struct.Struct('iIII')
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def is_watched_file(path: str) -> bool:
+    """Documento indexável (PDF/TXT), ignorando ocultos e temporários de editores"""
+    name = os.path.basename(path)
+    return not name.startswith(('.', '~$')) and infer_file_type(path) in ('pdf', 'txt')
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def walk_files(directory: str) -> Iterator[str]:
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in files:
+            path = os.path.join(root, name)
+            if is_watched_file(path):
+                yield path
+
+
+class WatchState:
+    """Hash, stat e último job de cada documento enviado para a fila, por tenant"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.getenv('WATCH_STATE_PATH', './data/watch_state.sqlite3')
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(STATE_SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(watched_files)")}
+            for column, statement in STATE_MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def get(self, path: str, tenant: str) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM watched_files WHERE path = ? AND tenant = ?", (path, tenant)).fetchone()
+        return dict(row) if row else None
+
+    def paths(self, tenant: str, prefix: str = None) -> List[str]:
+        """Caminhos conhecidos do tenant (opcionalmente dentro de um diretório)"""
+        sql = "SELECT path FROM watched_files WHERE tenant = ?"
+        params = [tenant]
+        if prefix:
+            sql += " AND substr(path, 1, ?) = ?"
+            params += [len(prefix), prefix]
+        with closing(self._connect()) as conn:
+            return [row['path'] for row in conn.execute(sql, params)]
+
+    def same_name(self, path: str, tenant: str) -> List[str]:
+        """Outros arquivos presentes do tenant com o mesmo nome do caminho"""
+        suffix = os.sep + os.path.basename(path)
+        with closing(self._connect()) as conn:
+            return [row['path'] for row in conn.execute(
+                "SELECT path FROM watched_files WHERE tenant = ? AND path != ? AND size >= 0 "
+                "AND substr(path, -?) = ?",
+                (tenant, path, len(suffix), suffix)
+            )]
+
+    def put(self, path: str, tenant: str, sha256: str, size: int, mtime_ns: int, job_id: int = None):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO watched_files (path, tenant, sha256, size, mtime_ns, job_id, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, tenant, sha256, size, mtime_ns, job_id, time.time())
+            )
+
+    def delete(self, path: str, tenant: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM watched_files WHERE path = ? AND tenant = ?", (path, tenant))
+
+
+class InotifyEvents:
+    """Eventos do inotify para o diretório e subdiretórios (watch por diretório)"""
+
+    name = "inotify"
+
+    def __init__(self, directory: str):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify só existe no Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self._dirs: Dict[int, str] = {}
+        self.add_tree(directory)
+
+    def add_tree(self, directory: str):
+        """Monitorar o diretório e todos os subdiretórios (exceto ocultos)"""
+        for root, dirs, _ in os.walk(directory):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                # ENOSPC: limite fs.inotify.max_user_watches atingido
+                raise OSError(error, f"inotify_add_watch({root}): {os.strerror(error)}")
+            self._dirs[wd] = root
+
+    def read(self, timeout: float) -> List[tuple]:
+        """Eventos como (caminho, é diretório, removido); (None, ...) em overflow"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, False, False))
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            is_dir = bool(mask & IN_ISDIR)
+            if is_dir and mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                self.add_tree(path)
+            events.append((path, is_dir, bool(mask & (IN_DELETE | IN_MOVED_FROM))))
+        return events
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingEvents:
+    """Alternativa sem inotify: compara o stat dos documentos a cada intervalo"""
+
+    name = "polling"
+
+    def __init__(self, directory: str, interval: float = 2.0):
+        self.directory = directory
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self) -> Dict[str, tuple]:
+        snapshot = {}
+        for path in walk_files(self.directory):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def read(self, timeout: float) -> List[tuple]:
+        wait = self._next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(0.0, wait))
+        self._next_scan = time.monotonic() + self.interval
+
+        snapshot = self._scan()
+        # Remoções primeiro: um arquivo movido entre subdiretórios libera o nome antes
+        events = [(path, False, True) for path in self._snapshot if path not in snapshot]
+        events += [(path, False, False) for path, stat in snapshot.items() if self._snapshot.get(path) != stat]
+        self._snapshot = snapshot
+        return events
+
+    def close(self):
+        pass
+
+
+class DirectoryWatcher:
+    """Mantém a base do tenant sincronizada com os documentos do diretório"""
+
+    def __init__(self, directory: str, queue: IngestionQueue, tenant: str = None, debounce: float = 2.0,
+                 poll_interval: float = 2.0, force_polling: bool = False, max_attempts: int = 3,
+                 state: WatchState = None):
+        self.directory = os.path.abspath(directory)
+        self.queue = queue
+        self.tenant = normalize_tenant(tenant) if tenant else current_tenant()
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.force_polling = force_polling
+        self.max_attempts = max_attempts
+        self.state = state or WatchState()
+        self.stats = {'index': 0, 'remove': 0, 'unchanged': 0, 'duplicate': 0}
+        self._pending: Dict[str, float] = {}
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _open_events(self):
+        if not self.force_polling:
+            try:
+                return InotifyEvents(self.directory)
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify indisponível, usando polling a cada {self.poll_interval}s: {str(e)}")
+        return PollingEvents(self.directory, self.poll_interval)
+
+    def sync(self) -> Dict[str, int]:
+        """Reconciliar o diretório inteiro com o estado (início e overflow)"""
+        on_disk: Set[str] = set(walk_files(self.directory))
+        known = set(self.state.paths(self.tenant, self.directory + os.sep))
+        for path in sorted(on_disk | known):
+            self.reconcile(path)
+        return dict(self.stats)
+
+    def reconcile(self, path: str) -> str:
+        """Enfileirar o que mudou no caminho: index, remove, unchanged ou duplicate
+        
+        O hash gravado é o do último job enfileirado; se esse job falhou de
+        vez, o caminho volta para a fila mesmo sem mudanças no arquivo.
+        """
+        known = self.state.get(path, self.tenant)
+        last_job = self.queue.get(known['job_id']) if known and known['job_id'] else None
+        retry = last_job is not None and last_job['status'] == 'failed'
+        try:
+            stat = os.stat(path)
+            exists = is_watched_file(path) and os.path.isfile(path)
+        except FileNotFoundError:
+            exists = False
+
+        if not exists:
+            if known is None:
+                return 'unchanged'
+            if known['size'] == REMOVED_SIZE and not retry:
+                if last_job is None or last_job['status'] == 'done':
+                    self.state.delete(path, self.tenant)
+                return 'unchanged'
+            job = self.queue.enqueue(path, infer_file_type(path), self.tenant, self.max_attempts, action='remove')
+            self.state.put(path, self.tenant, '', REMOVED_SIZE, 0, job['id'])
+            return self._record('remove', path)
+
+        if not retry and known and (known['size'], known['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            return self._record('unchanged', path)
+        sha256 = file_sha256(path)
+        if not retry and known and known['sha256'] == sha256:
+            # Só o mtime mudou (ex.: touch ou cópia idêntica)
+            self.state.put(path, self.tenant, sha256, stat.st_size, stat.st_mtime_ns, known['job_id'])
+            return self._record('unchanged', path)
+
+        others = self.state.same_name(path, self.tenant)
+        if others:
+            # O nome do arquivo identifica o documento na base: o segundo não é indexado
+            logger.warning("Watch: %s ignorado, já existe um documento com o mesmo nome (%s); "
+                           "renomeie um deles", path, others[0])
+            return self._record('duplicate', path)
+
+        job = self.queue.enqueue(path, infer_file_type(path), self.tenant, self.max_attempts)
+        self.state.put(path, self.tenant, sha256, stat.st_size, stat.st_mtime_ns, job['id'])
+        return self._record('index', path)
+
+    def _record(self, action: str, path: str) -> str:
+        self.stats[action] += 1
+        WATCH_CHANGES.inc(action=action)
+        if action in ('index', 'remove'):
+            logger.info("Watch: %s %s", action, path)
+        return action
+
+    def _on_event(self, path: Optional[str], is_dir: bool, removed: bool, now: float):
+        if path is None:
+            logger.warning("Fila do inotify transbordou: reconciliando o diretório")
+            self.sync()
+        elif is_dir:
+            # Diretório criado/movido para dentro: seus documentos; removido: os conhecidos dele
+            paths = self.state.paths(self.tenant, path + os.sep) if removed else walk_files(path)
+            for child in paths:
+                self._pending[child] = now
+        elif is_watched_file(path):
+            self._pending[path] = now
+
+    def run(self):
+        """Sincronizar e acompanhar o diretório até stop()"""
+        # Eventos abertos antes da reconciliação: nada criado no meio se perde
+        events = self._open_events()
+        try:
+            self.sync()
+            logger.info("Monitorando %s (%s, tenant %s)", self.directory, events.name, self.tenant)
+            while not self._stop.is_set():
+                for path, is_dir, removed in events.read(timeout=min(self.debounce, 0.5)):
+                    self._on_event(path, is_dir, removed, time.monotonic())
+                self._flush(time.monotonic())
+        finally:
+            events.close()
+
+    def _flush(self, now: float):
+        """Conferir os caminhos sem eventos há pelo menos debounce segundos"""
+        for path, last_event in list(self._pending.items()):
+            if now - last_event < self.debounce:
+                continue
+            del self._pending[path]
+            try:
+                self.reconcile(path)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Watch: erro ao conferir {path}, nova tentativa no próximo evento: {str(e)}")